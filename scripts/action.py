@@ -1,13 +1,48 @@
 #!/usr/bin/env python3
 """Entry point for the GitHub Action; dispatches to validator scripts based on INPUT_* env vars."""
 
+import argparse
+from contextlib import suppress
+from functools import partial
 import os
+from pathlib import Path
+import sys
 
+import check_runner
 import dialogs
 import lvars
+from metrics import Metrics
+import scan_engine
 import scripts_lst
+import watch
 import worldmap
 
+parser = argparse.ArgumentParser(
+    description="Run the validators configured by INPUT_* env vars, with the action's defaults for unset ones",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+)
+
+parser.add_argument(
+    "--watch",
+    action="store_true",
+    help="keep running locally, rerunning the checks affected by changed files and printing new and resolved findings",
+)
+parser.add_argument(
+    "--poll-interval",
+    dest="poll_interval",
+    type=float,
+    default=watch.POLL_INTERVAL,
+    metavar="SECONDS",
+    help="time between polls for changed files in watch mode",
+)
+parser.add_argument(
+    "--debounce",
+    type=float,
+    default=watch.DEBOUNCE,
+    metavar="SECONDS",
+    help="time without further changes to wait for before revalidating a batch of changes in watch mode",
+)
+
 
 def parse_script_sets(raw: str) -> list[str]:
     """Convert multiline script sets to CLI format.
@@ -24,49 +59,153 @@ def parse_script_sets(raw: str) -> list[str]:
     return parsed_sets
 
 
-def main() -> None:
+def parse_globs(raw: str) -> list[str]:
+    """Convert multiline globs to a list, skipping blank lines and # comment lines."""
+    return [line.strip() for line in raw.splitlines() if line.strip() and not line.strip().startswith("#")]
+
+
+def get_scan_config() -> scan_engine.ScanConfig:
+    """Build the single-pass scan engine configuration from INPUT_* env vars.
+
+    Defaults below must match those declared in action.yml inputs section.
+    """
+    scripts_h = os.environ.get("INPUT_SCRIPTS_H", "scripts_src/headers/scripts.h")
+    scripts_lst_path = os.environ.get("INPUT_SCRIPTS_LST", "data/scripts/scripts.lst")
+    worldmap_path = os.environ.get("INPUT_WORLDMAP_PATH", "")
+    raw_sets = os.environ.get("INPUT_WORLDMAP_SCRIPT_SETS", "")
+    script_sets_file = os.environ.get("INPUT_WORLDMAP_SCRIPT_SETS_FILE", "")
+    proto_dir = os.environ.get("INPUT_PROTO_DIR", "")
+    return scan_engine.ScanConfig(
+        scripts_dir=Path(os.environ.get("INPUT_SCRIPTS_DIR", "scripts_src")),
+        dialog_dir=Path(os.environ.get("INPUT_DIALOG_DIR", "data/text/english/dialog")),
+        scripts_h=Path(scripts_h) if scripts_h else None,
+        scripts_lst=Path(scripts_lst_path) if scripts_lst_path else None,
+        check_scripts=os.environ.get("INPUT_CHECK_SCRIPTS", "true") == "true",
+        check_lvars=os.environ.get("INPUT_CHECK_LVARS", "true") == "true",
+        check_msgs=os.environ.get("INPUT_CHECK_MSGS", "true") == "true",
+        worldmap_path=Path(worldmap_path) if worldmap_path else None,
+        allowed_sets=worldmap.get_allowed_script_sets([parse_script_sets(raw_sets)]),
+        script_sets_file=Path(script_sets_file) if script_sets_file else None,
+        proto_dir=Path(proto_dir) if proto_dir else None,
+        jobs=int(os.environ.get("INPUT_JOBS", "1")),
+        cache_dir=os.environ.get("INPUT_CACHE_DIR", "") or None,
+        exclude=tuple(parse_globs(os.environ.get("INPUT_EXCLUDE", ""))),
+        use_gitignore=os.environ.get("INPUT_USE_GITIGNORE", "true") == "true",
+        metrics_path=os.environ.get("INPUT_METRICS", "") or None,
+        profile_dir=os.environ.get("INPUT_PROFILE", "") or None,
+    )
+
+
+def get_worldmap_argv(worldmap_path: str, cache_argv: list[str]) -> list[str]:
+    """Build worldmap.py arguments from INPUT_* env vars.
+
+    Defaults below must match those declared in action.yml inputs section.
+    """
+    worldmap_argv = [worldmap_path]
+    scripts_h = os.environ.get("INPUT_SCRIPTS_H", "scripts_src/headers/scripts.h")
+    scripts_lst_path = os.environ.get("INPUT_SCRIPTS_LST", "data/scripts/scripts.lst")
+    if scripts_h:
+        worldmap_argv += ["--scripts-h", scripts_h]
+    if scripts_lst_path:
+        worldmap_argv += ["--scripts-lst", scripts_lst_path]
+    raw_sets = os.environ.get("INPUT_WORLDMAP_SCRIPT_SETS", "")
+    if raw_sets:
+        worldmap_argv += ["-s", *parse_script_sets(raw_sets)]
+    script_sets_file = os.environ.get("INPUT_WORLDMAP_SCRIPT_SETS_FILE", "")
+    if script_sets_file:
+        worldmap_argv += ["--script-sets-file", script_sets_file]
+    proto_dir = os.environ.get("INPUT_PROTO_DIR", "")
+    if proto_dir:
+        worldmap_argv += ["--proto-dir", proto_dir, *cache_argv]
+    return worldmap_argv
+
+
+def main(argv: list[str] | None = None) -> None:
     """Read INPUT_* env vars and run the appropriate validator scripts.
 
+    By default all enabled validators run in one pass of the scan engine. Incremental runs
+    dispatch to each validator's own entry point, which knows what its changed inputs affect.
+    Either way the validators run concurrently and the action fails once all have finished.
     Defaults below must match those declared in action.yml inputs section.
+
+    Args:
+        argv: Command line arguments, e.g. ["--watch"]; none if None, as in the action
     """
+    args = parser.parse_args(argv or [])
+    if args.watch:
+        watcher = watch.Watcher(get_scan_config(), args.poll_interval, args.debounce)
+        with suppress(KeyboardInterrupt):
+            watcher.run()
+        return
+
+    changed_since = os.environ.get("INPUT_CHANGED_SINCE", "")
+    if not changed_since:
+        scan_engine.run(get_scan_config())
+        return
+
+    changed_argv = ["--changed-since", changed_since]
+    cache_dir = os.environ.get("INPUT_CACHE_DIR", "")
+    cache_argv = ["--cache-dir", cache_dir] if cache_dir else []
+    walk_argv = [arg for glob in parse_globs(os.environ.get("INPUT_EXCLUDE", "")) for arg in ("--exclude", glob)]
+    if os.environ.get("INPUT_USE_GITIGNORE", "true") != "true":
+        walk_argv.append("--no-gitignore")
+    profile_dir = os.environ.get("INPUT_PROFILE", "")
+    changed_argv += ["--profile", profile_dir] if profile_dir else []
+    checks: dict[str, check_runner.Check] = {}
+    # Validators record their phases in one collector, written out once all have finished
+    collector = Metrics()
+
     if os.environ.get("INPUT_CHECK_SCRIPTS", "true") == "true":
-        scripts_lst.main(
+        checks["scripts"] = partial(
+            scripts_lst.main,
             [
                 os.environ.get("INPUT_SCRIPTS_H", "scripts_src/headers/scripts.h"),
                 os.environ.get("INPUT_SCRIPTS_LST", "data/scripts/scripts.lst"),
-            ]
+                *changed_argv,
+            ],
+            metrics=collector,
         )
 
     if os.environ.get("INPUT_CHECK_LVARS", "true") == "true":
-        lvars.main(
+        checks["lvars"] = partial(
+            lvars.main,
             [
                 os.environ.get("INPUT_SCRIPTS_DIR", "scripts_src"),
                 os.environ.get("INPUT_SCRIPTS_LST", "data/scripts/scripts.lst"),
-            ]
+                *cache_argv,
+                *walk_argv,
+                *changed_argv,
+            ],
+            metrics=collector,
         )
 
     if os.environ.get("INPUT_CHECK_MSGS", "true") == "true":
-        dialogs.main(
+        checks["msgs"] = partial(
+            dialogs.main,
             [
                 os.environ.get("INPUT_DIALOG_DIR", "data/text/english/dialog"),
                 os.environ.get("INPUT_SCRIPTS_DIR", "scripts_src"),
-            ]
+                "--jobs",
+                os.environ.get("INPUT_JOBS", "1"),
+                *cache_argv,
+                *walk_argv,
+                *changed_argv,
+            ],
+            metrics=collector,
         )
 
     worldmap_path = os.environ.get("INPUT_WORLDMAP_PATH", "")
     if worldmap_path:
-        worldmap_argv = [worldmap_path]
-        scripts_h = os.environ.get("INPUT_SCRIPTS_H", "scripts_src/headers/scripts.h")
-        scripts_lst_path = os.environ.get("INPUT_SCRIPTS_LST", "data/scripts/scripts.lst")
-        if scripts_h:
-            worldmap_argv += ["--scripts-h", scripts_h]
-        if scripts_lst_path:
-            worldmap_argv += ["--scripts-lst", scripts_lst_path]
-        raw_sets = os.environ.get("INPUT_WORLDMAP_SCRIPT_SETS", "")
-        if raw_sets:
-            worldmap_argv += ["-s", *parse_script_sets(raw_sets)]
-        worldmap.main(worldmap_argv)
+        worldmap_argv = get_worldmap_argv(worldmap_path, cache_argv) + changed_argv
+        checks["worldmap"] = partial(worldmap.main, worldmap_argv, metrics=collector)
+
+    found_problems = check_runner.report(check_runner.run_checks(checks, sequential=bool(profile_dir)))
+    metrics_path = os.environ.get("INPUT_METRICS", "")
+    if metrics_path:
+        collector.write(metrics_path)
+    if found_problems:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,114 @@
+"""Concurrent execution of validator checks with per-check output capture.
+
+Each check runs in its own thread, so one failing check no longer keeps the others from running,
+even if it raises.
+What a check prints is captured separately and printed once all checks have finished, in the order
+the checks were given, so logs never interleave. The per-file extraction that dominates a run
+already happens in the process pools of parallel.py, so threads are enough to overlap the checks.
+"""
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+import io
+import sys
+import threading
+import traceback
+from typing import NamedTuple, TextIO
+
+# Type alias for a check: returns True if it found problems, and may also exit via sys.exit()
+Check = Callable[[], bool | None]
+
+
+class CheckResult(NamedTuple):
+    """Outcome of one check."""
+
+    name: str
+    failed: bool
+    output: str  # Everything the check printed to stdout
+
+
+class _ThreadStdout(io.TextIOBase):
+    """Stdout that writes to the current thread's capture buffer, if it has one.
+
+    Threads started by a check itself are not captured and write through to the real stdout.
+    """
+
+    def __init__(self, stdout: TextIO) -> None:
+        self._stdout = stdout
+        self._local = threading.local()
+
+    @property
+    def capture(self) -> io.StringIO | None:
+        """Capture buffer of the current thread."""
+        return getattr(self._local, "buffer", None)
+
+    @capture.setter
+    def capture(self, buffer: io.StringIO | None) -> None:
+        self._local.buffer = buffer
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        capture = self.capture
+        return (self._stdout if capture is None else capture).write(text)
+
+    def flush(self) -> None:
+        if self.capture is None:
+            self._stdout.flush()
+
+
+def _run_captured(name: str, check: Check, stdout: _ThreadStdout) -> CheckResult:
+    """Run one check, capturing what it prints and turning sys.exit() into a failed result.
+
+    An exception raised by the check also fails it, with its traceback as the last of its output,
+    so that the other checks still run and report.
+    """
+    buffer = io.StringIO()
+    stdout.capture = buffer
+    try:
+        failed = bool(check())
+    except SystemExit as exc:
+        failed = exc.code not in (None, 0)
+    except Exception:
+        buffer.write(traceback.format_exc())
+        failed = True
+    finally:
+        stdout.capture = None
+    return CheckResult(name, failed, buffer.getvalue())
+
+
+def run_checks(checks: dict[str, Check], sequential: bool = False) -> list[CheckResult]:
+    """Run checks concurrently, each with its output captured.
+
+    Args:
+        checks: Checks by name, in the order their results should be reported
+        sequential: Run one check at a time instead, e.g. when profiling, as only one profiler
+            can be active in a process
+
+    Returns:
+        Results of all checks, in the same order as checks
+    """
+    stdout = _ThreadStdout(sys.stdout)
+    workers = 1 if sequential else max(1, len(checks))
+    with redirect_stdout(stdout), ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_captured, name, check, stdout) for name, check in checks.items()]
+        return [future.result() for future in futures]
+
+
+def report(results: list[CheckResult]) -> bool:
+    """Print the captured output of each check in order, then the names of the failed ones.
+
+    Args:
+        results: Results from run_checks()
+
+    Returns:
+        True if some check failed, False otherwise
+    """
+    for result in results:
+        print(result.output, end="")
+    failed = [result.name for result in results if result.failed]
+    if failed:
+        print(f"Failed checks: {', '.join(failed)}")
+    return bool(failed)
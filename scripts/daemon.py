@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""Long-running validation daemon answering JSON-RPC requests, e.g. from an editor on save.
+
+A one-off run pays for process startup and a parse of the whole tree. The daemon reads
+scripts.h, scripts.lst, the .msg files and the facts of every script and header once and keeps
+them in memory, evicting the least recently used files beyond --max-files. Each request stats
+the inputs it needs and rescans only the files that changed since, so validating a saved script
+takes milliseconds.
+
+Requests are JSON-RPC 2.0 objects, one per line, read from stdin or from clients of a Unix
+socket; responses are written the same way. Methods:
+
+- `validate` with `{"file": PATH}`: check what depends on one file. A script is checked on its
+  own, a header or .msg file together with every script using it; scripts.h and scripts.lst
+  affect the whole project, and worldmap.txt, the script sets file and the protos the worldmap.
+- `validate` with `{"project": true}`: run every enabled check, like scan_engine.py.
+- `shutdown`: answer, then exit.
+
+Validation results list each check with the lines it printed, as in a one-off run:
+`{"failed": true, "checks": [{"name": "msgs", "failed": true, "output": ["Messages in ..."]}]}`.
+Requests are answered one at a time, so the checks share the in-memory state without locks.
+"""
+
+import argparse
+from collections.abc import Callable, Iterable, Sequence
+from functools import partial
+import json
+import os
+from pathlib import Path
+import socket
+import sys
+from typing import Any, TextIO
+
+import check_runner
+import dialogs
+from includes import IncludeResolver
+from metrics import Metrics
+from msg_index import MsgDir, MsgIndex
+from parallel import extract_paths
+from protos import ProtoIndex
+from scan_cache import MemoryCache
+import scan_engine
+from script_registry import ScriptRegistry
+import scripts_lst
+from tree_walker import FileEntry, walk_files
+import worldmap
+
+# Type alias for the size and mtime of input files, None for a missing one
+Signature = tuple[tuple[int, int] | None, ...]
+
+# Files whose facts are kept in memory per cache; vanilla Fallout 2 has about 1500 scripts
+DEFAULT_MAX_FILES = 20_000
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+parser = argparse.ArgumentParser(
+    description="Validate a mod on request, keeping parsed inputs in memory between requests",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+)
+
+parser.add_argument("--scripts-dir", dest="scripts_dir", default="scripts_src", help="scripts directory path")
+parser.add_argument(
+    "--dialog-dir", dest="dialog_dir", default="data/text/english/dialog", help="path to msg dialog directory"
+)
+parser.add_argument("--scripts-h", dest="scripts_h", default="scripts_src/headers/scripts.h", help="scripts.h path")
+parser.add_argument("--scripts-lst", dest="scripts_lst", default="data/scripts/scripts.lst", help="scripts.lst path")
+parser.add_argument("--no-scripts", dest="check_scripts", action="store_false", help="don't check scripts.lst")
+parser.add_argument("--no-lvars", dest="check_lvars", action="store_false", help="don't check LVARs")
+parser.add_argument("--no-msgs", dest="check_msgs", action="store_false", help="don't check msg references")
+parser.add_argument("--worldmap", metavar="FILE", help="worldmap.txt path; the worldmap is not checked without it")
+parser.add_argument(
+    "-s",
+    dest="script_sets",
+    help="allow sets of scripts, and any of their subsets, to be present in an encounter together, like so: "
+    "'-s 100,101  200,201,202'",
+    action="append",
+    nargs="+",
+)
+parser.add_argument(
+    "--script-sets-file",
+    dest="script_sets_file",
+    metavar="FILE",
+    help="also allow the script sets in FILE, one per line, with numbers separated by commas or spaces",
+)
+parser.add_argument(
+    "--proto-dir", dest="proto_dir", metavar="DIR", help="check encounter Pids against the protos in DIR"
+)
+parser.add_argument(
+    "--exclude",
+    action="append",
+    default=[],
+    metavar="GLOB",
+    help="skip files and directories matching this glob, relative to the scripts directory; may be repeated",
+)
+parser.add_argument(
+    "--no-gitignore",
+    dest="use_gitignore",
+    action="store_false",
+    help="also check scripts excluded by .gitignore files",
+)
+parser.add_argument(
+    "--jobs",
+    type=int,
+    default=1,
+    help="number of worker processes for extracting many scripts at once; 0 means one per CPU",
+)
+parser.add_argument(
+    "--max-files",
+    dest="max_files",
+    type=int,
+    default=DEFAULT_MAX_FILES,
+    help="files to keep parsed in memory per kind of input; the least recently used are dropped",
+)
+parser.add_argument(
+    "--socket",
+    metavar="PATH",
+    help="listen on a Unix socket at PATH instead of reading requests from stdin",
+)
+
+
+def file_signature(paths: Iterable[Path | None]) -> Signature:
+    """Return the size and mtime of files, to tell whether they changed.
+
+    Args:
+        paths: Files, or None for inputs that are not configured
+
+    Returns:
+        (size, mtime_ns) of each file, or None for a missing or unconfigured one
+    """
+    signature: list[tuple[int, int] | None] = []
+    for path in paths:
+        try:
+            stat = os.stat(path) if path is not None else None
+        except OSError:
+            stat = None
+        signature.append((stat.st_size, stat.st_mtime_ns) if stat is not None else None)
+    return tuple(signature)
+
+
+def _resolved(*paths: Path | None) -> set[Path]:
+    """Return the resolved paths of the configured ones."""
+    return {path.resolve() for path in paths if path is not None}
+
+
+class Daemon:
+    """Validation state of one mod, kept in memory and updated from the files each request needs."""
+
+    def __init__(self, config: scan_engine.ScanConfig, max_files: int = DEFAULT_MAX_FILES) -> None:
+        """Create a daemon; nothing is read until the first request.
+
+        Args:
+            config: Inputs and enabled checks; profiling, metrics and on-disk cache settings are ignored
+            max_files: Files to keep parsed in memory per cache
+        """
+        # Scripts are keyed by resolved path, both when walked and when named by a request
+        self.config = config._replace(scripts_dir=config.scripts_dir.resolve())
+        enabled = {"dialogs": config.check_msgs, "lvars": config.check_lvars}
+        self.validators = tuple(name for name, is_enabled in enabled.items() if is_enabled)
+        self.facts = MemoryCache("engine", max_files)  # Facts and includes of scripts and headers
+        self.msgs = MemoryCache("msg", max_files)  # Message IDs of .msg files
+        self.protos = MemoryCache("protos", max_files)  # Proto lists and headers
+        self._loaded: dict[str, tuple[Signature, Any]] = {}
+
+    def _reload[T](self, name: str, paths: Iterable[Path | None], load: Callable[[], T]) -> T:
+        """Return what load() read from some files, calling it again only once they changed."""
+        signature = file_signature(paths)
+        loaded = self._loaded.get(name)
+        if loaded is None or loaded[0] != signature:
+            loaded = (signature, load())
+            self._loaded[name] = loaded
+        return loaded[1]
+
+    def registry(self) -> ScriptRegistry:
+        """Return scripts.h and scripts.lst, read again if either changed."""
+        config = self.config
+        load = partial(scan_engine.load_registry, config, Metrics())
+        return self._reload("registry", [config.scripts_h, config.scripts_lst], load)
+
+    def msg_dir(self) -> MsgDir:
+        """Return the index of the dialog directory, listed again if files were added or removed."""
+        return self._reload("msg_dir", [self.config.dialog_dir], partial(MsgDir, self.config.dialog_dir))
+
+    def _resolver(self) -> IncludeResolver[scan_engine.ValidatorFacts]:
+        """Return an include resolver for one request, reading unchanged headers from memory."""
+        return IncludeResolver(partial(scan_engine.scan_code, validators=self.validators), self.facts)
+
+    def _extract(self, files: Sequence[Path | FileEntry]) -> list[scan_engine.ScriptFacts]:
+        """Extract the facts of scripts, rescanning only those that changed since last seen."""
+        extract = partial(scan_engine.extract_script, validators=self.validators)
+        return extract_paths(extract, files, self.config.jobs, self.facts)
+
+    def _scripts(self) -> tuple[list[Path], list[scan_engine.ScriptFacts]]:
+        """Walk the scripts directory and extract the facts of every script."""
+        if not self.validators:
+            return [], []
+        config = self.config
+        entries = walk_files(config.scripts_dir, ".ssl", config.exclude, config.use_gitignore)
+        return [entry.path for entry in entries], self._extract(entries)
+
+    def _dependents(
+        self, path: Path, resolver: IncludeResolver[scan_engine.ValidatorFacts]
+    ) -> tuple[list[Path], list[scan_engine.ScriptFacts]]:
+        """Find the scripts that include a header or are checked against a .msg file."""
+        script_paths, results = self._scripts()
+        if path.suffix.lower() == ".h":
+            keep = [i for i, result in enumerate(results) if str(path) in resolver.headers(result.includes)]
+        else:
+            effective = scan_engine.effective_messages(results, resolver) if "dialogs" in self.validators else []
+            dependents = dialogs.get_msg_dependents(script_paths, effective, self.msg_dir()) if effective else {}
+            selected = {
+                script_path
+                for msg_path, msg_dependents in dependents.items()
+                if msg_path.resolve() == path
+                for script_path in msg_dependents
+            }
+            keep = [i for i, script_path in enumerate(script_paths) if script_path in selected]
+        return [script_paths[i] for i in keep], [results[i] for i in keep]
+
+    def _script_checks(
+        self,
+        script_paths: list[Path],
+        results: list[scan_engine.ScriptFacts],
+        resolver: IncludeResolver[scan_engine.ValidatorFacts],
+        totals: bool,
+    ) -> dict[str, check_runner.Check]:
+        """Return the enabled LVAR and message checks of some scripts."""
+
+        def lvars_check() -> bool:
+            scan_engine.require_file(self.config.scripts_lst)
+            return scan_engine.check_lvars(script_paths, results, resolver, self.registry())
+
+        def msgs_check() -> bool:
+            effective = scan_engine.effective_messages(results, resolver)
+            check = dialogs.check_messages(script_paths, effective, self.msg_dir(), MsgIndex(self.msgs))
+            if totals:
+                dialogs.print_totals(check)
+            return check.failed
+
+        checks: dict[str, check_runner.Check] = {}
+        if self.config.check_lvars:
+            checks["lvars"] = lvars_check
+        if self.config.check_msgs:
+            checks["msgs"] = msgs_check
+        return checks
+
+    def _scripts_check(self) -> bool:
+        """Check scripts.h against scripts.lst."""
+        scan_engine.require_file(self.config.scripts_h)
+        scan_engine.require_file(self.config.scripts_lst)
+        return scripts_lst.check_registry(self.registry())
+
+    def _worldmap_check(self) -> bool:
+        """Check the worldmap encounters, reading only the worldmap inputs that changed."""
+        config = self.config
+        worldmap_path = config.worldmap_path
+        worldmap.check_worldmap_file(worldmap_path)
+        encounters = self._reload("worldmap", [worldmap_path], partial(worldmap.read_encounters, worldmap_path))
+        load_sets = partial(worldmap.load_allowed_sets, config.allowed_sets or [], config.script_sets_file)
+        allowed_sets = self._reload("script_sets", [config.script_sets_file], load_sets)
+        registry = self.registry()
+        found_problems = worldmap.check_encounters(
+            encounters, allowed_sets, registry.symbols(), registry.descriptions_by_num()
+        )
+        if config.proto_dir is not None:
+            protos = ProtoIndex.load(config.proto_dir, self.protos)
+            found_problems = worldmap.check_pids(encounters, protos) or found_problems
+        return found_problems
+
+    def validate_project(
+        self, names: Iterable[str] | None = None, totals: bool = True
+    ) -> list[check_runner.CheckResult]:
+        """Run enabled checks over the whole project, in the order scripts, lvars, msgs, worldmap.
+
+        Args:
+            names: Checks to run, e.g. those affected by changed files; every enabled one if None
+            totals: Print the statistics of the message check
+
+        Returns:
+            Results of the checks, with what each printed
+        """
+        selected = set(scan_engine.CHECK_NAMES if names is None else names)
+        checks: dict[str, check_runner.Check] = {}
+        if self.config.check_scripts:
+            checks["scripts"] = self._scripts_check
+        if not selected.isdisjoint(("lvars", "msgs")):
+            resolver = self._resolver()
+            script_paths, results = self._scripts()
+            checks |= self._script_checks(script_paths, results, resolver, totals)
+        if self.config.worldmap_path is not None:
+            checks["worldmap"] = self._worldmap_check
+        return check_runner.run_checks({name: checks[name] for name in checks if name in selected}, sequential=True)
+
+    def validate_file(self, file_path: str | Path) -> list[check_runner.CheckResult]:
+        """Run the checks affected by one file.
+
+        Args:
+            file_path: Changed or saved file, e.g. a script, header or .msg file
+
+        Returns:
+            Results of the checks, with what each printed
+
+        Raises:
+            OSError: If a script to check cannot be read
+        """
+        config = self.config
+        path = Path(file_path).resolve()
+        if path in _resolved(config.scripts_h, config.scripts_lst):
+            return self.validate_project()
+        if config.worldmap_path is not None:
+            proto_dir = config.proto_dir.resolve() if config.proto_dir is not None else None
+            if path in _resolved(config.worldmap_path, config.script_sets_file) or (
+                proto_dir is not None and path.is_relative_to(proto_dir)
+            ):
+                return check_runner.run_checks({"worldmap": self._worldmap_check}, sequential=True)
+
+        resolver = self._resolver()
+        if path.suffix.lower() in (".h", ".msg"):
+            script_paths, results = self._dependents(path, resolver)
+        else:
+            script_paths, results = [path], self._extract([path])
+        return check_runner.run_checks(self._script_checks(script_paths, results, resolver, totals=False), True)
+
+
+class RpcError(Exception):
+    """A request that cannot be answered, with its JSON-RPC error code."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+def results_json(results: list[check_runner.CheckResult]) -> dict[str, Any]:
+    """Convert check results to the result of a validate request."""
+    return {
+        "failed": any(result.failed for result in results),
+        "checks": [
+            {"name": result.name, "failed": result.failed, "output": result.output.splitlines()} for result in results
+        ],
+    }
+
+
+def _call(daemon: Daemon, method: str, params: Any) -> Any:
+    """Run a JSON-RPC method and return its result."""
+    if method == "shutdown":
+        return None
+    if method != "validate":
+        raise RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+    if isinstance(params, dict) and isinstance(params.get("file"), str):
+        return results_json(daemon.validate_file(params["file"]))
+    if isinstance(params, dict) and params.get("project") is True:
+        return results_json(daemon.validate_project())
+    raise RpcError(INVALID_PARAMS, 'Expected {"file": PATH} or {"project": true}')
+
+
+def handle(daemon: Daemon, request: Any) -> dict[str, Any] | None:
+    """Answer one JSON-RPC request.
+
+    Args:
+        daemon: Validation state to answer from
+        request: Decoded request object
+
+    Returns:
+        Response object, or None for a notification, which has no id and gets no answer
+    """
+    if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+        return {"jsonrpc": "2.0", "id": None, "error": {"code": INVALID_REQUEST, "message": "Invalid request"}}
+    response: dict[str, Any] = {"jsonrpc": "2.0", "id": request.get("id")}
+    try:
+        response["result"] = _call(daemon, request["method"], request.get("params", {}))
+    except RpcError as exc:
+        response["error"] = {"code": exc.code, "message": str(exc)}
+    except Exception as exc:
+        # Whatever goes wrong with one request, the daemon keeps serving the others
+        response["error"] = {"code": SERVER_ERROR, "message": str(exc) or type(exc).__name__}
+    return response if "id" in request else None
+
+
+def serve(daemon: Daemon, reader: TextIO, writer: TextIO) -> bool:
+    """Answer requests, one JSON object per line, until the input ends or a shutdown request.
+
+    Args:
+        daemon: Validation state to answer from
+        reader: Stream to read requests from
+        writer: Stream to write responses to
+
+    Returns:
+        True if a shutdown was requested, False if the input ended
+    """
+    for line in reader:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+            response = {"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": "Parse error"}}
+        else:
+            response = handle(daemon, request)
+        if response is not None:
+            writer.write(json.dumps(response) + "\n")
+            writer.flush()
+        if isinstance(request, dict) and request.get("method") == "shutdown":
+            return True
+    return False
+
+
+def _remove_stale_socket(socket_path: str | Path) -> None:
+    """Remove a socket left behind by a daemon that did not exit cleanly.
+
+    Args:
+        socket_path: Path the daemon is to listen at
+
+    Raises:
+        OSError: If another daemon still listens there
+    """
+    if not Path(socket_path).is_socket():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except ConnectionRefusedError:
+            os.unlink(socket_path)
+            return
+    raise OSError(f"{socket_path} is in use by another daemon")
+
+
+def serve_socket(daemon: Daemon, socket_path: str | Path) -> None:
+    """Answer the clients of a Unix socket, one connection at a time, until a shutdown request.
+
+    Args:
+        daemon: Validation state to answer from
+        socket_path: Path to create the socket at, replacing a stale one; removed on exit
+    """
+    _remove_stale_socket(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(socket_path))
+        try:
+            server.listen()
+            shutdown = False
+            while not shutdown:
+                connection, _ = server.accept()
+                with (
+                    connection,
+                    connection.makefile("r", encoding="utf-8") as reader,
+                    connection.makefile("w", encoding="utf-8") as writer,
+                ):
+                    shutdown = serve(daemon, reader, writer)
+        finally:
+            os.unlink(socket_path)
+
+
+def get_scan_config(args: argparse.Namespace) -> scan_engine.ScanConfig:
+    """Build the daemon's configuration from parsed command line arguments."""
+    return scan_engine.ScanConfig(
+        scripts_dir=Path(args.scripts_dir),
+        dialog_dir=Path(args.dialog_dir),
+        scripts_h=Path(args.scripts_h) if args.scripts_h else None,
+        scripts_lst=Path(args.scripts_lst) if args.scripts_lst else None,
+        check_scripts=args.check_scripts,
+        check_lvars=args.check_lvars,
+        check_msgs=args.check_msgs,
+        worldmap_path=Path(args.worldmap) if args.worldmap else None,
+        allowed_sets=worldmap.get_allowed_script_sets(args.script_sets),
+        script_sets_file=Path(args.script_sets_file) if args.script_sets_file else None,
+        proto_dir=Path(args.proto_dir) if args.proto_dir else None,
+        jobs=args.jobs,
+        exclude=tuple(args.exclude),
+        use_gitignore=args.use_gitignore,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Main entry point for the validation daemon.
+
+    The whole project is read once up front, so that the first request is as fast as the rest.
+
+    Args:
+        argv: Command line arguments; sys.argv[1:] if None
+    """
+    args = parser.parse_args(argv)
+    daemon = Daemon(get_scan_config(args), args.max_files)
+    daemon.validate_project()
+    if args.socket:
+        serve_socket(daemon, args.socket)
+    else:
+        serve(daemon, sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
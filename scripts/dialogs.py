@@ -3,26 +3,75 @@
 
 This module cross-references message IDs used in scripts with their
 corresponding .msg files to ensure all referenced messages exist.
-Only .msg dialog files use cp1252 encoding; .ssl script files are UTF-8/ASCII.
+Scripts and .msg files are scanned as raw bytes; everything matched is ASCII,
+so mixed or unexpected encodings in either cannot break a run.
 """
 
 import argparse
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Sequence
+from functools import partial
 from pathlib import Path
 import re
 import sys
+from typing import NamedTuple
+
+from includes import Code, IncludeResolver, scan_file
+from incremental import ChangedFiles, changed_since
+from mapped_file import Buffer
+from metrics import Metrics
+from msg_index import MsgDir, MsgIndex, merge_ranges, read_msg_ids
+from parallel import extract_paths
+from profiling import profiled
+from scan_cache import ScanCache
+from ssl_lexer import strip_code
+from tree_walker import FileEntry, walk_files
 
 # Type aliases
 MessageList = list[str]  # List of message IDs
 MessageDict = dict[str, MessageList]  # Maps message type to list of message IDs
-
-# Regex patterns for message function calls in scripts
-_MSG_REGEX0 = re.compile(
-    r"[^_]+(?:display_mstr|floater|dude_floater|Reply|GOption|GLowOption|NOption"
-    r"|NLowOption|BOption|BLowOption|GMessage|NMessage|BMessage) *\( *([0-9]{3,5}) *[,\)]"
+MessageRange = tuple[int, int]  # First and last ID of a floater_rand/Reply_Rand range, inclusive
+RangeList = list[MessageRange]
+# Script messages, generic messages, NAME define, script message ranges
+MessageFacts = tuple[MessageList, MessageList, str | None, RangeList]
+# Start and end offsets of a message call in code, and the message ID it passes
+Call = tuple[int, int, bytes]
+
+
+class MessageCheck(NamedTuple):
+    """Outcome of checking message references against .msg files."""
+
+    found_missing: bool  # Some referenced message is not defined
+    message_count: int  # Message references checked
+    without_msg: int  # Scripts skipped because they have no .msg file
+    found_malformed: bool = False  # Some checked .msg file has duplicate IDs or malformed entries
+
+    @property
+    def failed(self) -> bool:
+        """Whether the check found any problem."""
+        return self.found_missing or self.found_malformed
+
+
+class ScriptMessages(NamedTuple):
+    """Message references extracted from one script."""
+
+    script: MessageList  # Unique message IDs, in order of first use
+    gen: MessageList  # Unique generic message IDs, in order of first use
+    name: str | None  # Name from `#define NAME SCRIPT_...`, if any
+    includes: list[str]  # Resolved paths of directly included headers
+    ranges: RangeList  # Unique script message ranges, in order of first use
+
+
+# Message function calls in scripts, matched at the keyword itself. Arguments never contain letters,
+# so at most one alternative can match at a given position and matches of different kinds never overlap.
+_MSG_CALL_REGEX = re.compile(
+    rb"(?P<msg>display_mstr|floater|dude_floater|Reply|GOption|GLowOption|NOption|NLowOption|BOption|BLowOption"
+    rb"|GMessage|NMessage|BMessage) *\( *(?P<msg_id>[0-9]{3,5}) *[,\)]"
+    rb"|(?P<gen>g_mstr) *\( *(?P<gen_id>[0-9]{3,5}) *\)"
+    rb"|(?P<mstr>mstr) *\( *(?P<mstr_id>[0-9]{3,5}) *\)"
+    rb"|(?P<rand>floater_rand|Reply_Rand) *\( *(?P<rand_lo>[0-9]{3,5}) *, *(?P<rand_hi>[0-9]{3,5})"
 )
-_MSG_REGEX1 = re.compile(r"[^_]+mstr *\( *([0-9]{3,5}) *\)")
-_MSG_REGEX2 = re.compile(r"[^_]+(?:floater_rand|Reply_Rand) *\( *([0-9]{3,5}) *, *([0-9]{3,5})")
-_MSG_REGEX_GEN = re.compile(r"[^_]+g_mstr *\( *([0-9]{3,5}) *\)")
+_NAME_REGEX = re.compile(rb"#define NAME +SCRIPT_([A-Z0-9_]+)")
 
 parser = argparse.ArgumentParser(
     description="Find inconsistencies between ssl and msg",
@@ -31,6 +80,42 @@ parser = argparse.ArgumentParser(
 
 parser.add_argument("DIALOG_DIR", help="path to msg dialog directory")
 parser.add_argument("SCRIPTS_DIR", help="path to scripts directory")
+parser.add_argument(
+    "--jobs",
+    type=int,
+    default=1,
+    help="number of worker processes for script extraction; 0 means one per CPU",
+)
+parser.add_argument("--cache-dir", dest="cache_dir", help="directory to cache extraction results in between runs")
+parser.add_argument(
+    "--exclude",
+    action="append",
+    default=[],
+    metavar="GLOB",
+    help="skip files and directories matching this glob, relative to SCRIPTS_DIR; may be repeated",
+)
+parser.add_argument(
+    "--no-gitignore",
+    dest="use_gitignore",
+    action="store_false",
+    help="also check scripts excluded by .gitignore files",
+)
+parser.add_argument(
+    "--changed-since",
+    dest="changed_since",
+    metavar="REF",
+    help="only check scripts affected by .ssl and .msg files changed since this git ref",
+)
+parser.add_argument(
+    "--metrics",
+    metavar="FILE",
+    help="write per-phase performance metrics to FILE as JSON, and to the GitHub job summary if there is one",
+)
+parser.add_argument(
+    "--profile",
+    metavar="DIR",
+    help="profile the run and write NAME.pstats and NAME.collapsed flamegraph stacks to DIR",
+)
 
 
 def get_generic_messages(file_path: str | Path) -> MessageList | None:
@@ -40,28 +125,169 @@ def get_generic_messages(file_path: str | Path) -> MessageList | None:
         file_path: Path to the generic.msg file
 
     Returns:
-        List of message IDs found in the file, or None if the file cannot be opened
+        List of message IDs defined in the file, in ID order, or None if the file cannot be opened
     """
-    g_dialog_messages: MessageList = []
-    try:
-        with open(file_path, encoding="cp1252") as fdialog:
-            for line in fdialog:
-                g_dialog_messages.extend(re.findall(r"\{([0-9]{3,5})\}", line))
-    except OSError:
-        return None
-    return g_dialog_messages
+    return read_msg_ids(file_path)
 
 
-def get_script_paths(dir_path: str | Path) -> list[Path]:
+def get_script_paths(dir_path: str | Path, exclude: tuple[str, ...] = (), use_gitignore: bool = True) -> list[Path]:
     """Find all .ssl script files in the given directory tree.
 
     Args:
         dir_path: Root directory to search for scripts
+        exclude: Globs of files and directories to skip, see tree_walker.walk_files()
+        use_gitignore: Skip what .gitignore files exclude
 
     Returns:
         List of paths to .ssl files
     """
-    return list(Path(dir_path).rglob("*.ssl"))
+    return [entry.path for entry in walk_files(dir_path, ".ssl", exclude, use_gitignore)]
+
+
+def _line_bounds(code: Code, pos: int) -> tuple[int, int]:
+    """Return the offsets of the start of the line holding pos and of its end, a newline or the end of code."""
+    line_end = code.find(b"\n", pos)
+    return code.rfind(b"\n", 0, pos) + 1, len(code) if line_end == -1 else line_end
+
+
+def _select_calls(code: Code, calls: list[Call]) -> list[Call]:
+    """Pick the calls that a `[^_]+`-prefixed findall over each line of code would report.
+
+    Message calls used to be matched line by line with patterns like `[^_]+display_mstr *(...)`.
+    The greedy prefix needs at least one non-underscore character before the call and extends up to
+    the next underscore, so in each underscore-free stretch of a line only the last call is reported,
+    and scanning resumes after the end of that call. This reproduces that result in a single linear
+    pass over all lines: the bounds of the current line are only looked up again once a call lies
+    past its end, so however many calls a line holds, its text is searched once.
+
+    Args:
+        code: Code the calls were found in, one or more lines
+        calls: Calls of a single kind, in code order
+
+    Returns:
+        Calls that the prefixed pattern would have reported, in code order
+    """
+    selected: list[Call] = []
+    pos = 0
+    line_start = 0
+    line_end = -1
+    i = 0
+    while i < len(calls):
+        start = calls[i][0]
+        if start > line_end:
+            line_start, line_end = _line_bounds(code, start)
+        if start <= max(pos, line_start) or code[start - 1] == ord("_"):
+            i += 1
+            continue
+        stretch_end = code.find(b"_", start, line_end)
+        if stretch_end == -1:
+            stretch_end = line_end
+        while i + 1 < len(calls) and calls[i + 1][0] < stretch_end:
+            i += 1
+        selected.append(calls[i])
+        pos = calls[i][1]
+        i += 1
+    return selected
+
+
+def _line_order(code: Code, calls: list[Call], rank: int) -> list[tuple[tuple[int, int, int], bytes]]:
+    """Key calls for sorting into line order, with calls of lower rank first within a line.
+
+    Args:
+        code: Code the calls were found in
+        calls: Calls in code order
+        rank: Rank of these calls within a line
+
+    Returns:
+        Sort key and message ID of each call, looking up each line's bounds once as in _select_calls()
+    """
+    keyed: list[tuple[tuple[int, int, int], bytes]] = []
+    line_start = 0
+    line_end = -1
+    for start, _, msg_id in calls:
+        if start > line_end:
+            line_start, line_end = _line_bounds(code, start)
+        keyed.append(((line_start, rank, start), msg_id))
+    return keyed
+
+
+def _scan_calls(code: Code) -> tuple[MessageList, MessageList, RangeList]:
+    """Extract script and generic message IDs and message ranges from code in one regex pass.
+
+    Only the offsets and IDs of calls are kept, not their regex matches, which take several times
+    the memory.
+
+    Args:
+        code: Code to analyze, one or more lines
+
+    Returns:
+        Tuple of (script message IDs, generic message IDs, script message ranges), in line order
+    """
+    msg_calls: list[Call] = []
+    mstr_calls: list[Call] = []
+    gen_calls: list[Call] = []
+    ranges: RangeList = []
+    for match in _MSG_CALL_REGEX.finditer(code):
+        if match["msg"]:
+            msg_calls.append((match.start(), match.end(), match["msg_id"]))
+        elif match["mstr"]:
+            mstr_calls.append((match.start(), match.end(), match["mstr_id"]))
+        elif match["rand"]:
+            # Every range call counts, unless it is the tail of a longer identifier like my_floater_rand
+            if match.start() == 0 or code[match.start() - 1] != ord("_"):
+                ranges.append((int(match["rand_lo"]), int(match["rand_hi"])))
+        else:
+            gen_calls.append((match.start(), match.end(), match["gen_id"]))
+
+    selected = _select_calls(code, msg_calls)
+    mstr_selected = _select_calls(code, mstr_calls)
+    if selected and mstr_selected:
+        # Each line reports its mstr() calls after its other message calls, as the old patterns did
+        ordered = sorted(_line_order(code, selected, 0) + _line_order(code, mstr_selected, 1))
+        messages = [msg_id.decode() for _, msg_id in ordered]
+    else:
+        messages = [msg_id.decode() for _, _, msg_id in selected]
+        messages.extend(msg_id.decode() for _, _, msg_id in mstr_selected)
+    gen_messages = [msg_id.decode() for _, _, msg_id in _select_calls(code, gen_calls)]
+    return messages, gen_messages, ranges
+
+
+def scan_line(line: str | bytes) -> tuple[MessageList, MessageList, RangeList]:
+    """Extract script and generic message IDs and message ranges from a line of script code in one pass.
+
+    Args:
+        line: Single line of script code to analyze; text is encoded as UTF-8 first
+
+    Returns:
+        Tuple of (script message IDs, generic message IDs, script message ranges) referenced in the line
+    """
+    if isinstance(line, str):
+        line = line.encode("utf-8", "surrogateescape")
+    return _scan_calls(line)
+
+
+def expand_ranges(ranges: Iterable[MessageRange]) -> MessageList:
+    """List every message ID of message ranges.
+
+    Args:
+        ranges: Message ranges; reversed ones are empty
+
+    Returns:
+        Message IDs in range order
+    """
+    return [str(msg_id) for first, last in ranges for msg_id in range(first, last + 1)]
+
+
+def format_ranges(ranges: Iterable[MessageRange]) -> str:
+    """Format message ranges compactly, like "150–162 170".
+
+    Args:
+        ranges: Message ranges
+
+    Returns:
+        Space-separated ranges, with single-ID ranges as plain IDs
+    """
+    return " ".join(str(first) if first == last else f"{first}\u2013{last}" for first, last in ranges)
 
 
 def get_script_messages(line: str) -> MessageList:
@@ -71,15 +297,10 @@ def get_script_messages(line: str) -> MessageList:
         line: Single line of script code to analyze
 
     Returns:
-        List of message IDs referenced in the line
+        List of message IDs referenced in the line, with ranges expanded
     """
-    messages = []
-    messages.extend(re.findall(_MSG_REGEX0, line))
-    messages.extend(re.findall(_MSG_REGEX1, line))
-    match = re.search(_MSG_REGEX2, line)
-    if match:
-        messages.extend([str(i) for i in range(int(match.group(1)), int(match.group(2)) + 1)])
-    return messages
+    messages, _, ranges = scan_line(line)
+    return messages + expand_ranges(ranges)
 
 
 def get_gen_messages(line: str) -> MessageList:
@@ -91,8 +312,7 @@ def get_gen_messages(line: str) -> MessageList:
     Returns:
         List of generic message IDs referenced in the line
     """
-    messages = re.findall(_MSG_REGEX_GEN, line)
-    return messages
+    return scan_line(line)[1]
 
 
 def get_dialog_path(script_text: str, script_path: str | Path, dialog_dir: str | Path) -> Path:
@@ -103,17 +323,32 @@ def get_dialog_path(script_text: str, script_path: str | Path, dialog_dir: str |
         script_path: Path to the script file
         dialog_dir: Directory containing dialog files
 
+    Returns:
+        Expected path to the corresponding .msg file
+    """
+    return dialog_path_for_name(scan_script(script_text.encode("utf-8"))[2], script_path, dialog_dir)
+
+
+def dialog_path_for_name(script_name: str | None, script_path: str | Path, dialog_dir: str | Path) -> Path:
+    """Determine the dialog file path from a script's NAME define.
+
+    Args:
+        script_name: Name from `#define NAME SCRIPT_...`, or None if the script has none
+        script_path: Path to the script file, used when there is no NAME define
+        dialog_dir: Directory containing dialog files
+
     Returns:
         Expected path to the corresponding .msg file
     """
     script_path = Path(script_path)
     dialog_dir = Path(dialog_dir)
 
-    match = re.search(r"#define NAME +SCRIPT_([A-Z0-9_]+)", script_text)
-    if not match:
+    if script_name is None:
         match = re.search(r".+/(.+)\.ssl", str(script_path))
-    if match:
-        return dialog_dir / (match.group(1).lower() + ".msg")
+        if match:
+            script_name = match.group(1)
+    if script_name is not None:
+        return dialog_dir / (script_name.lower() + ".msg")
     # Fallback to script filename if no match found
     return dialog_dir / (script_path.stem.lower() + ".msg")
 
@@ -125,16 +360,37 @@ def get_dialog_messages(dialog_path: str | Path) -> MessageList | None:
         dialog_path: Path to the .msg file
 
     Returns:
-        List of message IDs if file exists, None if file not found
+        List of message IDs defined in the file, in ID order, if file exists; None if file not found
+    """
+    return read_msg_ids(dialog_path)
+
+
+def scan_script(buffer: Buffer) -> MessageFacts:
+    """Extract message references and the NAME define from a whole script in one pass.
+
+    Comments and string literals are skipped, so commented-out calls are not reported.
+
+    Args:
+        buffer: Raw script contents
+
+    Returns:
+        Tuple of (script message IDs, generic message IDs, NAME define or None, script message ranges)
+    """
+    return scan_code(strip_code(buffer).code)
+
+
+def scan_code(code: Code) -> MessageFacts:
+    """Extract message references and the NAME define from script code.
+
+    Args:
+        code: Code of a script or header, from ssl_lexer.strip_code()
+
+    Returns:
+        Tuple of (script message IDs, generic message IDs, NAME define or None, script message ranges)
     """
-    dialog_messages: MessageList = []
-    try:
-        with open(dialog_path, encoding="cp1252") as fdialog:
-            for line in fdialog:
-                dialog_messages.extend(re.findall(r"\{([0-9]{3,5})\}", line))
-    except OSError:
-        return None
-    return dialog_messages
+    match = _NAME_REGEX.search(code)
+    script_messages, gen_messages, script_ranges = _scan_calls(code)
+    return script_messages, gen_messages, match[1].decode() if match else None, script_ranges
 
 
 def get_messages_from_file(script_text: str) -> MessageDict:
@@ -144,73 +400,312 @@ def get_messages_from_file(script_text: str) -> MessageDict:
         script_text: Full text content of the script
 
     Returns:
-        Dictionary with 'script' and 'gen' message lists
+        Dictionary with 'script' and 'gen' message lists, with ranges expanded
     """
-    script_messages: MessageList = []
-    gen_messages: MessageList = []
-    lines = re.sub(r"/\*.+?\*/", "", script_text, flags=re.DOTALL).split("\n")
-    for line in lines:
-        if line.lstrip().startswith("//"):
-            continue
-        messages = get_script_messages(line)
+    script_messages, gen_messages, _, ranges = scan_script(script_text.encode("utf-8"))
+    return {"script": script_messages + expand_ranges(ranges), "gen": gen_messages}
+
+
+def extract_script(script_path: Path) -> tuple[ScriptMessages, str]:
+    """Read a script and extract its own message references, NAME define and includes.
+
+    Args:
+        script_path: Path to the script file
+
+    Returns:
+        Tuple of (unique script and generic message IDs, the script name and resolved include paths,
+        content hash)
+    """
+    facts, includes, digest = scan_file(script_path, scan_code)
+    return script_messages_from_facts(facts, includes), digest
+
+
+def script_messages_from_facts(facts: MessageFacts, includes: list[str]) -> ScriptMessages:
+    """Build the extraction result of a script from the facts scan_code() found in it.
+
+    Args:
+        facts: Message references and NAME define of the script itself
+        includes: Resolved paths of directly included headers
+
+    Returns:
+        Extraction result with each message ID and range listed once
+    """
+    script_messages, gen_messages, script_name, ranges = facts
+    return ScriptMessages(
+        script=list(dict.fromkeys(script_messages)),
+        gen=list(dict.fromkeys(gen_messages)),
+        name=script_name,
+        includes=includes,
+        # Ranges read back from a JSON cache are lists
+        ranges=list(dict.fromkeys((first, last) for first, last in ranges)),
+    )
+
+
+def with_headers(result: ScriptMessages, header_facts: list[MessageFacts]) -> ScriptMessages:
+    """Add the message references and NAME define contributed by a script's included headers.
+
+    Args:
+        result: Extraction result for the script itself
+        header_facts: Facts of the script's headers, e.g. from IncludeResolver.header_facts()
+
+    Returns:
+        Effective result; the script's own NAME define takes precedence over headers
+    """
+    if not header_facts:
+        return result
+    script_messages = list(result.script)
+    gen_messages = list(result.gen)
+    script_ranges = list(result.ranges)
+    script_name = result.name
+    for messages, gen, name, ranges in header_facts:
         script_messages.extend(messages)
-        messages = get_gen_messages(line)
-        gen_messages.extend(messages)
-    return {"script": script_messages, "gen": gen_messages}
+        gen_messages.extend(gen)
+        script_ranges.extend((first, last) for first, last in ranges)
+        script_name = script_name or name
+    return ScriptMessages(
+        script=list(dict.fromkeys(script_messages)),
+        gen=list(dict.fromkeys(gen_messages)),
+        name=script_name,
+        includes=result.includes,
+        ranges=list(dict.fromkeys(script_ranges)),
+    )
 
 
-def main(argv: list[str] | None = None) -> None:
-    """Main entry point for dialog validation."""
-    args = parser.parse_args(argv)
-    dialog_dir = Path(args.DIALOG_DIR)
-    scripts_dir = Path(args.SCRIPTS_DIR)
+def _load_script_messages(facts: list) -> ScriptMessages:
+    """Rebuild an extraction result read back from a JSON cache, where tuples became lists."""
+    result = ScriptMessages(*facts)
+    return result._replace(ranges=[(first, last) for first, last in result.ranges])
 
-    g_dialog_path = dialog_dir / "generic.msg"
-    message_count = 0
 
-    # If generic.msg is missing, generic message validation is skipped
-    g_dialog_messages: MessageList = get_generic_messages(g_dialog_path) or []
+def extract_scripts(
+    scripts: Sequence[Path | FileEntry], jobs: int = 1, cache: ScanCache | None = None
+) -> list[ScriptMessages]:
+    """Extract message references from many scripts, optionally in a process pool.
 
-    script_paths = get_script_paths(scripts_dir)
-    found_missing = False
+    Args:
+        scripts: Scripts to extract from; walker entries spare stat calls
+        jobs: Number of worker processes; 0 means one per CPU
+        cache: Cache of earlier extraction results, updated with new ones
 
-    for script_path in script_paths:
-        script_messages = []
-        g_script_messages = []
+    Returns:
+        Extraction results, in the same order as scripts
+    """
+    return extract_paths(extract_script, scripts, jobs, cache, _load_script_messages)
 
-        with open(script_path, encoding="utf-8") as fhandle:
-            script_text = fhandle.read()
 
-        messages = get_messages_from_file(script_text)
-        script_messages.extend(messages["script"])
-        g_script_messages.extend(messages["gen"])
+def find_dialog_path(script_name: str | None, script_path: str | Path, msg_dir: MsgDir) -> Path | None:
+    """Find the dialog file of a script, ignoring the letter case of its file name.
 
-        script_messages = list(dict.fromkeys(script_messages))
-        g_script_messages = list(dict.fromkeys(g_script_messages))
+    Args:
+        script_name: Name from `#define NAME SCRIPT_...`, or None if the script has none
+        script_path: Path to the script file, used when there is no NAME define
+        msg_dir: Index of the dialog directory
 
-        cur_dialog_path = get_dialog_path(script_text, script_path, dialog_dir)
+    Returns:
+        Path of the .msg file, or None if the script has none
+    """
+    return msg_dir.find(dialog_path_for_name(script_name, script_path, msg_dir.path).name)
 
-        dialog_messages = get_dialog_messages(cur_dialog_path)
-        if dialog_messages is None:
-            continue
 
-        script_only = [item for item in script_messages if item not in dialog_messages]
-        if script_only:
-            print(f"Messages in {script_path} missing from {cur_dialog_path}: {' '.join(script_only)}")
-            found_missing = True
-        message_count += len(script_messages)
+def get_msg_dependents(
+    script_paths: list[Path], results: list[ScriptMessages], msg_dir: MsgDir
+) -> dict[Path, list[Path]]:
+    """Build the reverse index from .msg files to the scripts checked against them.
+
+    Args:
+        script_paths: Scripts, in the same order as results
+        results: Extraction results, with header facts added by with_headers()
+        msg_dir: Index of the dialog directory
+
+    Returns:
+        Map of .msg path to scripts using it; generic.msg maps to scripts with generic messages
+    """
+    g_dialog_path = msg_dir.find("generic.msg") or msg_dir.path / "generic.msg"
+    dependents: defaultdict[Path, list[Path]] = defaultdict(list)
+    for script_path, result in zip(script_paths, results, strict=True):
+        dialog_path = find_dialog_path(result.name, script_path, msg_dir)
+        if dialog_path is not None:
+            dependents[dialog_path].append(script_path)
+        if result.gen:
+            dependents[g_dialog_path].append(script_path)
+    return dict(dependents)
+
+
+def extract_changed_scripts(
+    script_paths: list[Path],
+    msg_dir: MsgDir,
+    changed: ChangedFiles,
+    resolver: IncludeResolver[MessageFacts],
+    extract: Callable[[list[Path]], list[ScriptMessages]] = extract_scripts,
+) -> tuple[list[Path], list[ScriptMessages]]:
+    """Select and extract the scripts affected by changed files.
+
+    A changed script affects only itself; a changed .msg file affects every script checked
+    against it, and a changed header every script including it. Scripts are only all extracted
+    when some .msg file or header changed, since that needs the reverse indexes.
+
+    Args:
+        script_paths: All scripts
+        msg_dir: Index of the dialog directory
+        changed: Resolved paths of changed files
+        resolver: Include resolver used to find the headers of each script
+        extract: Extraction function, e.g. extract_scripts() bound to a job count and cache
+
+    Returns:
+        Tuple of (affected scripts, their extraction results), in script_paths order
+    """
+    changed_scripts = [script_path for script_path in script_paths if script_path.resolve() in changed]
+    changed_msgs = {path for path in changed if path.suffix.lower() == ".msg"}
+    changed_headers = {str(path) for path in changed if path.suffix.lower() == ".h"}
+    if not changed_msgs and not changed_headers:
+        return changed_scripts, extract(changed_scripts)
+
+    results = extract(script_paths)
+    effective = [with_headers(result, resolver.header_facts(result.includes)) for result in results]
+    selected = set(changed_scripts)
+    for msg_path, dependents in get_msg_dependents(script_paths, effective, msg_dir).items():
+        if msg_path.resolve() in changed_msgs:
+            selected.update(dependents)
+    if changed_headers:
+        for script_path, result in zip(script_paths, results, strict=True):
+            if not changed_headers.isdisjoint(resolver.headers(result.includes)):
+                selected.add(script_path)
+    keep = [i for i, script_path in enumerate(script_paths) if script_path in selected]
+    return [script_paths[i] for i in keep], [results[i] for i in keep]
+
+
+def report_msg_problems(msg_paths: Iterable[Path], msg_index: MsgIndex) -> bool:
+    """Print the duplicate and malformed entries of .msg files.
+
+    Args:
+        msg_paths: .msg files to report on
+        msg_index: Index of message IDs defined in .msg files
+
+    Returns:
+        True if some file has problems, False otherwise
+    """
+    found_problems = False
+    for msg_path in sorted(msg_paths):
+        for problem in msg_index.problems(msg_path):
+            print(f"{msg_path}, line {problem.line}: {problem.message}")
+            found_problems = True
+    return found_problems
 
-        g_script_only = [item for item in g_script_messages if item not in g_dialog_messages]
+
+def check_messages(
+    script_paths: list[Path], results: list[ScriptMessages], msg_dir: MsgDir, msg_index: MsgIndex
+) -> MessageCheck:
+    """Search .msg files for the messages referenced by scripts.
+
+    Scripts without a .msg file of their own are not checked, but counted. Duplicate and
+    malformed entries of the .msg files searched are reported after the missing messages.
+
+    Args:
+        script_paths: Scripts, in the same order as results
+        results: Extraction results, with header facts added by with_headers()
+        msg_dir: Index of the dialog directory
+        msg_index: Index of message IDs defined in .msg files
+
+    Returns:
+        Outcome of the check
+    """
+    # A missing generic.msg is still reported by path, see below
+    g_dialog_path = msg_dir.find("generic.msg") or msg_dir.path / "generic.msg"
+    message_count = 0
+    without_msg = 0
+    found_missing = False
+    msg_paths: set[Path] = set()
+
+    for script_path, result in zip(script_paths, results, strict=True):
+        script_messages, g_script_messages, script_name, _, script_ranges = result
+        cur_dialog_path = find_dialog_path(script_name, script_path, msg_dir)
+        script_only = msg_index.missing(cur_dialog_path, script_messages) if cur_dialog_path else None
+        if script_only is None:
+            without_msg += 1
+            continue
+        msg_paths.add(cur_dialog_path)
+
+        ranges_only = msg_index.missing_ranges(cur_dialog_path, script_ranges) or []
+        # IDs inside a missing range are reported once, as part of the range
+        script_only = [
+            msg_id for msg_id in script_only if not any(first <= int(msg_id) <= last for first, last in ranges_only)
+        ]
+        if script_only or ranges_only:
+            missing_str = " ".join(filter(None, [" ".join(script_only), format_ranges(ranges_only)]))
+            print(f"Messages in {script_path} missing from {cur_dialog_path}: {missing_str}")
+            found_missing = True
+        message_count += len(script_messages) + sum(last - first + 1 for first, last in merge_ranges(script_ranges))
+
+        # A missing generic.msg defines no messages, so every generic reference is reported
+        g_script_only = msg_index.missing(g_dialog_path, g_script_messages)
+        if g_script_only is None:
+            g_script_only = g_script_messages
+        elif g_script_messages:
+            msg_paths.add(g_dialog_path)
         if g_script_only:
             print(f"Generic messages in {script_path} missing from {g_dialog_path}: {' '.join(g_script_only)}")
             found_missing = True
 
         message_count += len(g_script_messages)
+    found_malformed = report_msg_problems(msg_paths, msg_index)
+    return MessageCheck(found_missing, message_count, without_msg, found_malformed)
+
+
+def print_totals(check: MessageCheck) -> None:
+    """Print the statistics of a message check."""
+    print(f"Messages checked: {check.message_count}")
+    print(f"Scripts without a .msg file: {check.without_msg}")
 
-    print(f"Messages checked: {message_count}")
 
-    if found_missing:
-        sys.exit(1)
+def main(argv: list[str] | None = None, metrics: Metrics | None = None) -> None:
+    """Main entry point for dialog validation.
+
+    Args:
+        argv: Command line arguments; sys.argv[1:] if None
+        metrics: Collector to record phase metrics in, e.g. shared by action.py; by default a new
+            one, written out if --metrics is given
+    """
+    args = parser.parse_args(argv)
+    with profiled(args.profile, "msgs"):
+        dialog_dir = Path(args.DIALOG_DIR)
+        scripts_dir = Path(args.SCRIPTS_DIR)
+        metrics = metrics or Metrics()
+
+        msg_index = MsgIndex(ScanCache(args.cache_dir, "msg"))
+        cache = ScanCache(args.cache_dir, "dialogs")
+        resolver = IncludeResolver(scan_code)
+
+        changed = changed_since(args.changed_since, scripts_dir)
+        with metrics.phase("msgs", "walk") as walk:
+            msg_dir = MsgDir(dialog_dir)
+            entries = walk_files(scripts_dir, ".ssl", tuple(args.exclude), args.use_gitignore)
+            walk.files += len(entries)
+        script_paths = [entry.path for entry in entries]
+        with metrics.phase("msgs", "extract") as extract:
+            if changed is None:
+                results = extract_scripts(entries, args.jobs, cache)
+                extract.add_files(entries)
+            else:
+                script_paths, results = extract_changed_scripts(
+                    script_paths, msg_dir, changed, resolver, partial(extract_scripts, jobs=args.jobs, cache=cache)
+                )
+                selected = set(script_paths)
+                extract.add_files(entry for entry in entries if entry.path in selected)
+            effective = [with_headers(result, resolver.header_facts(result.includes)) for result in results]
+            extract.add_cache(cache)
+        with metrics.phase("msgs", "check") as check_stats:
+            check = check_messages(script_paths, effective, msg_dir, msg_index)
+            check_stats.files += len(script_paths)
+            check_stats.add_cache(msg_index.cache)
+
+        cache.save(evict=changed is None)
+        msg_index.cache.save(evict=changed is None)
+        print_totals(check)
+
+        if args.metrics:
+            metrics.write(args.metrics)
+        if check.failed:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+"""Merkle fingerprints of the inputs of each validator, to skip validators whose inputs are unchanged.
+
+A validator's fingerprint hashes its settings, the validators' own code and every file it reads.
+A directory tree hashes like a Merkle tree: each file by its content, each directory by the
+names and hashes of its entries. Content hashes are cached by size and mtime, so unchanged files
+are only statted, and are hashed again only when a fresh checkout gives them new mtimes.
+
+The store keeps the fingerprint of each validator's last passing run in the cache directory. A
+validator whose fingerprint still matches would pass again, so it can be skipped.
+"""
+
+from collections.abc import Iterable
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from scan_cache import file_hash
+from tree_walker import walk_files
+
+# Bump when the stored format changes, to discard stores written by older versions
+STORE_VERSION = 1
+
+# The validators' code: a changed validator may judge unchanged inputs differently
+_CODE_DIR = Path(__file__).resolve().parent
+
+
+class Tree(NamedTuple):
+    """Files of a directory with some suffixes, hashed as one Merkle tree."""
+
+    root: Path
+    suffixes: tuple[str, ...]  # Lower-case file name suffixes, e.g. (".ssl", ".h")
+    recursive: bool = True  # Descend into subdirectories, pruning excluded ones like tree_walker.walk_files()
+    exclude: tuple[str, ...] = ()
+    use_gitignore: bool = True
+
+
+class Inputs(NamedTuple):
+    """Everything a validator's result depends on."""
+
+    settings: tuple[str, ...]  # Validator name and options, in a fixed order
+    files: tuple[Path | None, ...] = ()  # Single files; None or a missing file hashes as missing
+    trees: tuple[Tree, ...] = ()
+
+
+def _node_hash(node: dict[str, Any]) -> str:
+    """Hash a directory node: the names and hashes of its entries, sorted by name."""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(node):
+        child = node[name]
+        digest.update(f"{name}\0{child if isinstance(child, str) else _node_hash(child)}\n".encode())
+    return digest.hexdigest()
+
+
+def _digest(parts: Iterable[str]) -> str:
+    """Hash a sequence of strings."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode() + b"\n")
+    return digest.hexdigest()
+
+
+class FingerprintStore:
+    """Fingerprints of passing runs and the content hashes they were computed from, kept between runs.
+
+    Each file and tree is hashed once per store, so that a fingerprint recorded after a run describes
+    the inputs as they were when the run started.
+    """
+
+    def __init__(self, cache_dir: str | Path) -> None:
+        self.path = Path(cache_dir) / "fingerprints.json"
+        self.hashed = 0  # Files whose content was hashed, rather than taken from the store
+        self._hashes: dict[str, list] = {}  # [size, mtime_ns, hash] by path
+        self._passed: dict[str, dict[str, Any]] = {}  # {"fingerprint": str, "files": [path]} by validator
+        try:
+            with open(self.path, encoding="utf-8") as fhandle:
+                data = json.load(fhandle)
+        except (OSError, ValueError):
+            data = None
+        if isinstance(data, dict) and data.get("version") == STORE_VERSION:
+            self._hashes = data.get("hashes", {})
+            self._passed = data.get("passed", {})
+        self._used: dict[str, list] = {}
+        self._files: dict[str, str] = {}
+        self._trees: dict[Tree, str] = {}
+
+    def file_hash(self, path: Path | str, stat: os.stat_result | None = None) -> str:
+        """Return the content hash of a file, or "missing" if it does not exist.
+
+        Args:
+            path: Path to the file
+            stat: Stat info of the file if already known, e.g. from tree_walker.walk_files()
+
+        Returns:
+            Hex digest of the file contents
+        """
+        key = str(path)
+        if key in self._files:
+            return self._files[key]
+        try:
+            stat = stat or os.stat(path)
+        except OSError:
+            self._files[key] = "missing"
+            return "missing"
+        entry = self._hashes.get(key)
+        if entry is None or entry[:2] != [stat.st_size, stat.st_mtime_ns]:
+            entry = [stat.st_size, stat.st_mtime_ns, file_hash(path)]
+            self.hashed += 1
+        self._used[key] = entry
+        self._files[key] = entry[2]
+        return entry[2]
+
+    def tree_hash(self, tree: Tree) -> str:
+        """Return the Merkle hash of a directory tree's files with the tree's suffixes.
+
+        Args:
+            tree: Directory and file selection
+
+        Returns:
+            Hex digest; an empty or missing directory hashes like an empty node
+        """
+        if tree not in self._trees:
+            if tree.recursive:
+                entries = list(walk_files(tree.root, "", tree.exclude, tree.use_gitignore))
+            else:
+                try:
+                    with os.scandir(tree.root) as scan:
+                        entries = [(Path(entry.path), entry.stat()) for entry in scan if entry.is_file()]
+                except OSError:
+                    entries = []
+            root: dict[str, Any] = {}
+            for path, stat in entries:
+                if not path.name.lower().endswith(tree.suffixes):
+                    continue
+                *dirs, name = path.relative_to(tree.root).parts
+                node = root
+                for part in dirs:
+                    node = node.setdefault(part, {})
+                node[name] = self.file_hash(path, stat)
+            self._trees[tree] = _node_hash(root)
+        return self._trees[tree]
+
+    def fingerprint(self, inputs: Inputs, extra_files: Iterable[str] = ()) -> str:
+        """Return the fingerprint of a validator's inputs.
+
+        Args:
+            inputs: Settings, files and trees the validator reads
+            extra_files: More files it read, found only while running, e.g. headers outside its trees
+
+        Returns:
+            Hex digest
+        """
+        code = self.tree_hash(Tree(_CODE_DIR, (".py",), recursive=False))
+        files = [f"{path}\0{self.file_hash(path) if path is not None else 'missing'}" for path in inputs.files]
+        trees = [f"{tree.root}\0{self.tree_hash(tree)}" for tree in inputs.trees]
+        extra = [f"{path}\0{self.file_hash(path)}" for path in sorted(extra_files)]
+        return _digest([code, *inputs.settings, *files, *trees, *extra])
+
+    def unchanged(self, name: str, inputs: Inputs) -> bool:
+        """Check whether a validator's inputs match those of its last passing run.
+
+        Args:
+            name: Validator name
+            inputs: Settings, files and trees it reads
+
+        Returns:
+            True if the validator passed on the same inputs before, False otherwise
+        """
+        record = self._passed.get(name)
+        return record is not None and self.fingerprint(inputs, record["files"]) == record["fingerprint"]
+
+    def record(self, name: str, inputs: Inputs, passed: bool, extra_files: Iterable[str] = ()) -> None:
+        """Store the outcome of a validator's run.
+
+        Args:
+            name: Validator name
+            inputs: Settings, files and trees it read
+            passed: Whether it passed; only passing runs are remembered
+            extra_files: More files it read, found only while running
+        """
+        if passed:
+            extra = sorted(extra_files)
+            self._passed[name] = {"fingerprint": self.fingerprint(inputs, extra), "files": extra}
+        else:
+            self._passed.pop(name, None)
+
+    def save(self) -> None:
+        """Write the store to disk, keeping the hashes of only the files looked at in this run."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        data = {"version": STORE_VERSION, "hashes": self._used, "passed": self._passed}
+        with open(tmp_path, "w", encoding="utf-8") as fhandle:
+            json.dump(data, fhandle, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
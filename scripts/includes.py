@@ -0,0 +1,204 @@
+"""Include graph resolution for .ssl scripts with memoized per-header facts.
+
+Scripts pull defines and message calls from `#include`d headers, and the same headers are
+included by hundreds of scripts. IncludeResolver scans each header once per run with a
+validator-specific scan function and serves the facts of a script's whole include closure
+from memory. Quoted include paths are resolved relative to the including file, like sslc does;
+Windows-style separators and letter case differences are tolerated. An include that does not
+resolve is kept as the path it would have, so that cached scripts and fingerprints notice when the
+header is created.
+"""
+
+from collections.abc import Callable, Iterable
+import os
+from pathlib import Path
+import re
+from typing import NamedTuple
+
+from mapped_file import Buffer
+from scan_cache import ScanCache, content_hash
+from ssl_lexer import strip_code
+
+# Type alias for script code with comments blanked and string literals emptied, by ssl_lexer.strip_code()
+Code = bytes | bytearray
+
+_INCLUDE_REGEX = re.compile(rb"\s*#\s*include\s*")
+
+
+class ScannedFile[T](NamedTuple):
+    """Facts of a script or header file and what they depend on."""
+
+    facts: T
+    includes: list[str]  # Resolved include paths, or the paths missing ones would have
+    digest: str  # scan_cache.content_hash() of the contents read, for ScanCache.put()
+
+
+def scan_with_includes[T](buffer: Buffer, scan: Callable[[Code], T]) -> tuple[T, list[str]]:
+    """Scan a script and collect its quoted #include paths from the same lexing pass.
+
+    Args:
+        buffer: Script contents as read from the file
+        scan: Function extracting facts from the script's code
+
+    Returns:
+        Tuple of (facts returned by scan, include paths as written)
+    """
+    code, strings = strip_code(buffer)
+    includes: list[str] = []
+    for offset, text in strings:
+        # An include path is the string literal right after #include, at the start of its line
+        if _INCLUDE_REGEX.fullmatch(code, code.rfind(b"\n", 0, offset) + 1, offset):
+            includes.append(text[1:].rstrip(b'"').decode("utf-8", "replace"))
+    facts = scan(code)
+    return facts, includes
+
+
+def _find_case_insensitive(base: Path, parts: list[str]) -> Path | None:
+    """Find a relative path under base, matching each component case-insensitively."""
+    current = base
+    for part in parts:
+        if part in ("", "."):
+            continue
+        if part == "..":
+            current = current.parent
+            continue
+        try:
+            names = {entry.lower(): entry for entry in os.listdir(current)}
+        except OSError:
+            return None
+        if part.lower() not in names:
+            return None
+        current = current / names[part.lower()]
+    return current if current.is_file() else None
+
+
+def _resolve_include(name: str, including_path: str | Path) -> tuple[str, bool]:
+    """Resolve a quoted include path to a string, without building Path objects in the common case.
+
+    Returns the resolved path and True, or the path the file would have and False if it does not exist.
+    """
+    name = name.replace("\\", "/")
+    base = os.path.dirname(including_path)
+    candidate = os.path.join(base, name)
+    if os.path.isfile(candidate):
+        return os.path.realpath(candidate), True
+    found = _find_case_insensitive(Path(base), name.split("/"))
+    if found is not None:
+        return str(found.resolve()), True
+    return os.path.realpath(candidate), False
+
+
+def resolve_include(name: str, including_path: str | Path) -> Path | None:
+    """Resolve a quoted include path.
+
+    Args:
+        name: Path as written in the #include directive
+        including_path: File containing the directive
+
+    Returns:
+        Resolved path of the included file, or None if it does not exist
+    """
+    resolved, exists = _resolve_include(name, including_path)
+    return Path(resolved) if exists else None
+
+
+def scan_file[T](file_path: str | Path, scan: Callable[[Code], T]) -> ScannedFile[T]:
+    """Scan a script or header file, resolve its includes and hash what was read.
+
+    Args:
+        file_path: Path to the file
+        scan: Function extracting facts from the file's code
+
+    Returns:
+        Facts returned by scan, resolved include paths and content hash; an include that does not
+        resolve is kept as the path it would have, so that a header created later is looked for
+    """
+    # Read rather than map: stripping copies the code anyway, and scripts are small
+    with open(file_path, "rb") as fhandle:
+        data = fhandle.read()
+    facts, names = scan_with_includes(data, scan)
+    return ScannedFile(facts, [_resolve_include(name, file_path)[0] for name in names], content_hash(data))
+
+
+class IncludeResolver[T]:
+    """Facts contributed by included headers, with each header scanned at most once."""
+
+    def __init__(self, scan: Callable[[Code], T], cache: ScanCache | None = None) -> None:
+        """Create a resolver.
+
+        Args:
+            scan: Function extracting facts from the code of a header
+            cache: Cache of header facts and includes from earlier runs, updated with new ones
+        """
+        self._scan = scan
+        self._cache = cache or ScanCache(None, "headers")
+        self._headers: dict[str, tuple[T, list[str]] | None] = {}
+        self._found: dict[str, str | None] = {}  # Header in other letter case, or None, by missing path
+
+    def _header(self, header_path: str) -> tuple[T, list[str]] | None:
+        """Return the facts and includes of one header, scanning it on first use."""
+        if header_path not in self._headers:
+            header = self._cache.get(header_path)
+            if header is None:
+                try:
+                    facts, includes, digest = scan_file(header_path, self._scan)
+                except OSError:
+                    header = None
+                else:
+                    header = (facts, includes)
+                    self._cache.put(header_path, header, digest=digest)
+            self._headers[header_path] = header
+        return self._headers[header_path]
+
+    def _find_missing(self, header_path: str) -> str | None:
+        """Look for a missing header in other letter case; it may have been created since it was included."""
+        if header_path not in self._found:
+            path = Path(header_path)
+            found = _find_case_insensitive(Path(path.anchor), list(path.parts[1:]))
+            self._found[header_path] = str(found.resolve()) if found is not None else None
+        return self._found[header_path]
+
+    def headers(self, includes: Iterable[str]) -> list[str]:
+        """Return every header reachable from the given includes.
+
+        Args:
+            includes: Resolved include paths of a script
+
+        Returns:
+            Header paths in preprocessor order, each once, including those that do not exist; include
+            cycles are cut
+        """
+        seen: dict[str, None] = {}
+
+        def visit(header_path: str) -> None:
+            if header_path in seen:
+                return
+            seen[header_path] = None
+            header = self._header(header_path)
+            if header is not None:
+                for nested in header[1]:
+                    visit(nested)
+            else:
+                found = self._find_missing(header_path)
+                if found is not None:
+                    visit(found)
+
+        for header_path in includes:
+            visit(header_path)
+        return list(seen)
+
+    def header_facts(self, includes: Iterable[str]) -> list[T]:
+        """Return the facts of every header reachable from the given includes.
+
+        Args:
+            includes: Resolved include paths of a script
+
+        Returns:
+            Facts of each readable header, in preprocessor order
+        """
+        facts: list[T] = []
+        for header_path in self.headers(includes):
+            header = self._header(header_path)
+            if header is not None:
+                facts.append(header[0])
+        return facts
@@ -0,0 +1,94 @@
+"""Git-aware selection of inputs changed since a ref, for incremental validation.
+
+Validators given --changed-since only revalidate what depends on the files git reports as
+changed: committed since the ref, staged, unstaged or untracked.
+"""
+
+from collections.abc import Iterable
+from pathlib import Path
+import subprocess
+import sys
+
+# Type alias for a set of resolved paths of changed files
+ChangedFiles = set[Path]
+
+
+def _git(args: list[str], cwd: Path) -> list[str]:
+    """Run a git command and return its non-empty output lines."""
+    result = subprocess.run(["git", "-C", str(cwd), *args], check=True, capture_output=True, text=True)
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def changed_files(ref: str, cwd: str | Path = ".") -> ChangedFiles:
+    """Ask git which files changed since a ref.
+
+    Args:
+        ref: Git ref to compare the working tree against, e.g. "origin/main" or "HEAD"
+        cwd: Any path inside the repository
+
+    Returns:
+        Resolved paths of changed, deleted and untracked files
+
+    Raises:
+        subprocess.CalledProcessError: If git fails, e.g. outside a repository or for an unknown ref
+    """
+    cwd = Path(cwd)
+    if not cwd.is_dir():
+        cwd = cwd.parent
+    top = Path(_git(["rev-parse", "--show-toplevel"], cwd)[0])
+    names = _git(["diff", "--name-only", "--no-renames", ref, "--"], cwd)
+    names += _git(["ls-files", "--others", "--exclude-standard"], top)
+    return {(top / name).resolve() for name in names}
+
+
+def changed_since(ref: str | None, cwd: str | Path = ".") -> ChangedFiles | None:
+    """Resolve a --changed-since argument for a validator entry point.
+
+    Args:
+        ref: Git ref from the command line, or None for a full run
+        cwd: Any path inside the repository
+
+    Returns:
+        Changed files, or None for a full run; exits with code 1 if git fails
+    """
+    if not ref:
+        return None
+    try:
+        return changed_files(ref, cwd)
+    except (OSError, subprocess.CalledProcessError) as error:
+        stderr = getattr(error, "stderr", None) or str(error)
+        print(f"Cannot list files changed since {ref}: {stderr.strip()}")
+        sys.exit(1)
+
+
+def any_changed(paths: Iterable[str | Path | None], changed: ChangedFiles | None) -> bool:
+    """Return whether any of the given input files changed.
+
+    Args:
+        paths: Input file paths; None entries are ignored
+        changed: Changed files, or None for a full run, in which case everything counts as changed
+
+    Returns:
+        True if a full run was requested or any of the paths is among the changed files
+    """
+    if changed is None:
+        return True
+    return any(Path(path).resolve() in changed for path in paths if path is not None)
+
+
+def any_changed_under(directory: str | Path | None, changed: ChangedFiles | None) -> bool:
+    """Return whether any file in a directory tree changed.
+
+    Args:
+        directory: Directory to look in, or None for no directory
+        changed: Changed files, or None for a full run, in which case everything counts as changed
+
+    Returns:
+        True if a full run was requested or any changed file is under the directory
+    """
+    if changed is None:
+        return True
+    if directory is None:
+        return False
+    root = Path(directory).resolve()
+    return any(path.is_relative_to(root) for path in changed)
@@ -3,17 +3,30 @@
 
 This module ensures that scripts don't use more local variables (LVARs)
 than allocated in scripts.lst, preventing runtime errors.
-Only scripts.lst uses cp1252 encoding; .ssl script files are UTF-8/ASCII.
+Only scripts.lst uses cp1252 encoding; .ssl script files are scanned as raw bytes.
 """
 
 import argparse
+from collections.abc import Iterable
 from pathlib import Path
 import re
 import sys
 
+from includes import Code, IncludeResolver, scan_file
+from incremental import any_changed, changed_since
+from metrics import Metrics
+from profiling import profiled
+from scan_cache import ScanCache
+from script_registry import ScriptRegistry
+from ssl_lexer import strip_code
+from tree_walker import walk_files
+
 # Type alias for local variable mapping
 LVarMap = dict[str, int]  # Maps script name to number of local variables
 
+# LVAR define on a line of code; only the whitespace after the index may be the line ending
+_LVAR_REGEX = re.compile(rb"^#define[^\S\n]+LVAR_\w+[^\S\n]+\((\d+)\)\s", re.MULTILINE)
+
 parser = argparse.ArgumentParser(
     description="Check if there are enough LVARs allowed in scripts.lst",
     formatter_class=argparse.ArgumentDefaultsHelpFormatter,
@@ -21,6 +34,36 @@ parser = argparse.ArgumentParser(
 
 parser.add_argument("SCRIPTS_DIR", help="scripts directory path")
 parser.add_argument("SCRIPTS_LST", help="scripts.lst path")
+parser.add_argument("--cache-dir", dest="cache_dir", help="directory to cache extraction results in between runs")
+parser.add_argument(
+    "--exclude",
+    action="append",
+    default=[],
+    metavar="GLOB",
+    help="skip files and directories matching this glob, relative to SCRIPTS_DIR; may be repeated",
+)
+parser.add_argument(
+    "--no-gitignore",
+    dest="use_gitignore",
+    action="store_false",
+    help="also check scripts excluded by .gitignore files",
+)
+parser.add_argument(
+    "--changed-since",
+    dest="changed_since",
+    metavar="REF",
+    help="only check scripts changed since this git ref, or all of them if scripts.lst changed",
+)
+parser.add_argument(
+    "--metrics",
+    metavar="FILE",
+    help="write per-phase performance metrics to FILE as JSON, and to the GitHub job summary if there is one",
+)
+parser.add_argument(
+    "--profile",
+    metavar="DIR",
+    help="profile the run and write NAME.pstats and NAME.collapsed flamegraph stacks to DIR",
+)
 
 
 def get_lvars_map(scripts_lst_path: str | Path) -> LVarMap:
@@ -32,66 +75,134 @@ def get_lvars_map(scripts_lst_path: str | Path) -> LVarMap:
     Returns:
         Dictionary mapping script names to their allocated local variable count
     """
-    lvars: LVarMap = {}
-    with open(scripts_lst_path, encoding="utf-8") as fhandle:
-        for line in fhandle:
-            match = re.match(r"^(\w+)\.int.*local_vars=(\d+)", line)
-            if match:
-                name = match[1].lower()
-                num_lvars = int(match[2])
-                if name not in lvars:  # scripts.lst uses first entry
-                    lvars[name] = num_lvars
-    return lvars
+    return ScriptRegistry.load(None, scripts_lst_path).lvars_by_name()
+
+
+def get_lvar_index(code: Code) -> int | None:
+    """Find the maximum LVAR index defined in script code.
+
+    Args:
+        code: Code of a script or header, from ssl_lexer.strip_code()
+
+    Returns:
+        Maximum LVAR index, or None if no LVAR is defined
+    """
+    indexes = _LVAR_REGEX.findall(code)
+    return max(map(int, indexes)) if indexes else None
 
 
 def get_max_lvar(fpath: str | Path) -> int:
     """Find the maximum LVAR index used in a script file.
 
+    Only the file itself is scanned; see main() for LVARs defined in included headers.
+
     Args:
         fpath: Path to the script file to analyze
 
     Returns:
         Maximum number of local variables needed (0 if none found)
     """
-    max_lvar: int = 0
-    found_lvar: bool = False
-    with open(fpath, encoding="utf-8") as fhandle:
-        for fline in fhandle:
-            match = re.match(r"^#define\s+LVAR_\w+\s+\((\d+)\)\s+.*", fline)
-            if match:
-                found_lvar = True
-                cur_lvar = int(match[1])
-                max_lvar = max(max_lvar, cur_lvar)
+    # Read rather than map: stripping copies the code anyway
+    with open(fpath, "rb") as fhandle:
+        max_index = get_lvar_index(strip_code(fhandle.read()).code)
+
+    # LVAR index starts from 0, so variable count is max index + 1
+    return 0 if max_index is None else max_index + 1
+
+
+def lvar_count(max_index: int | None, header_indexes: Iterable[int | None]) -> int:
+    """Count the LVARs a script needs, including those defined in its included headers.
+
+    Args:
+        max_index: Maximum LVAR index defined in the script itself
+        header_indexes: Maximum LVAR index defined in each included header
 
+    Returns:
+        Number of local variables needed (0 if none defined)
+    """
+    indexes = [index for index in [max_index, *header_indexes] if index is not None]
     # LVAR index starts from 0, so variable count is max index + 1
-    if found_lvar:
-        max_lvar += 1
+    return max(indexes) + 1 if indexes else 0
+
 
-    return max_lvar
+def check_lvar_count(lvars: LVarMap, script_name: str, max_lvar: int) -> bool:
+    """Check a script's LVAR count against its scripts.lst allocation.
 
+    Args:
+        lvars: Allocations from scripts.lst
+        script_name: Script file name without extension
+        max_lvar: Number of local variables the script needs
+
+    Returns:
+        True if the script needs more variables than allowed, False otherwise
+    """
+    if script_name in lvars and lvars[script_name] < max_lvar:
+        print(
+            f"Script {script_name} max LVAR index is {max_lvar - 1}, "
+            f"which requires {max_lvar} variables, "
+            f"but scripts.lst only allows {lvars[script_name]}."
+        )
+        return True
+    return False
 
-def main(argv: list[str] | None = None) -> None:
-    """Main entry point for LVAR validation."""
+
+def main(argv: list[str] | None = None, metrics: Metrics | None = None) -> None:
+    """Main entry point for LVAR validation.
+
+    Args:
+        argv: Command line arguments; sys.argv[1:] if None
+        metrics: Collector to record phase metrics in, e.g. shared by action.py; by default a new
+            one, written out if --metrics is given
+    """
     args = parser.parse_args(argv)
-    scripts_dir = Path(args.SCRIPTS_DIR)
-    scripts_lst_path = Path(args.SCRIPTS_LST)
-
-    lvars = get_lvars_map(scripts_lst_path)
-    found_mismatch = False
-
-    for ssl_path in scripts_dir.rglob("*.ssl"):
-        max_lvar = get_max_lvar(ssl_path)
-        script_name = ssl_path.stem
-        if script_name in lvars and lvars[script_name] < max_lvar:
-            print(
-                f"Script {script_name} max LVAR index is {max_lvar - 1}, "
-                f"which requires {max_lvar} variables, "
-                f"but scripts.lst only allows {lvars[script_name]}."
-            )
-            found_mismatch = True
-
-    if found_mismatch:
-        sys.exit(1)
+    with profiled(args.profile, "lvars"):
+        scripts_dir = Path(args.SCRIPTS_DIR)
+        scripts_lst_path = Path(args.SCRIPTS_LST)
+        metrics = metrics or Metrics()
+
+        changed = changed_since(args.changed_since, scripts_dir)
+        cache = ScanCache(args.cache_dir, "lvars")
+        resolver = IncludeResolver(get_lvar_index)
+        found_mismatch = False
+
+        with metrics.phase("lvars", "walk") as walk:
+            entries = walk_files(scripts_dir, ".ssl", tuple(args.exclude), args.use_gitignore)
+            walk.files += len(entries)
+        with metrics.phase("lvars", "parse") as parse:
+            lvars = ScriptRegistry.load(None, scripts_lst_path).lvars_by_name()
+            parse.add_files([scripts_lst_path])
+        check_all = any_changed([scripts_lst_path], changed)
+        # Without header changes, unchanged scripts can be skipped before reading them
+        headers_changed = changed is not None and any(path.suffix.lower() == ".h" for path in changed)
+        with metrics.phase("lvars", "extract") as extract:
+            if not check_all and not headers_changed:
+                entries = [entry for entry in entries if any_changed([entry.path], changed)]
+            extracted: list[tuple[Path, int | None, list[str]]] = []
+            for ssl_path, stat in entries:
+                facts = cache.get(ssl_path, stat)
+                if facts is None:
+                    max_index, includes, digest = scan_file(ssl_path, get_lvar_index)
+                    facts = (max_index, includes)
+                    cache.put(ssl_path, facts, stat, digest)
+                extracted.append((ssl_path, *facts))
+            extract.add_files(entries)
+
+        with metrics.phase("lvars", "check") as check:
+            for ssl_path, max_index, includes in extracted:
+                if not check_all and not any_changed([ssl_path, *resolver.headers(includes)], changed):
+                    continue
+                # LVARs defined in included headers count too
+                max_lvar = lvar_count(max_index, resolver.header_facts(includes))
+                if check_lvar_count(lvars, ssl_path.stem, max_lvar):
+                    found_mismatch = True
+                check.files += 1
+
+        cache.save(evict=changed is None)
+        metrics.stats("lvars", "extract").add_cache(cache)
+        if args.metrics:
+            metrics.write(args.metrics)
+        if found_mismatch:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
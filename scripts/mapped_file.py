@@ -0,0 +1,55 @@
+"""Read-only memory-mapped access to input files.
+
+Files that are only hashed, or of which only a part is looked at, like one entry of a .msg file
+or the header of a .pro file, are mapped rather than read. Scripts and .msg files scanned whole
+are read into bytes instead, since stripping a script copies its code anyway and .msg files are
+small. Either way validators scan raw bytes, so files are never decoded as a whole and stray
+non-UTF-8 bytes cannot abort a run.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import mmap
+from pathlib import Path
+
+# Type alias for a scannable file buffer; both support slicing, find() and bytes regexes
+Buffer = mmap.mmap | bytes
+
+
+@contextmanager
+def open_mapped(file_path: str | Path) -> Iterator[Buffer]:
+    """Memory-map a file for reading.
+
+    Args:
+        file_path: Path to the file
+
+    Yields:
+        Read-only buffer over the file contents; empty files, which cannot be mapped, yield b""
+
+    Raises:
+        OSError: If the file cannot be opened
+    """
+    with open(file_path, "rb") as fhandle:
+        if fhandle.seek(0, 2) == 0:
+            yield b""
+            return
+        with mmap.mmap(fhandle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def iter_lines(buffer: Buffer) -> Iterator[bytes]:
+    """Iterate over the lines of a buffer, keeping line endings.
+
+    Args:
+        buffer: Buffer from open_mapped(), or any bytes
+
+    Yields:
+        Each line as bytes, including its trailing newline if present
+    """
+    start = 0
+    size = len(buffer)
+    while start < size:
+        end = buffer.find(b"\n", start)
+        end = size if end == -1 else end + 1
+        yield buffer[start:end]
+        start = end
@@ -0,0 +1,193 @@
+"""Per-phase performance metrics of validator runs.
+
+Each validator records its phases: `walk` finds the scripts, `parse` reads a registry like
+scripts.lst where a validator times it apart from the scripts, `extract` reads and parses input
+files (each file is parsed as soon as it is read, so reading and parsing are not timed apart), and
+`check` cross-checks the extracted facts. A phase entered repeatedly accumulates. Phases time whole loops
+rather than single files, so that timing does not slow down the run it measures.
+
+Phases only count the CPU time of the thread running them, since checks may run concurrently.
+The CPU time of worker processes is recorded once for the whole run, as the `workers` phase.
+
+Metrics are written as JSON and, in GitHub Actions, appended as a Markdown table to the job
+summary in $GITHUB_STEP_SUMMARY.
+"""
+
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager, suppress
+import json
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import Any
+
+from scan_cache import ScanCache
+from tree_walker import FileEntry
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+# Columns of the Markdown table: (JSON key, header)
+_TABLE_COLUMNS = (
+    ("validator", "Validator"),
+    ("phase", "Phase"),
+    ("wall_time", "Wall, s"),
+    ("cpu_time", "CPU, s"),
+    ("files", "Files"),
+    ("bytes", "Bytes"),
+    ("files_per_sec", "Files/s"),
+    ("cache_hits", "Cache hits"),
+    ("cache_misses", "Cache misses"),
+    ("peak_memory", "Peak memory, MiB"),
+)
+
+
+def cpu_time() -> float:
+    """Return CPU seconds used by the calling thread."""
+    return time.thread_time()
+
+
+def worker_cpu_time() -> float:
+    """Return CPU seconds used by finished worker processes of this process."""
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def peak_memory() -> int:
+    """Return the peak resident set size of this process or its largest worker, in bytes; 0 if unknown."""
+    if resource is None:
+        return 0
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PhaseStats:
+    """Resource use of one phase of one validator."""
+
+    def __init__(self, validator: str, phase: str) -> None:
+        self.validator = validator
+        self.phase = phase
+        self.wall_time = 0.0
+        self.cpu_time = 0.0  # Of the thread running the phase
+        self.files = 0
+        self.bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.peak_memory = 0  # Bytes, over the whole process up to the end of the phase
+
+    def add_files(self, files: Iterable[Path | FileEntry]) -> None:
+        """Count files covered by the phase and their sizes; missing files count without a size."""
+        for file in files:
+            self.files += 1
+            if isinstance(file, FileEntry):
+                self.bytes += file.stat.st_size
+            else:
+                with suppress(OSError):
+                    self.bytes += file.stat().st_size
+
+    def add_cache(self, cache: ScanCache) -> None:
+        """Count the lookups of a cache used by the phase."""
+        self.cache_hits += cache.hits
+        self.cache_misses += cache.misses
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stats as a JSON-serializable dict, with the file rate derived."""
+        return {
+            "validator": self.validator,
+            "phase": self.phase,
+            "wall_time": round(self.wall_time, 6),
+            "cpu_time": round(self.cpu_time, 6),
+            "files": self.files,
+            "bytes": self.bytes,
+            "files_per_sec": round(self.files / self.wall_time, 1) if self.wall_time else 0.0,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "peak_memory": self.peak_memory,
+        }
+
+
+class Metrics:
+    """Phase stats of a run, in the order the phases were first entered.
+
+    Phases may run in different threads, but each phase is only entered from one thread at a time.
+    """
+
+    def __init__(self) -> None:
+        self._phases: dict[tuple[str, str], PhaseStats] = {}
+        self._lock = threading.Lock()
+        self._worker_cpu_start = worker_cpu_time()
+
+    def stats(self, validator: str, name: str) -> PhaseStats:
+        """Return the stats of a phase, for counts made outside its timed sections."""
+        with self._lock:
+            stats = self._phases.get((validator, name))
+            if stats is None:
+                stats = self._phases[validator, name] = PhaseStats(validator, name)
+            return stats
+
+    @contextmanager
+    def phase(self, validator: str, name: str) -> Iterator[PhaseStats]:
+        """Time a phase, adding to its earlier times.
+
+        Args:
+            validator: Validator name, e.g. "lvars"
+            name: Phase name: "walk", "parse", "extract" or "check"
+
+        Yields:
+            Stats of the phase, for counting files and cache lookups
+        """
+        stats = self.stats(validator, name)
+        wall_start = time.perf_counter()
+        cpu_start = cpu_time()
+        try:
+            yield stats
+        finally:
+            stats.wall_time += time.perf_counter() - wall_start
+            stats.cpu_time += cpu_time() - cpu_start
+            stats.peak_memory = max(stats.peak_memory, peak_memory())
+
+    def as_list(self) -> list[dict[str, Any]]:
+        """Return the stats of every phase as JSON-serializable dicts.
+
+        Worker processes that finished since the collector was created are added as an `all`
+        validator's `workers` phase, with their CPU time only.
+        """
+        with self._lock:
+            rows = [stats.as_dict() for stats in self._phases.values()]
+        workers = PhaseStats("all", "workers")
+        workers.cpu_time = worker_cpu_time() - self._worker_cpu_start
+        if workers.cpu_time > 0:
+            rows.append(workers.as_dict())
+        return rows
+
+    def markdown(self) -> str:
+        """Return the stats as a Markdown table."""
+        lines = [
+            "| " + " | ".join(header for _, header in _TABLE_COLUMNS) + " |",
+            "|" + "|".join(" --- " for _ in _TABLE_COLUMNS) + "|",
+        ]
+        for row in self.as_list():
+            row["peak_memory"] = round(row["peak_memory"] / 2**20, 1)
+            lines.append("| " + " | ".join(str(row[key]) for key, _ in _TABLE_COLUMNS) + " |")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: str | Path) -> None:
+        """Write the stats as JSON and append them to the GitHub job summary, if there is one.
+
+        Args:
+            json_path: File to write the JSON list of phase stats to
+        """
+        with open(json_path, "w", encoding="utf-8") as fhandle:
+            json.dump(self.as_list(), fhandle, indent=2)
+            fhandle.write("\n")
+        summary_path = os.environ.get("GITHUB_STEP_SUMMARY", "")
+        if summary_path:
+            with open(summary_path, "a", encoding="utf-8") as fhandle:
+                fhandle.write(f"### Fallout tests metrics\n\n{self.markdown()}\n")
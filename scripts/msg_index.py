@@ -0,0 +1,181 @@
+"""Parse-once index of message IDs defined in Fallout .msg files.
+
+Many scripts share one dialog file, and every script is checked against generic.msg, so each
+.msg file is parsed at most once per run and its IDs are kept as a set of integers.
+Files are parsed with msg_lexer, which also reports duplicate IDs and malformed entries.
+The dialog directory itself is listed once, and file names are looked up case-insensitively,
+since data from Windows-era releases has names like `ACMYBOT.MSG`.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+import os
+from pathlib import Path
+
+from msg_lexer import MsgProblem, read_ids, scan_ids
+from scan_cache import ScanCache, content_hash
+
+# Type aliases
+MsgIds = frozenset[int]  # Message IDs defined in one .msg file
+IdRange = tuple[int, int]  # First and last message ID of a range, inclusive
+
+
+def read_msg_ids(msg_path: str | Path) -> list[str] | None:
+    """Extract the message IDs defined by the entries of a .msg file.
+
+    Args:
+        msg_path: Path to the .msg file
+
+    Returns:
+        List of message IDs in ID order, each listed once, or None if the file cannot be opened
+    """
+    read = read_ids(msg_path)
+    return None if read is None else [str(msg_id) for msg_id in sorted(read[0])]
+
+
+def merge_ranges(id_ranges: Iterable[IdRange]) -> list[IdRange]:
+    """Merge overlapping and adjacent ID ranges.
+
+    Args:
+        id_ranges: Inclusive ID ranges; reversed ranges are empty and dropped
+
+    Returns:
+        Disjoint, non-adjacent ranges in ID order
+    """
+    merged: list[IdRange] = []
+    for first, last in sorted(id_range for id_range in id_ranges if id_range[0] <= id_range[1]):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+class MsgDir:
+    """Case-insensitive index of the .msg files in a dialog directory, listed once."""
+
+    def __init__(self, dialog_dir: str | Path) -> None:
+        self.path = Path(dialog_dir)
+        self._files: dict[str, Path] = {}
+        try:
+            with os.scandir(self.path) as scan:
+                entries = [entry for entry in scan if entry.name.lower().endswith(".msg") and entry.is_file()]
+        except OSError:
+            entries = []
+        # When names differ only in case, prefer the lowercase one, which was looked up before
+        for entry in sorted(entries, key=lambda entry: entry.name != entry.name.lower()):
+            self._files.setdefault(entry.name.casefold(), Path(entry.path))
+
+    def find(self, file_name: str) -> Path | None:
+        """Look up a .msg file by name, ignoring case.
+
+        Args:
+            file_name: File name, e.g. "acmybot.msg"
+
+        Returns:
+            Path of the file in the directory, or None if there is no such file
+        """
+        return self._files.get(file_name.casefold())
+
+
+class MsgIndex:
+    """Message IDs of .msg files, parsed lazily and at most once per file.
+
+    With an enabled cache, IDs and problems of unchanged files are taken from earlier runs instead of parsed.
+    """
+
+    def __init__(self, cache: ScanCache | None = None) -> None:
+        self.cache = cache or ScanCache(None, "msg")
+        self._ids: dict[Path, MsgIds | None] = {}
+        self._sorted_ids: dict[Path, list[int]] = {}
+        self._problems: dict[Path, list[MsgProblem]] = {}
+
+    def ids(self, msg_path: str | Path) -> MsgIds | None:
+        """Return the message IDs defined in a .msg file.
+
+        Args:
+            msg_path: Path to the .msg file
+
+        Returns:
+            Set of message IDs, or None if the file cannot be opened
+        """
+        msg_path = Path(msg_path)
+        if msg_path not in self._ids:
+            self._ids[msg_path] = self._load(msg_path)
+        return self._ids[msg_path]
+
+    def problems(self, msg_path: str | Path) -> list[MsgProblem]:
+        """Return the duplicate and malformed entries of a .msg file.
+
+        Args:
+            msg_path: Path to the .msg file
+
+        Returns:
+            Problems in file order; none if the file cannot be opened
+        """
+        msg_path = Path(msg_path)
+        self.ids(msg_path)
+        return self._problems.get(msg_path, [])
+
+    def _load(self, msg_path: Path) -> MsgIds | None:
+        """Read the IDs and problems of a .msg file from the cache or by parsing it."""
+        cached = self.cache.get(msg_path)
+        if cached is not None:
+            sorted_ids, problems = cached
+            self._problems[msg_path] = [MsgProblem(line, message) for line, message in problems]
+            return frozenset(sorted_ids)
+        try:
+            with open(msg_path, "rb") as fhandle:
+                data = fhandle.read()
+        except OSError:
+            return None
+        ids, self._problems[msg_path] = scan_ids(data)
+        self.cache.put(msg_path, [sorted(ids), self._problems[msg_path]], digest=content_hash(data))
+        return ids
+
+    def missing(self, msg_path: str | Path, message_ids: Iterable[str]) -> list[str] | None:
+        """Return the message IDs that a .msg file does not define.
+
+        Args:
+            msg_path: Path to the .msg file
+            message_ids: Message IDs to look up
+
+        Returns:
+            Message IDs absent from the file in input order, or None if the file cannot be opened
+        """
+        msg_ids = self.ids(msg_path)
+        if msg_ids is None:
+            return None
+        return [message_id for message_id in message_ids if int(message_id) not in msg_ids]
+
+    def missing_ranges(self, msg_path: str | Path, id_ranges: Iterable[IdRange]) -> list[IdRange] | None:
+        """Return the parts of message ID ranges that a .msg file does not define.
+
+        Ranges are checked with binary searches over the sorted IDs, so a mistyped range
+        spanning thousands of IDs costs no more than the IDs the file actually defines in it.
+
+        Args:
+            msg_path: Path to the .msg file
+            id_ranges: Inclusive ID ranges to look up, possibly overlapping; reversed ranges are empty
+
+        Returns:
+            Maximal missing sub-ranges in ID order, or None if the file cannot be opened
+        """
+        msg_ids = self.ids(msg_path)
+        if msg_ids is None:
+            return None
+        msg_path = Path(msg_path)
+        if msg_path not in self._sorted_ids:
+            self._sorted_ids[msg_path] = sorted(msg_ids)
+        sorted_ids = self._sorted_ids[msg_path]
+
+        missing: list[IdRange] = []
+        for first, last in merge_ranges(id_ranges):
+            start = first
+            for msg_id in sorted_ids[bisect_left(sorted_ids, first) : bisect_right(sorted_ids, last)]:
+                if msg_id > start:
+                    missing.append((start, msg_id - 1))
+                start = msg_id + 1
+            if start <= last:
+                missing.append((start, last))
+        return missing
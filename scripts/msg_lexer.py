@@ -0,0 +1,231 @@
+"""Single-pass lexer for Fallout .msg message files.
+
+A .msg file is a list of `{id}{sound}{text}` entries; anything outside braces, such as `#` comment
+lines, is ignored. tokenize() reads the raw bytes once, never decoding the cp1252 text, and records
+the byte offset and line of every entry. Only IDs and offsets are kept: text is read back from the
+file by offset when it is needed.
+
+Entries normally take one line each and are matched by a single regex. Anything else containing a
+brace is read field by field. Fields may run over several lines, as the engine skips newlines in
+them; unbalanced braces, missing fields and IDs that are not numbers are reported. Numbers in the
+sound and text fields are never taken for IDs.
+
+Checks only need the IDs, which scan_ids() gets faster for files with no problems, nearly all of
+them, by validating the whole file at once instead of entry by entry.
+"""
+
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+import re
+from typing import NamedTuple
+
+from mapped_file import Buffer, open_mapped
+
+# A well-formed entry on a single line, or any other brace, which is then read field by field
+_TOKEN_REGEX = re.compile(rb"\{([0-9]+)\}[ \t]*\{[^{}\n]*\}[ \t]*\{[^{}\n]*\}|[{}]")
+# An entry, possibly malformed; scan_ids() checks that the file holds only well-formed ones
+_ENTRY_REGEX = re.compile(rb"\{([0-9]+)\}\{[^}]*\}\{[^}]*\}")
+# Every byte but braces, deleted to get the structure of a file
+_NOT_STRUCTURE = bytes(byte for byte in range(256) if byte not in b"{}")
+_ID_REGEX = re.compile(rb"[0-9]+")
+_SPACE_REGEX = re.compile(rb"[ \t\r\n]*")
+# ID, sound and text
+_FIELDS = 3
+
+
+class MsgProblem(NamedTuple):
+    """An entry of a .msg file that is malformed or repeats an ID."""
+
+    line: int  # 1-based line the entry starts on
+    message: str
+
+
+class MsgEntries(NamedTuple):
+    """Message entries of a .msg file, as a compact index from ID to byte offset."""
+
+    ids: array  # Defined message IDs, sorted
+    offsets: array  # Byte offset of the first entry of each ID, in ids order
+    lines: array  # Line of the first entry of each ID, in ids order
+    problems: list[MsgProblem]  # Duplicate and malformed entries, in file order
+
+    def offset(self, msg_id: int) -> int | None:
+        """Return the byte offset of a message's entry, or None if the file does not define it."""
+        i = bisect_left(self.ids, msg_id)
+        return self.offsets[i] if i < len(self.ids) and self.ids[i] == msg_id else None
+
+
+def _read_fields(buffer: Buffer, start: int) -> tuple[list[tuple[int, int]], int, str | None]:
+    """Read the brace-delimited fields of an entry one by one.
+
+    Args:
+        buffer: File contents
+        start: Offset of the entry's opening brace
+
+    Returns:
+        Tuple of (start and end offsets of each field's contents, offset after the entry, problem or None)
+    """
+    fields: list[tuple[int, int]] = []
+    pos = start
+    while True:
+        close = buffer.find(b"}", pos + 1)
+        nested = buffer.find(b"{", pos + 1, len(buffer) if close == -1 else close)
+        if close == -1 or nested != -1:
+            return fields, pos, "unbalanced braces"
+        fields.append((pos + 1, close))
+        pos = close + 1
+        if len(fields) == _FIELDS:
+            return fields, pos, None
+        pos = _SPACE_REGEX.match(buffer, pos).end()  # type: ignore[union-attr]
+        if buffer[pos : pos + 1] != b"{":
+            return fields, pos, f"expected {{id}}{{sound}}{{text}}, found {len(fields)} field(s)"
+
+
+def _read_entry(buffer: bytes, start: int, line: int, problems: list[MsgProblem]) -> tuple[int | None, int]:
+    """Read an entry that is not a well-formed single line, reporting what is wrong with it, if anything.
+
+    Args:
+        buffer: File contents
+        start: Offset of the brace starting the entry
+        line: Line of that brace
+        problems: List to add problems to
+
+    Returns:
+        Tuple of (message ID, or None if the entry defines none; offset to continue at)
+    """
+    if buffer[start] == ord("}"):
+        problems.append(MsgProblem(line, "unmatched }"))
+        return None, start + 1
+    fields, end, problem = _read_fields(buffer, start)
+    if problem is not None:
+        problems.append(MsgProblem(line, problem))
+        # Resume on the next line, so that one broken entry is not read as several
+        next_line = buffer.find(b"\n", start)
+        return None, len(buffer) if next_line == -1 else next_line + 1
+    id_start, id_end = fields[0]
+    if _ID_REGEX.fullmatch(buffer, id_start, id_end) is None:
+        problems.append(MsgProblem(line, f"message ID {buffer[id_start:id_end].decode('cp1252')!r} is not a number"))
+        return None, end
+    return int(buffer[id_start:id_end]), end
+
+
+def tokenize(buffer: bytes) -> MsgEntries:
+    """Read the entries of a .msg file in one pass.
+
+    Args:
+        buffer: File contents
+
+    Returns:
+        Index of the entries; of duplicate IDs, the first entry counts
+    """
+    offsets = array("q")
+    lines = array("q")
+    first: dict[int, int] = {}  # Index in offsets and lines of each ID's first entry
+    problems: list[MsgProblem] = []
+    line = 1
+    pos = 0
+    search = _TOKEN_REGEX.search
+    match = search(buffer)
+    while match is not None:
+        start = match.start()
+        line += buffer.count(b"\n", pos, start)
+        pos = start
+        if match[1] is not None:
+            msg_id: int | None = int(match[1])
+            end = match.end()
+        else:
+            msg_id, end = _read_entry(buffer, start, line, problems)
+        if msg_id is not None:
+            if msg_id in first:
+                first_line = lines[first[msg_id]]
+                problems.append(MsgProblem(line, f"duplicate message ID {msg_id}, first defined on line {first_line}"))
+            else:
+                first[msg_id] = len(offsets)
+                offsets.append(start)
+                lines.append(line)
+        match = search(buffer, end)
+    ids = sorted(first)
+    return MsgEntries(
+        ids=array("q", ids),
+        offsets=array("q", (offsets[first[msg_id]] for msg_id in ids)),
+        lines=array("q", (lines[first[msg_id]] for msg_id in ids)),
+        problems=problems,
+    )
+
+
+def scan_ids(buffer: bytes) -> tuple[frozenset[int], list[MsgProblem]]:
+    """Read the message IDs of a .msg file and its problems, without indexing the entries.
+
+    One regex pass finds the entries, and the file's braces alone then show whether every brace
+    belongs to one of them. Only files where some do not, or with duplicate IDs, are tokenized to
+    find out what is wrong.
+
+    Args:
+        buffer: File contents
+
+    Returns:
+        Tuple of (message IDs, duplicate and malformed entries in file order), as from tokenize()
+    """
+    ids = _ENTRY_REGEX.findall(buffer)
+    if buffer.translate(None, _NOT_STRUCTURE) == b"{}" * (_FIELDS * len(ids)):
+        msg_ids = frozenset(map(int, ids))
+        if len(msg_ids) == len(ids):
+            return msg_ids, []
+    entries = tokenize(buffer)
+    return frozenset(entries.ids), entries.problems
+
+
+def read_ids(msg_path: str | Path) -> tuple[frozenset[int], list[MsgProblem]] | None:
+    """Read the message IDs of a .msg file and its problems.
+
+    Args:
+        msg_path: Path to the .msg file
+
+    Returns:
+        Tuple of (message IDs, problems) as from scan_ids(), or None if the file cannot be opened
+    """
+    try:
+        with open(msg_path, "rb") as fhandle:
+            return scan_ids(fhandle.read())
+    except OSError:
+        return None
+
+
+def read_entries(msg_path: str | Path) -> MsgEntries | None:
+    """Read the entries of a .msg file.
+
+    Args:
+        msg_path: Path to the .msg file
+
+    Returns:
+        Index of the entries, or None if the file cannot be opened
+    """
+    try:
+        with open(msg_path, "rb") as fhandle:
+            # Line numbers need bytes.count(), which memory maps lack; .msg files are small
+            return tokenize(fhandle.read())
+    except OSError:
+        return None
+
+
+def read_text(msg_path: str | Path, offset: int) -> str | None:
+    """Read the text of the entry at an offset, e.g. from MsgEntries.offset().
+
+    Args:
+        msg_path: Path to the .msg file
+        offset: Byte offset of the entry's opening brace
+
+    Returns:
+        Text field decoded from cp1252, or None if the file cannot be opened or has no entry there
+    """
+    try:
+        with open_mapped(msg_path) as buffer:
+            if buffer[offset : offset + 1] != b"{":
+                return None
+            fields, _, problem = _read_fields(buffer, offset)
+            if problem is not None:
+                return None
+            text_start, text_end = fields[-1]
+            return buffer[text_start:text_end].decode("cp1252", "replace")
+    except OSError:
+        return None
@@ -0,0 +1,95 @@
+"""Cached, optionally parallel per-file extraction shared by the validators.
+
+Files with fresh cache entries are not read. The rest are extracted serially, or for larger
+batches in a process pool, handed out largest first so that no worker is left with a big file
+at the end of the run. Results always come back in input order. Workers are started from a fork
+server, or spawned where there is none, since forking a process that runs threads can deadlock.
+"""
+
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+from pathlib import Path
+from typing import Any
+
+from scan_cache import ScanCache
+from tree_walker import FileEntry
+
+# Below this many files, process pool startup costs more than parallel extraction saves
+_MIN_PARALLEL_FILES = 64
+# Chunks handed to each worker over the run; more chunks balance better, fewer cost less IPC
+_CHUNKS_PER_WORKER = 4
+# Workers are not forked from the calling process, which may run other threads, e.g. engine checks
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# Placeholder for results not yet extracted; None is a valid result
+_PENDING: Any = object()
+
+
+def map_paths[T](
+    extract: Callable[[Path], T],
+    paths: list[Path],
+    jobs: int = 1,
+    stats: list[os.stat_result | None] | None = None,
+) -> list[T]:
+    """Apply an extraction function to files, optionally in a process pool.
+
+    Args:
+        extract: Module-level function extracting facts from one file
+        paths: Files to extract from
+        jobs: Number of worker processes; 0 means one per CPU
+        stats: Stat info of each file where already known, in the same order as paths
+
+    Returns:
+        Extraction results, in the same order as paths
+    """
+    workers = jobs or os.cpu_count() or 1
+    if workers <= 1 or len(paths) < _MIN_PARALLEL_FILES:
+        return [extract(path) for path in paths]
+
+    known = stats or [None] * len(paths)
+    sizes = [(stat or path.stat()).st_size for path, stat in zip(paths, known, strict=True)]
+    order = sorted(range(len(paths)), key=sizes.__getitem__, reverse=True)
+    chunksize = max(1, len(paths) // (workers * _CHUNKS_PER_WORKER))
+    context = multiprocessing.get_context(_START_METHOD)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        extracted = dict(zip(order, executor.map(extract, [paths[i] for i in order], chunksize=chunksize), strict=True))
+    return [extracted[i] for i in range(len(paths))]
+
+
+def extract_paths[T](
+    extract: Callable[[Path], tuple[T, str]],
+    files: Sequence[Path | FileEntry],
+    jobs: int = 1,
+    cache: ScanCache | None = None,
+    load: Callable[[Any], T] | None = None,
+) -> list[T]:
+    """Extract facts from files, reusing fresh cache entries and storing new results.
+
+    Args:
+        extract: Module-level function extracting JSON-serializable facts from one file, returning
+            them with the scan_cache.content_hash() of the contents it read
+        files: Files to extract from; walker entries spare stat calls
+        jobs: Number of worker processes; 0 means one per CPU
+        cache: Cache of earlier extraction results, updated with new ones
+        load: Converts facts read back from the cache, e.g. a NamedTuple class
+
+    Returns:
+        Extraction results, in the same order as files
+    """
+    paths = [file.path if isinstance(file, FileEntry) else file for file in files]
+    stats = [file.stat if isinstance(file, FileEntry) else None for file in files]
+    results: list[T] = [_PENDING] * len(paths)
+    if cache is not None:
+        for i, path in enumerate(paths):
+            facts = cache.get(path, stats[i])
+            if facts is not None:
+                results[i] = load(facts) if load is not None else facts
+
+    pending = [i for i, result in enumerate(results) if result is _PENDING]
+    extracted = map_paths(extract, [paths[i] for i in pending], jobs, [stats[i] for i in pending])
+    for i, (result, digest) in zip(pending, extracted, strict=True):
+        results[i] = result
+        if cache is not None:
+            cache.put(paths[i], result, stats[i], digest)
+    return results
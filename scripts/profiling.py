@@ -0,0 +1,132 @@
+"""Optional cProfile profiling of validator runs.
+
+With a profile directory set, each validator writes `<name>.pstats`, readable with pstats or
+snakeviz, and `<name>.collapsed`, one `frame;frame;frame microseconds` line per call stack for
+flamegraph.pl, speedscope and similar tools. Without one, nothing is profiled.
+
+cProfile only records which function called which, not whole stacks, so the collapsed stacks are
+rebuilt from the call graph: a function's time is split among its callers in proportion to the
+time each call edge took, and time outside any recorded caller makes a root. Recursion is cut at
+the first repeated frame.
+
+Only one profiler can be active in a process, so profiled runs check their validators one after
+another rather than concurrently. Extraction in worker processes is not profiled; profile with one
+job to see it.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+import cProfile
+from pathlib import Path
+import pstats
+
+# Type alias for a pstats function key: (file name, line number, function name)
+FunctionKey = tuple[str, int, str]
+
+# Deepest stack written; deeper frames are folded into their ancestor at this depth
+_MAX_DEPTH = 128
+# Stack shares below this many microseconds are dropped from the collapsed stacks
+_MIN_MICROSECONDS = 1
+
+
+def frame_label(func: FunctionKey) -> str:
+    """Return a function's collapsed stack frame, e.g. "scan_file (includes.py:86)"."""
+    file_name, line, name = func
+    if file_name == "~":  # Built-in function
+        return name.replace(";", ":")
+    return f"{name} ({Path(file_name).name}:{line})".replace(";", ":")
+
+
+def collapse_stats(stats: pstats.Stats) -> dict[str, int]:
+    """Rebuild collapsed call stacks from profile stats.
+
+    Args:
+        stats: Stats of one profile
+
+    Returns:
+        Own time in microseconds by `;`-separated stack, root first
+    """
+    raw: dict[FunctionKey, tuple] = stats.stats  # type: ignore[attr-defined]
+    # Call edges by caller: (callee, own time, cumulative time) spent in the callee on that edge
+    callees: dict[FunctionKey, list[tuple[FunctionKey, float, float]]] = defaultdict(list)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, (_, _, own, cumulative) in callers.items():
+            callees[caller].append((func, own, cumulative))
+
+    collapsed: dict[str, int] = defaultdict(int)
+
+    def visit(func: FunctionKey, stack: list[FunctionKey], own: float, cumulative: float) -> None:
+        stack.append(func)
+        total = raw[func][3]
+        share = cumulative / total if total else 0.0
+        children = callees.get(func, [])
+        if len(stack) >= _MAX_DEPTH:
+            own, children = cumulative, []
+        if round(own * 1e6) >= _MIN_MICROSECONDS:
+            collapsed[";".join(frame_label(frame) for frame in stack)] += round(own * 1e6)
+        for callee, callee_own, callee_cumulative in children:
+            if callee in stack:
+                continue
+            visit(callee, stack, callee_own * share, callee_cumulative * share)
+        stack.pop()
+
+    for func, (_, _, own, cumulative, callers) in raw.items():
+        # Time not spent under a recorded caller, e.g. in functions called before profiling began
+        called = sum(edge[3] for caller, edge in callers.items() if caller != func)
+        if cumulative > called:
+            share = (cumulative - called) / cumulative
+            visit(func, [], own * share, cumulative * share)
+    return dict(collapsed)
+
+
+def write_profile(profiler: cProfile.Profile, profile_dir: str | Path, name: str) -> None:
+    """Write a finished profile as pstats and as collapsed stacks.
+
+    Args:
+        profiler: Disabled profiler holding the run's stats
+        profile_dir: Directory to write to, created if missing
+        name: Validator name, used for the file names
+    """
+    profile_dir = Path(profile_dir)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(profile_dir / f"{name}.pstats")
+    collapsed = collapse_stats(pstats.Stats(profiler))
+    with open(profile_dir / f"{name}.collapsed", "w", encoding="utf-8") as fhandle:
+        for stack, microseconds in sorted(collapsed.items()):
+            fhandle.write(f"{stack} {microseconds}\n")
+
+
+@contextmanager
+def profiled(profile_dir: str | Path | None, name: str) -> Iterator[None]:
+    """Profile the block, if a directory is given.
+
+    Args:
+        profile_dir: Directory to write the profile to, or None to not profile
+        name: Validator name, used for the file names
+    """
+    if profile_dir is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        write_profile(profiler, profile_dir, name)
+
+
+def call_profiled[T](profile_dir: str | Path | None, name: str, func: Callable[[], T]) -> T:
+    """Call a function in a profiled block, e.g. as a check or in an executor.
+
+    Args:
+        profile_dir: Directory to write the profile to, or None to not profile
+        name: Validator name, used for the file names
+        func: Function to call
+
+    Returns:
+        Return value of func
+    """
+    with profiled(profile_dir, name):
+        return func()
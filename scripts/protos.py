@@ -0,0 +1,146 @@
+"""Index of the proto IDs (Pids) defined by a mod's proto lists and .pro files.
+
+A Pid holds the proto type in its high byte and a 1-based line number in that type's list in the
+low 24 bits: Pid 16777225 (0x01000009) is line 9 of critters/critters.lst. Each .pro file starts
+with its own Pid as a big-endian 32-bit integer. Only those 4 bytes are read, through a memory
+map. Mods often ship only the protos they change, so a listed .pro file that is missing is fine,
+but one whose header holds a different Pid is not.
+
+The list and header read from each file are cached, so later runs only stat unchanged files.
+"""
+
+import os
+from pathlib import Path
+import struct
+
+from mapped_file import iter_lines, open_mapped
+from scan_cache import ScanCache
+
+# Proto types with a list to check Pids against, by directory name under the proto directory
+PROTO_TYPES = {"items": 0, "critters": 1}
+
+_PID_TYPE_SHIFT = 24
+_PID_INDEX_MASK = (1 << _PID_TYPE_SHIFT) - 1
+_PRO_HEADER = struct.Struct(">i")
+
+
+def make_pid(proto_type: int, index: int) -> int:
+    """Return the Pid of the proto on a 1-based line of its type's list."""
+    return proto_type << _PID_TYPE_SHIFT | index
+
+
+def read_proto_list(lst_path: str | Path) -> list[str]:
+    """Read a proto list.
+
+    Args:
+        lst_path: Path to the list, e.g. critters/critters.lst
+
+    Returns:
+        .pro file name of each line, lower-cased, or "" for a blank line
+    """
+    names: list[str] = []
+    with open_mapped(lst_path) as buffer:
+        for line in iter_lines(buffer):
+            fields = line.split(b";", 1)[0].split()
+            names.append(fields[0].decode("cp1252").lower() if fields else "")
+    return names
+
+
+def read_pro_pid(pro_path: str | Path) -> int | None:
+    """Read the Pid from a .pro file header.
+
+    Args:
+        pro_path: Path to the .pro file
+
+    Returns:
+        Pid in the header, or None if the file is too short to have one
+    """
+    with open_mapped(pro_path) as buffer:
+        if len(buffer) < _PRO_HEADER.size:
+            return None
+        return _PRO_HEADER.unpack_from(buffer)[0]
+
+
+def _list_files(directory: Path) -> dict[str, os.DirEntry[str]]:
+    """List a directory once, by lower-case file name; empty if it does not exist."""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name.lower(): entry for entry in entries if entry.is_file()}
+    except OSError:
+        return {}
+
+
+class ProtoIndex:
+    """Pids defined by the proto lists of a proto directory, for constant-time lookups."""
+
+    def __init__(self) -> None:
+        self.types: set[int] = set()  # Proto types whose list was found
+        self._files: dict[int, str] = {}  # .pro file name by listed Pid
+        self._bad_headers: dict[int, int | None] = {}  # Header Pid, or None if none, by listed Pid
+
+    @classmethod
+    def load(cls, proto_dir: str | Path, cache: ScanCache | None = None) -> "ProtoIndex":
+        """Index a proto directory.
+
+        Args:
+            proto_dir: Directory with critters/critters.lst, items/items.lst and their .pro files
+            cache: Cache of lists and headers read in earlier runs, saved by the caller
+
+        Returns:
+            Index of the listed Pids
+        """
+        cache = cache or ScanCache(None, "protos")
+        index = cls()
+        for type_name, proto_type in PROTO_TYPES.items():
+            type_dir = Path(proto_dir) / type_name
+            files = _list_files(type_dir)
+            lst_entry = files.get(f"{type_name}.lst")
+            if lst_entry is None:
+                continue
+            index.types.add(proto_type)
+            names = cache.get(lst_entry.path, lst_entry.stat())
+            if names is None:
+                names = read_proto_list(lst_entry.path)
+                cache.put(lst_entry.path, names, lst_entry.stat())
+            for line_number, name in enumerate(names, start=1):
+                if not name:
+                    continue
+                pid = make_pid(proto_type, line_number)
+                index._files[pid] = f"{type_name}/{name}"
+                pro_entry = files.get(name)
+                if pro_entry is None:
+                    continue
+                header = cache.get(pro_entry.path, pro_entry.stat())
+                if header is None:
+                    # Cached as a list, since None means a miss
+                    header = [read_pro_pid(pro_entry.path)]
+                    cache.put(pro_entry.path, header, pro_entry.stat())
+                if header[0] != pid:
+                    index._bad_headers[pid] = header[0]
+        return index
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def problem(self, pid: int) -> str | None:
+        """Check a Pid against the index.
+
+        Args:
+            pid: Pid, e.g. from a worldmap.txt encounter
+
+        Returns:
+            What is wrong with the Pid, or None if it is fine or its type has no list to check
+        """
+        proto_type = pid >> _PID_TYPE_SHIFT
+        if proto_type not in self.types:
+            return None
+        file_name = self._files.get(pid)
+        if file_name is None:
+            type_name = next(name for name, number in PROTO_TYPES.items() if number == proto_type)
+            return f"is not in {type_name}.lst (line {pid & _PID_INDEX_MASK})"
+        if pid in self._bad_headers:
+            header = self._bad_headers[pid]
+            if header is None:
+                return f"has a truncated proto file {file_name}"
+            return f"has proto file {file_name} with Pid {header} in its header"
+        return None
@@ -0,0 +1,192 @@
+"""Persistent on-disk cache of per-file extraction results.
+
+Each validator keeps its own namespace file in the cache directory, mapping input file paths to
+the facts extracted from them. An entry is fresh when the file's size and mtime match; when only
+the mtime differs, as after a fresh CI checkout, a content hash decides. Entries that a run does
+not look up are evicted when the cache is saved, so deleted and renamed files do not accumulate.
+Long-running processes use MemoryCache instead, which keeps a bounded number of entries in memory.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from mapped_file import Buffer, open_mapped
+
+# Bump when extractors change what they store, to discard caches written by older versions
+CACHE_VERSION = 6
+
+# Type alias for a cache entry: {"size": int, "mtime_ns": int, "hash": str, "facts": Any}
+CacheEntry = dict[str, Any]
+
+
+def content_hash(data: Buffer) -> str:
+    """Return a content hash of file contents already read.
+
+    Args:
+        data: File contents
+
+    Returns:
+        Hex digest of the contents
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_hash(file_path: str | Path) -> str:
+    """Return a content hash of a file.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex digest of the file contents, as from content_hash()
+    """
+    with open_mapped(file_path) as buffer:
+        return content_hash(buffer)
+
+
+class ScanCache:
+    """Extraction results of one validator, persisted between runs.
+
+    A cache created without a directory is disabled: lookups always miss and nothing is saved.
+    """
+
+    def __init__(self, cache_dir: str | Path | None, name: str) -> None:
+        self.path = Path(cache_dir) / f"{name}.json" if cache_dir else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, CacheEntry] = {}
+        self._used: dict[str, CacheEntry] = {}
+        if self.path is not None:
+            self._entries = self._load(self.path)
+
+    @staticmethod
+    def _load(path: Path) -> dict[str, CacheEntry]:
+        """Read a namespace file, discarding it if it is unreadable or from another cache version."""
+        try:
+            with open(path, encoding="utf-8") as fhandle:
+                data = json.load(fhandle)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return {}
+        return data.get("entries", {})
+
+    def get(self, file_path: str | Path, stat: os.stat_result | None = None) -> Any:
+        """Return the cached facts for a file if they are still fresh.
+
+        Args:
+            file_path: Path to the input file
+            stat: Stat info of the file if already known, e.g. from tree_walker.walk_files()
+
+        Returns:
+            Facts stored by put(), or None on a miss
+        """
+        if self.path is None:
+            return None
+        key = str(file_path)
+        entry = self._entries.get(key)
+        try:
+            stat = stat or os.stat(file_path)
+        except OSError:
+            self.misses += 1
+            return None
+        if entry is not None and entry["size"] == stat.st_size:
+            if entry["mtime_ns"] != stat.st_mtime_ns and entry["hash"] != file_hash(file_path):
+                entry = None
+        else:
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._used[key] = entry
+        self.hits += 1
+        return entry["facts"]
+
+    def put(
+        self, file_path: str | Path, facts: Any, stat: os.stat_result | None = None, digest: str | None = None
+    ) -> None:
+        """Store freshly extracted facts for a file.
+
+        Args:
+            file_path: Path to the input file
+            facts: JSON-serializable extraction result
+            stat: Stat info of the file if already known, e.g. from tree_walker.walk_files()
+            digest: content_hash() of the contents the facts were extracted from; without it, the
+                file is read again to hash it
+        """
+        if self.path is None:
+            return
+        stat = stat or os.stat(file_path)
+        self._used[str(file_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": digest or file_hash(file_path),
+            "facts": facts,
+        }
+
+    def save(self, evict: bool = True) -> None:
+        """Write the cache to disk.
+
+        Args:
+            evict: Drop entries not used in this run; disable for runs that only look at some files
+        """
+        if self.path is None:
+            return
+        entries = self._used if evict else {**self._entries, **self._used}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fhandle:
+            json.dump({"version": CACHE_VERSION, "entries": entries}, fhandle, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self._entries = dict(entries)
+
+
+class MemoryCache(ScanCache):
+    """Extraction results kept in memory by a long-running process, evicting the least recently used.
+
+    An entry is fresh while the file's size and mtime match. Facts are stored as given, not as JSON,
+    and nothing is written to disk.
+    """
+
+    def __init__(self, name: str, max_entries: int) -> None:
+        super().__init__(None, name)
+        self.max_entries = max_entries
+        self._lru: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    @property
+    def size(self) -> int:
+        """Number of entries held."""
+        return len(self._lru)
+
+    def get(self, file_path: str | Path, stat: os.stat_result | None = None) -> Any:
+        key = str(file_path)
+        entry = self._lru.get(key)
+        if entry is not None:
+            try:
+                stat = stat or os.stat(file_path)
+            except OSError:
+                entry = None
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            self.misses += 1
+            return None
+        self._lru.move_to_end(key)
+        self.hits += 1
+        return entry["facts"]
+
+    def put(
+        self, file_path: str | Path, facts: Any, stat: os.stat_result | None = None, digest: str | None = None
+    ) -> None:
+        key = str(file_path)
+        stat = stat or os.stat(file_path)
+        self._lru[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "facts": facts}
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def save(self, evict: bool = True) -> None:
+        """Do nothing; entries live only as long as the process."""
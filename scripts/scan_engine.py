@@ -0,0 +1,443 @@
+"""Single-pass scan engine running all enabled validators over shared inputs.
+
+Run one by one, the validators each walk the scripts directory, read every script, and parse
+scripts.h and scripts.lst on their own. The engine walks the tree once and reads each input file
+once, handing its contents to every enabled validator's extractor in the same pass; the
+cross-checks then run concurrently on the combined results, each with its output captured.
+"""
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+import sys
+from typing import Any, NamedTuple
+
+import check_runner
+import dialogs
+from fingerprint import FingerprintStore, Inputs, Tree
+from includes import Code, IncludeResolver, scan_file
+import lvars
+from metrics import Metrics, PhaseStats
+from msg_index import MsgDir, MsgIndex
+from parallel import extract_paths
+from profiling import call_profiled
+from protos import PROTO_TYPES, ProtoIndex
+from scan_cache import ScanCache
+from script_registry import ScriptRegistry
+from script_sets import ScriptSetIndex
+import scripts_lst
+from tree_walker import walk_files
+import worldmap
+
+# Type alias for the facts extracted from one script or header, keyed by validator name
+ValidatorFacts = dict[str, Any]
+
+# Names of the checks, in the order they run and report
+CHECK_NAMES = ("scripts", "lvars", "msgs", "worldmap")
+
+# Per-validator extractors over a script's code, as run by the individual validators
+_CODE_SCANNERS: dict[str, Callable[[Code], Any]] = {
+    "dialogs": dialogs.scan_code,
+    "lvars": lvars.get_lvar_index,
+}
+
+
+class ScanConfig(NamedTuple):
+    """Inputs and enabled checks of one engine run, mirroring the action inputs."""
+
+    scripts_dir: Path
+    dialog_dir: Path
+    scripts_h: Path | None
+    scripts_lst: Path | None
+    check_scripts: bool = True
+    check_lvars: bool = True
+    check_msgs: bool = True
+    worldmap_path: Path | None = None  # worldmap.txt, or None to skip the worldmap check
+    allowed_sets: worldmap.AllowedScriptSets | None = None  # Script combinations allowed in one encounter
+    script_sets_file: Path | None = None  # File with more allowed combinations, one per line
+    proto_dir: Path | None = None  # Proto directory to check encounter Pids against, or None to not check them
+    jobs: int = 1
+    cache_dir: str | None = None
+    exclude: tuple[str, ...] = ()  # Globs of files and directories to skip under scripts_dir
+    use_gitignore: bool = True
+    metrics_path: str | None = None  # File to write per-phase performance metrics to as JSON
+    profile_dir: str | None = None  # Directory to write a profile of the extraction and of each check to
+
+
+class ScriptFacts(NamedTuple):
+    """Facts extracted from one script by every enabled validator."""
+
+    facts: ValidatorFacts
+    includes: list[str]  # Resolved paths of directly included headers
+
+
+def scan_code(code: Code, validators: tuple[str, ...]) -> ValidatorFacts:
+    """Run the extractors of several validators over the same code.
+
+    Args:
+        code: Code of a script or header, from ssl_lexer.strip_code()
+        validators: Names of the validators to extract facts for
+
+    Returns:
+        Facts of each validator
+    """
+    return {name: _CODE_SCANNERS[name](code) for name in validators}
+
+
+def extract_script(script_path: Path, validators: tuple[str, ...]) -> tuple[ScriptFacts, str]:
+    """Read a script once and extract the facts of several validators from it.
+
+    Args:
+        script_path: Path to the script file
+        validators: Names of the validators to extract facts for
+
+    Returns:
+        Tuple of (facts of each validator and the script's resolved include paths, content hash)
+    """
+    facts, includes, digest = scan_file(script_path, partial(scan_code, validators=validators))
+    return ScriptFacts(facts, includes), digest
+
+
+def require_file(path: Path | None) -> None:
+    """Exit with an error unless a required input file exists."""
+    if path is None or not path.is_file():
+        print(f"{path} does not exist.")
+        sys.exit(1)
+
+
+def _existing(path: Path | None) -> Path | None:
+    """Return path if it names an existing file, None otherwise."""
+    return path if path is not None and path.is_file() else None
+
+
+def check_lvars(
+    script_paths: list[Path],
+    results: list[ScriptFacts],
+    resolver: IncludeResolver[ValidatorFacts],
+    registry: ScriptRegistry,
+) -> bool:
+    """Check the LVAR counts of all scripts against scripts.lst.
+
+    Args:
+        script_paths: Scripts, in the same order as results
+        results: Extraction results including lvars facts
+        resolver: Include resolver extracting the same validators' facts as results
+        registry: Registry holding scripts.lst
+
+    Returns:
+        True if some script needs more variables than allowed, False otherwise
+    """
+    lvars_map = registry.lvars_by_name()
+    found_mismatch = False
+    for script_path, result in zip(script_paths, results, strict=True):
+        header_indexes = [facts["lvars"] for facts in resolver.header_facts(result.includes)]
+        if lvars.check_lvar_count(lvars_map, script_path.stem, lvars.lvar_count(result.facts["lvars"], header_indexes)):
+            found_mismatch = True
+    return found_mismatch
+
+
+def effective_messages(
+    results: list[ScriptFacts], resolver: IncludeResolver[ValidatorFacts]
+) -> list[dialogs.ScriptMessages]:
+    """Combine the message references of scripts with those of their included headers.
+
+    Args:
+        results: Extraction results including dialogs facts
+        resolver: Include resolver extracting the same validators' facts as results
+
+    Returns:
+        Extraction results of dialogs.py with header facts added, in the same order as results
+    """
+    effective = []
+    for result in results:
+        header_facts = [facts["dialogs"] for facts in resolver.header_facts(result.includes)]
+        messages = dialogs.script_messages_from_facts(result.facts["dialogs"], result.includes)
+        effective.append(dialogs.with_headers(messages, header_facts))
+    return effective
+
+
+def check_messages(
+    config: ScanConfig,
+    script_paths: list[Path],
+    results: list[ScriptFacts],
+    resolver: IncludeResolver[ValidatorFacts],
+    stats: PhaseStats | None = None,
+) -> bool:
+    """Check the message references of all scripts against their .msg files.
+
+    Args:
+        config: Engine configuration
+        script_paths: Scripts, in the same order as results
+        results: Extraction results including dialogs facts
+        resolver: Include resolver extracting the same validators' facts as results
+        stats: Phase stats to count .msg cache lookups in
+
+    Returns:
+        True if missing messages or malformed .msg entries were found, False otherwise
+    """
+    effective = effective_messages(results, resolver)
+    msg_index = MsgIndex(ScanCache(config.cache_dir, "msg"))
+    check = dialogs.check_messages(script_paths, effective, MsgDir(config.dialog_dir), msg_index)
+    msg_index.cache.save()
+    if stats is not None:
+        stats.add_cache(msg_index.cache)
+    dialogs.print_totals(check)
+    return check.failed
+
+
+def extract_scripts(
+    config: ScanConfig,
+    validators: tuple[str, ...],
+    resolver: IncludeResolver[ValidatorFacts],
+    metrics: Metrics,
+) -> tuple[list[Path], list[ScriptFacts]]:
+    """Walk the scripts directory and extract the facts of several validators from every script.
+
+    Args:
+        config: Engine configuration
+        validators: Names of the validators to extract facts for; none skips the walk
+        resolver: Include resolver extracting the same validators' facts, filled with every
+            reachable header so that concurrent checks only read from it
+        metrics: Collector to record the walk and extract phases in
+
+    Returns:
+        Tuple of (script paths, extraction results in the same order)
+    """
+    if not validators:
+        return [], []
+    with metrics.phase("engine", "walk") as walk:
+        entries = walk_files(config.scripts_dir, ".ssl", config.exclude, config.use_gitignore)
+        walk.files += len(entries)
+    with metrics.phase("engine", "extract") as stats:
+        cache = ScanCache(config.cache_dir, "-".join(["engine", *validators]))
+        extract = partial(extract_script, validators=validators)
+        results = extract_paths(extract, entries, config.jobs, cache, lambda facts: ScriptFacts(*facts))
+        cache.save()
+        resolver.headers(include for result in results for include in result.includes)
+        stats.add_files(entries)
+        stats.add_cache(cache)
+    return [entry.path for entry in entries], results
+
+
+def load_registry(config: ScanConfig, metrics: Metrics) -> ScriptRegistry:
+    """Read scripts.h and scripts.lst once for every enabled validator that uses them.
+
+    Args:
+        config: Engine configuration
+        metrics: Collector to record the reads in
+
+    Returns:
+        Registry of the existing files the enabled validators need
+    """
+    check_worldmap = config.worldmap_path is not None
+    wants_lst = config.check_scripts or config.check_lvars or check_worldmap
+    with metrics.phase("engine", "extract") as stats:
+        scripts_h = _existing(config.scripts_h) if config.check_scripts or check_worldmap else None
+        scripts_lst_path = _existing(config.scripts_lst) if wants_lst else None
+        stats.add_files(path for path in (scripts_h, scripts_lst_path) if path is not None)
+        return ScriptRegistry.load(scripts_h, scripts_lst_path)
+
+
+def load_worldmap(
+    config: ScanConfig, worldmap_path: Path, metrics: Metrics
+) -> tuple[list[worldmap.Encounter], ScriptSetIndex, ProtoIndex | None]:
+    """Read worldmap.txt, the allowed script sets and, if configured, the protos.
+
+    Args:
+        config: Engine configuration
+        worldmap_path: worldmap.txt path; exits with an error unless it is a file
+        metrics: Collector to record the reads in
+
+    Returns:
+        Tuple of (encounters, allowed script sets, proto index or None)
+    """
+    worldmap.check_worldmap_file(worldmap_path)
+    with metrics.phase("worldmap", "extract") as stats:
+        encounters = worldmap.read_encounters(worldmap_path)
+        allowed_sets = worldmap.load_allowed_sets(config.allowed_sets or [], config.script_sets_file)
+        stats.add_files(path for path in (worldmap_path, config.script_sets_file) if path is not None)
+        protos = None
+        if config.proto_dir is not None:
+            protos, proto_cache = worldmap.load_protos(config.proto_dir, config.cache_dir)
+            stats.add_cache(proto_cache)
+    return encounters, allowed_sets, protos
+
+
+def validator_inputs(config: ScanConfig) -> dict[str, Inputs]:
+    """List what each check reads, for fingerprinting.
+
+    Args:
+        config: Engine configuration
+
+    Returns:
+        Settings, files and trees of each check by name; headers outside the scripts directory are
+        only known once the scripts were read
+    """
+    registry = (config.scripts_h, config.scripts_lst)
+    scripts = Tree(config.scripts_dir, (".ssl", ".h"), exclude=config.exclude, use_gitignore=config.use_gitignore)
+    # Proto lists and .pro files are looked up in each type's directory, not below it
+    proto_dirs = [config.proto_dir / name for name in PROTO_TYPES] if config.proto_dir is not None else []
+    protos = tuple(Tree(proto_dir, (".lst", ".pro"), recursive=False) for proto_dir in proto_dirs)
+    return {
+        "scripts": Inputs(("scripts",), registry),
+        "lvars": Inputs(("lvars",), (config.scripts_lst,), (scripts,)),
+        "msgs": Inputs(("msgs",), (), (scripts, Tree(config.dialog_dir, (".msg",), recursive=False))),
+        "worldmap": Inputs(
+            ("worldmap", repr(config.allowed_sets or [])),
+            (config.worldmap_path, config.script_sets_file, *registry),
+            protos,
+        ),
+    }
+
+
+def skip_unchanged(
+    config: ScanConfig, store: FingerprintStore, inputs: dict[str, Inputs]
+) -> tuple[ScanConfig, set[str]]:
+    """Disable the enabled checks whose inputs match those of their last passing run.
+
+    Args:
+        config: Engine configuration
+        store: Fingerprints of earlier passing runs
+        inputs: What each check reads, from validator_inputs()
+
+    Returns:
+        Tuple of (configuration without those checks, their names)
+    """
+    enabled = {
+        "scripts": config.check_scripts,
+        "lvars": config.check_lvars,
+        "msgs": config.check_msgs,
+        "worldmap": config.worldmap_path is not None,
+    }
+    skipped = {name for name in CHECK_NAMES if enabled[name] and store.unchanged(name, inputs[name])}
+    config = config._replace(
+        check_scripts=config.check_scripts and "scripts" not in skipped,
+        check_lvars=config.check_lvars and "lvars" not in skipped,
+        check_msgs=config.check_msgs and "msgs" not in skipped,
+        worldmap_path=None if "worldmap" in skipped else config.worldmap_path,
+    )
+    return config, skipped
+
+
+def record_results(
+    store: FingerprintStore,
+    inputs: dict[str, Inputs],
+    results: list[check_runner.CheckResult],
+    headers: list[str],
+) -> None:
+    """Remember the fingerprints of the checks that passed, and forget those of the failed ones.
+
+    Args:
+        store: Fingerprints of earlier passing runs, saved once updated
+        inputs: What each check reads, from validator_inputs()
+        results: Results of the checks that ran
+        headers: Headers the script checks read or looked for, also those outside the scripts directory
+    """
+    for result in results:
+        extra_files = headers if result.name in ("lvars", "msgs") else ()
+        store.record(result.name, inputs[result.name], not result.failed, extra_files)
+    store.save()
+
+
+def run_validators(
+    config: ScanConfig, metrics: Metrics, skipped: Iterable[str] = ()
+) -> tuple[list[check_runner.CheckResult], list[str]]:
+    """Run the enabled validators' checks concurrently, sharing one extraction of the scripts.
+
+    The script checks start as soon as the shared extraction is done, so a failing validator no
+    longer keeps the rest from running.
+
+    Args:
+        config: Engine configuration
+        metrics: Collector to record the phases in
+        skipped: Checks left out because their inputs are unchanged; each reports only that
+
+    Returns:
+        Tuple of (results in the order scripts, lvars, msgs, worldmap, headers the script checks read)
+    """
+    registry = load_registry(config, metrics)
+    enabled = {"dialogs": config.check_msgs, "lvars": config.check_lvars}
+    validators = tuple(name for name in _CODE_SCANNERS if enabled[name])
+    # Headers are scanned for all validators at once too
+    resolver = IncludeResolver(partial(scan_code, validators=validators))
+
+    def scripts_check() -> bool:
+        require_file(config.scripts_h)
+        require_file(config.scripts_lst)
+        with metrics.phase("scripts", "check"):
+            return scripts_lst.check_registry(registry)
+
+    def lvars_check() -> bool:
+        require_file(config.scripts_lst)
+        script_paths, results = extraction.result()
+        with metrics.phase("lvars", "check") as stats:
+            stats.files += len(script_paths)
+            return check_lvars(script_paths, results, resolver, registry)
+
+    def msgs_check() -> bool:
+        script_paths, results = extraction.result()
+        with metrics.phase("msgs", "check") as stats:
+            stats.files += len(script_paths)
+            return check_messages(config, script_paths, results, resolver, stats)
+
+    def worldmap_check(worldmap_path: Path) -> bool:
+        encounters, allowed_sets, protos = load_worldmap(config, worldmap_path, metrics)
+        with metrics.phase("worldmap", "check"):
+            found_problems = worldmap.check_encounters(
+                encounters, allowed_sets, registry.symbols(), registry.descriptions_by_num()
+            )
+            return (protos is not None and worldmap.check_pids(encounters, protos)) or found_problems
+
+    checks: dict[str, check_runner.Check] = {}
+    if config.check_scripts:
+        checks["scripts"] = scripts_check
+    if config.check_lvars:
+        checks["lvars"] = lvars_check
+    if config.check_msgs:
+        checks["msgs"] = msgs_check
+    if config.worldmap_path is not None:
+        checks["worldmap"] = partial(worldmap_check, config.worldmap_path)
+    for name in skipped:
+        checks[name] = partial(print, f"{name}: skipped, inputs unchanged")
+    checks = {name: checks[name] for name in CHECK_NAMES if name in checks}
+    profiling = config.profile_dir is not None
+    if profiling:
+        checks = {name: partial(call_profiled, config.profile_dir, name, check) for name, check in checks.items()}
+    with ThreadPoolExecutor(max_workers=1) as extractor:
+        extract = partial(extract_scripts, config, validators, resolver, metrics)
+        extraction = extractor.submit(call_profiled, config.profile_dir, "engine", extract)
+        if profiling:
+            # Only one profiler can be active at a time
+            extraction.result()
+        results = check_runner.run_checks(checks, sequential=profiling)
+    headers = resolver.headers(include for result in extraction.result()[1] for include in result.includes)
+    return results, headers
+
+
+def run(config: ScanConfig) -> None:
+    """Run all enabled validators in a single pass over their inputs.
+
+    Once all checks have finished, their output is printed in the order scripts, lvars, msgs,
+    worldmap, and the run exits with status 1 if any of them found problems. With a cache
+    directory, checks whose inputs are unchanged since their last passing run are skipped, see
+    fingerprint.py.
+
+    Args:
+        config: Engine configuration
+    """
+    metrics = Metrics()
+    store = FingerprintStore(config.cache_dir) if config.cache_dir else None
+    inputs = validator_inputs(config)
+    skipped: set[str] = set()
+    if store is not None:
+        with metrics.phase("engine", "walk"):
+            config, skipped = skip_unchanged(config, store, inputs)
+    results, headers = run_validators(config, metrics, skipped)
+    found_problems = check_runner.report(results)
+    if store is not None:
+        record_results(store, inputs, [result for result in results if result.name not in skipped], headers)
+    if config.metrics_path:
+        metrics.write(config.metrics_path)
+    if found_problems:
+        sys.exit(1)
@@ -0,0 +1,148 @@
+"""Parse-once model of scripts.h and scripts.lst shared by the validators.
+
+Both files are read once per run into column arrays: scripts.h defines by position, scripts.lst
+entries by line. The local_vars and description columns of scripts.lst are parsed on first use, as
+only some validators need them. Validators query the columns through views shaped like their old parsers'
+results, and duplicates are found through an inverted index from name to first line, with the
+few repeated lines kept aside.
+"""
+
+from array import array
+from collections.abc import Iterable, Iterator
+from functools import cached_property
+from pathlib import Path
+import re
+
+# Same patterns the validators used on their own: scripts_lst's strict SCRIPT_ define, worldmap's
+# looser define of any symbol, and lvars' local_vars entry
+_SCRIPT_DEFINE_REGEX = re.compile(r"^#define\s+SCRIPT_(\w+)\s+\((\d+)\)\s+.*")
+_DEFINE_REGEX = re.compile(r"#define\s+(\S+)\s+\((\d+)\)")
+_LOCAL_VARS_REGEX = re.compile(r"^(\w+)\.int.*local_vars=(\d+)")
+
+# Placeholder for lines without a local_vars entry
+NO_LOCAL_VARS = -1
+
+
+def read_lines(path: str | Path | None) -> list[str]:
+    """Read the lines of scripts.h or scripts.lst.
+
+    Args:
+        path: Path to the file, or None if it is not configured
+
+    Returns:
+        Lines of the file, or none if it is not configured
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    if path is None:
+        return []
+    with open(path, encoding="utf-8", errors="replace") as fhandle:
+        return fhandle.readlines()
+
+
+class ScriptRegistry:
+    """Script definitions from scripts.h and script entries from scripts.lst."""
+
+    def __init__(self, h_lines: Iterable[str] = (), lst_lines: Iterable[str] = ()) -> None:
+        # scripts.h columns, one row per `#define SYMBOL (number)` line
+        self.h_numbers = array("i")
+        self.h_symbols: list[str] = []
+        self.h_is_script = bytearray()  # Row is a `#define SCRIPT_... (number)` line checked against scripts.lst
+        # scripts.lst columns, row i is line i + 1
+        self.lst_names: list[str] = []  # Upper-case script name, "" for blank lines
+        self._lst_lines: list[str] = []
+        self._first_line: dict[str, int] = {}
+        self._repeat_lines: dict[str, list[int]] = {}  # Lines after the first of names listed more than once
+
+        for line in h_lines:
+            match = _DEFINE_REGEX.search(line)
+            if match:
+                self.h_numbers.append(int(match[2]))
+                self.h_symbols.append(match[1])
+                self.h_is_script.append(match[1].startswith("SCRIPT_") and _SCRIPT_DEFINE_REGEX.match(line) is not None)
+
+        for linenum, line in enumerate(lst_lines, start=1):
+            name = line.split(".", maxsplit=1)[0].strip().upper()
+            self.lst_names.append(name)
+            if self._first_line.setdefault(name, linenum) != linenum:
+                self._repeat_lines.setdefault(name, []).append(linenum)
+            self._lst_lines.append(line)
+
+    @cached_property
+    def local_vars(self) -> array:
+        """local_vars allocation of each scripts.lst line, NO_LOCAL_VARS when the line has none."""
+        local_vars = array("i")
+        for line in self._lst_lines:
+            match = _LOCAL_VARS_REGEX.match(line) if "local_vars=" in line else None
+            local_vars.append(int(match[2]) if match else NO_LOCAL_VARS)
+        return local_vars
+
+    @cached_property
+    def descriptions(self) -> list[str]:
+        """Comment after `;` of each scripts.lst line, "" if none."""
+        return [line.partition(";")[2].split("#", 1)[0].strip() for line in self._lst_lines]
+
+    @classmethod
+    def load(cls, scripts_h_path: str | Path | None, scripts_lst_path: str | Path | None) -> "ScriptRegistry":
+        """Read scripts.h and scripts.lst once.
+
+        Args:
+            scripts_h_path: Path to scripts.h, or None to leave it out
+            scripts_lst_path: Path to scripts.lst, or None to leave it out
+
+        Returns:
+            Registry of both files
+
+        Raises:
+            OSError: If a given file cannot be read
+        """
+        return cls(read_lines(scripts_h_path), read_lines(scripts_lst_path))
+
+    def _script_defines(self) -> Iterator[tuple[int, str]]:
+        """Yield (number, name) of every SCRIPT_ define in file order, names stripped of the prefix."""
+        for number, symbol, is_script in zip(self.h_numbers, self.h_symbols, self.h_is_script, strict=True):
+            if is_script:
+                yield number, symbol.removeprefix("SCRIPT_")
+
+    def h_by_num(self) -> dict[int, str]:
+        """Return SCRIPT_ define names by script number; later defines win."""
+        return dict(self._script_defines())
+
+    def h_by_name(self) -> dict[str, int]:
+        """Return script numbers by SCRIPT_ define name; later defines win."""
+        return {name: number for number, name in self._script_defines()}
+
+    def symbols(self) -> dict[int, str]:
+        """Return the symbol of every define in scripts.h by number; later defines win."""
+        return dict(zip(self.h_numbers, self.h_symbols, strict=True))
+
+    def lst_by_num(self) -> dict[int, str]:
+        """Return scripts.lst script names by line number."""
+        return dict(enumerate(self.lst_names, start=1))
+
+    def lines_of(self, name: str) -> list[int]:
+        """Return the scripts.lst line numbers of an upper-case script name."""
+        if name not in self._first_line:
+            return []
+        return [self._first_line[name], *self._repeat_lines.get(name, ())]
+
+    def duplicates(self) -> dict[str, list[int]]:
+        """Return script names listed on more than one scripts.lst line, with those lines.
+
+        Returns:
+            Line numbers by script name, names sorted
+        """
+        return {name: [self._first_line[name], *lines] for name, lines in sorted(self._repeat_lines.items())}
+
+    def lvars_by_name(self) -> dict[str, int]:
+        """Return scripts.lst local_vars allocations by lower-case script name; the first entry wins."""
+        allocations: dict[str, int] = {}
+        for name, num_lvars in zip(self.lst_names, self.local_vars, strict=True):
+            if num_lvars != NO_LOCAL_VARS:
+                allocations.setdefault(name.lower(), num_lvars)
+        return allocations
+
+    def descriptions_by_num(self) -> dict[int, str]:
+        """Return scripts.lst descriptions by line number, skipping lines without one."""
+        return {linenum: text for linenum, text in enumerate(self.descriptions, start=1) if text}
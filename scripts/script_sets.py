@@ -0,0 +1,90 @@
+"""Precompiled index of the script combinations allowed together in a worldmap encounter.
+
+An encounter's scripts are allowed if they are a subset of some allowed set, so sub-combinations
+of an allowed set need not be listed. Exact matches are found with a single hash lookup. Subsets
+are found through an inverted index: each script maps to a bitmask of the allowed sets that contain
+it, and the scripts are a subset of some set if the AND of their masks is not zero.
+
+Allowed sets are written one per line, with script numbers separated by commas or whitespace and
+`#` or `;` starting a comment, e.g. "100,101  # merchant and guard".
+"""
+
+from collections.abc import Iterable
+from pathlib import Path
+import re
+
+# Type alias for an allowed script combination
+ScriptSet = list[int]  # Script numbers, sorted
+
+_SEPARATOR_REGEX = re.compile(r"[\s,]+")
+
+
+def parse_script_set(text: str) -> ScriptSet | None:
+    """Parse an allowed set.
+
+    Args:
+        text: Script numbers separated by commas or whitespace, optionally followed by a comment
+
+    Returns:
+        Sorted script numbers, or None if the text is blank or only a comment
+    """
+    content = text.split("#", 1)[0].split(";", 1)[0].strip()
+    if not content:
+        return None
+    return sorted(int(item) for item in _SEPARATOR_REGEX.split(content) if item)
+
+
+def read_script_sets(path: str | Path) -> list[ScriptSet]:
+    """Read allowed sets from a file, one per line.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Allowed sets in file order
+    """
+    with open(path, encoding="utf-8") as fhandle:
+        return [script_set for line in fhandle if (script_set := parse_script_set(line)) is not None]
+
+
+class ScriptSetIndex:
+    """Allowed script sets, indexed for exact and subset lookups."""
+
+    def __init__(self, script_sets: Iterable[Iterable[int]]) -> None:
+        """Index allowed sets.
+
+        Args:
+            script_sets: Allowed script combinations; duplicates are indexed once
+        """
+        self._exact: set[frozenset[int]] = set()
+        self._masks: dict[int, int] = {}  # Bitmask of the sets containing each script
+        for script_set in script_sets:
+            key = frozenset(script_set)
+            if key in self._exact:
+                continue
+            bit = 1 << len(self._exact)
+            self._exact.add(key)
+            for script in key:
+                self._masks[script] = self._masks.get(script, 0) | bit
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def allows(self, scripts: Iterable[int]) -> bool:
+        """Check whether scripts may appear together in an encounter.
+
+        Args:
+            scripts: Scripts of an encounter
+
+        Returns:
+            True if they are one of the allowed sets or a subset of one
+        """
+        key = frozenset(scripts)
+        if key in self._exact:
+            return True
+        mask = (1 << len(self._exact)) - 1
+        for script in key:
+            mask &= self._masks.get(script, 0)
+            if not mask:
+                return False
+        return bool(mask)
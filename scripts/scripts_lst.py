@@ -8,11 +8,14 @@ This module checks for:
 """
 
 import argparse
-from collections import Counter
 from pathlib import Path
-import re
 import sys
 
+from incremental import any_changed, changed_since
+from metrics import Metrics
+from profiling import profiled
+from script_registry import ScriptRegistry
+
 # Type aliases for clarity
 ScriptsByNumber = dict[int, str]  # Maps script number to script name
 ScriptsByName = dict[str, int]  # Maps script name to script number
@@ -24,6 +27,22 @@ parser = argparse.ArgumentParser(
 
 parser.add_argument("SCRIPTS_H", help="scripts.h path")
 parser.add_argument("SCRIPTS_LST", help="scripts.lst path")
+parser.add_argument(
+    "--changed-since",
+    dest="changed_since",
+    metavar="REF",
+    help="skip the check unless scripts.h or scripts.lst changed since this git ref",
+)
+parser.add_argument(
+    "--metrics",
+    metavar="FILE",
+    help="write per-phase performance metrics to FILE as JSON, and to the GitHub job summary if there is one",
+)
+parser.add_argument(
+    "--profile",
+    metavar="DIR",
+    help="profile the run and write NAME.pstats and NAME.collapsed flamegraph stacks to DIR",
+)
 
 
 def parse_h(scripts_h_path: str | Path) -> tuple[ScriptsByNumber, ScriptsByName]:
@@ -35,15 +54,8 @@ def parse_h(scripts_h_path: str | Path) -> tuple[ScriptsByNumber, ScriptsByName]
     Returns:
         Tuple of (scripts by number, scripts by name) dictionaries
     """
-    h_by_num: ScriptsByNumber = {}
-    h_by_name: ScriptsByName = {}
-    with open(scripts_h_path, encoding="utf-8") as fhandle:
-        for line in fhandle:
-            match = re.match(r"^#define\s+SCRIPT_(\w+)\s+\((\d+)\)\s+.*", line)
-            if match:
-                h_by_num[int(match[2])] = match[1]
-                h_by_name[match[1]] = int(match[2])
-    return h_by_num, h_by_name
+    registry = ScriptRegistry.load(scripts_h_path, None)
+    return registry.h_by_num(), registry.h_by_name()
 
 
 def parse_lst(scripts_lst_path: str | Path) -> ScriptsByNumber:
@@ -55,38 +67,42 @@ def parse_lst(scripts_lst_path: str | Path) -> ScriptsByNumber:
     Returns:
         Dictionary mapping line numbers to script names
     """
-    lst_by_num: ScriptsByNumber = {}
-    with open(scripts_lst_path, encoding="utf-8") as fhandle:
-        for linenum, line in enumerate(fhandle, start=1):
-            scr = line.split(".", maxsplit=1)[0].strip().upper()
-            lst_by_num[linenum] = scr
-    return lst_by_num
+    return ScriptRegistry.load(None, scripts_lst_path).lst_by_num()
 
 
-def check_lst_dupes(lst_by_num: ScriptsByNumber) -> bool:
+def check_lst_dupes(registry: ScriptRegistry) -> bool:
     """Search for duplicate scripts in scripts.lst.
 
     Args:
-        lst_by_num: Dictionary mapping line numbers to script names
+        registry: Registry holding scripts.lst
 
     Returns:
         True if duplicates were found, False otherwise
     """
-    name_counts = Counter(lst_by_num.values())
-    lst_duped_names = sorted(name for name, count in name_counts.items() if count > 1)
-    lst_duped_names = [x for x in lst_duped_names if x != "RESERVED"]
-
     found_dupes = False
-    if len(lst_duped_names) > 0:
+    for name, duped_lines in registry.duplicates().items():
+        if name == "RESERVED":
+            continue
         found_dupes = True
-
-    for name in lst_duped_names:
-        duped_lines = [key for key, value in lst_by_num.items() if value == name]
         dupes_str = ", ".join([str(x) for x in duped_lines])
         print(f"Dupe: {name} is defined on lines {dupes_str} in scripts.lst")
     return found_dupes
 
 
+def check_registry(registry: ScriptRegistry) -> bool:
+    """Run all scripts.h and scripts.lst checks.
+
+    Args:
+        registry: Registry holding scripts.h and scripts.lst
+
+    Returns:
+        True if problems were found, False otherwise
+    """
+    has_lst_dupes = check_lst_dupes(registry)
+    has_scripts_h_problem = check_scripts_h(registry.lst_by_num(), registry.h_by_num(), registry.h_by_name())
+    return has_lst_dupes or has_scripts_h_problem
+
+
 def check_scripts_h(lst_by_num: ScriptsByNumber, h_by_num: ScriptsByNumber, h_by_name: ScriptsByName) -> bool:
     """Search for mismatched names and missing scripts.h defines.
 
@@ -110,18 +126,32 @@ def check_scripts_h(lst_by_num: ScriptsByNumber, h_by_num: ScriptsByNumber, h_by
     return warning
 
 
-def main(argv: list[str] | None = None) -> None:
-    """Main entry point for script validation."""
+def main(argv: list[str] | None = None, metrics: Metrics | None = None) -> None:
+    """Main entry point for script validation.
+
+    Args:
+        argv: Command line arguments; sys.argv[1:] if None
+        metrics: Collector to record phase metrics in, e.g. shared by action.py; by default a new
+            one, written out if --metrics is given
+    """
     args = parser.parse_args(argv)
-    scripts_h_path = Path(args.SCRIPTS_H)
-    scripts_lst_path = Path(args.SCRIPTS_LST)
-    h_by_num, h_by_name = parse_h(scripts_h_path)
-    lst_by_num = parse_lst(scripts_lst_path)
-    has_lst_dupes = check_lst_dupes(lst_by_num)
-    has_scripts_h_problem = check_scripts_h(lst_by_num, h_by_num, h_by_name)
-
-    if has_lst_dupes or has_scripts_h_problem:
-        sys.exit(1)
+    with profiled(args.profile, "scripts"):
+        scripts_h_path = Path(args.SCRIPTS_H)
+        scripts_lst_path = Path(args.SCRIPTS_LST)
+        metrics = metrics or Metrics()
+        changed = changed_since(args.changed_since, scripts_lst_path)
+        if not any_changed([scripts_h_path, scripts_lst_path], changed):
+            print(f"scripts.h and scripts.lst unchanged since {args.changed_since}, skipping.")
+            return
+        with metrics.phase("scripts", "extract") as extract:
+            registry = ScriptRegistry.load(scripts_h_path, scripts_lst_path)
+            extract.add_files([scripts_h_path, scripts_lst_path])
+        with metrics.phase("scripts", "check"):
+            found_problems = check_registry(registry)
+        if args.metrics:
+            metrics.write(args.metrics)
+        if found_problems:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+"""Directory tree walker for finding input files, built on os.scandir.
+
+Unlike Path.rglob(), the walker prunes directories as soon as they are excluded, so asset
+folders, `.git` and build output are never descended into. Directories and files are excluded
+by glob patterns and by the `.gitignore` files of the enclosing git work tree. Each file found
+comes with the stat info scandir already fetched, so later stages need not stat it again.
+
+Supported .gitignore syntax: comments, `!` negation, trailing `/` for directories only, and
+leading or inner `/` anchoring a pattern to its .gitignore's directory; `*` also matches `/`.
+"""
+
+from fnmatch import fnmatchcase
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+# Directories never worth descending into, whatever the configuration
+ALWAYS_EXCLUDED = (".git",)
+
+
+class FileEntry(NamedTuple):
+    """A file found by the walker."""
+
+    path: Path
+    stat: os.stat_result
+
+
+class IgnoreRule(NamedTuple):
+    """One pattern line of a .gitignore file."""
+
+    pattern: str
+    base: str  # Directory of the .gitignore, relative to the work tree top; "" for the top
+    negate: bool  # Pattern starts with `!` and re-includes what earlier rules excluded
+    dir_only: bool  # Pattern ends with `/` and only matches directories
+    anchored: bool  # Pattern contains `/` and matches paths relative to base, not bare names
+
+
+def parse_gitignore(text: str, base: str = "") -> list[IgnoreRule]:
+    """Parse the contents of a .gitignore file.
+
+    Args:
+        text: Contents of the file
+        base: Directory of the file, relative to the work tree top
+
+    Returns:
+        Rules in file order; later rules take precedence
+    """
+    rules: list[IgnoreRule] = []
+    for raw_line in text.splitlines():
+        line = raw_line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        line = line.removeprefix("!").removeprefix("\\")
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        line = line.removeprefix("**/")
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if line:
+            rules.append(IgnoreRule(line, base, negate, dir_only, anchored))
+    return rules
+
+
+def is_ignored(rel_path: str, is_dir: bool, rules: list[IgnoreRule]) -> bool:
+    """Check whether .gitignore rules exclude a path.
+
+    Args:
+        rel_path: POSIX path relative to the work tree top
+        is_dir: Whether the path is a directory
+        rules: Rules of every .gitignore from the top down to the path's directory
+
+    Returns:
+        True if the last matching rule excludes the path
+    """
+    name = rel_path.rsplit("/", 1)[-1]
+    ignored = False
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        subject = name
+        if rule.anchored:
+            subject = rel_path[len(rule.base) + 1 :] if rule.base else rel_path
+        if fnmatchcase(subject, rule.pattern):
+            ignored = not rule.negate
+    return ignored
+
+
+def is_excluded(rel_path: str, patterns: tuple[str, ...]) -> bool:
+    """Check whether exclude globs match a path or its name.
+
+    Args:
+        rel_path: POSIX path relative to the walk root
+        patterns: Exclude globs, e.g. "vendor" or "build/*"
+
+    Returns:
+        True if some glob matches
+    """
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(fnmatchcase(rel_path, pattern) or fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def _read_rules(dir_path: Path, base: str) -> list[IgnoreRule]:
+    """Return the rules of a directory's .gitignore, or none if it has no readable one."""
+    try:
+        text = (dir_path / ".gitignore").read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return []
+    return parse_gitignore(text, base)
+
+
+def _enclosing_rules(root: Path) -> tuple[str, list[IgnoreRule]]:
+    """Find the git work tree enclosing root and read the .gitignore files above root.
+
+    Returns:
+        Tuple of (root relative to the work tree top, rules from the top down to root's parent);
+        outside a work tree, root is treated as the top
+    """
+    root = root.resolve()
+    for top in [root, *root.parents]:
+        if (top / ".git").exists():
+            break
+    else:
+        return "", []
+    rules: list[IgnoreRule] = []
+    parts = root.relative_to(top).parts
+    for depth in range(len(parts)):
+        base = "/".join(parts[:depth])
+        rules += _read_rules(top.joinpath(*parts[:depth]), base)
+    return "/".join(parts), rules
+
+
+def walk_files(
+    root: str | Path,
+    suffix: str,
+    exclude: tuple[str, ...] = (),
+    use_gitignore: bool = True,
+) -> list[FileEntry]:
+    """Find files with a suffix in a directory tree, pruning excluded directories.
+
+    Args:
+        root: Directory to search
+        suffix: File name suffix to match, case-sensitively, e.g. ".ssl"
+        exclude: Globs matched against paths relative to root and against bare names
+        use_gitignore: Skip what the enclosing work tree's .gitignore files exclude
+
+    Returns:
+        Files found with their stat info, sorted by path within each directory, files first
+    """
+    root = Path(root)
+    exclude = (*ALWAYS_EXCLUDED, *exclude)
+    top_rel, top_rules = _enclosing_rules(root) if use_gitignore else ("", [])
+    entries: list[FileEntry] = []
+    # Stack of (directory, path relative to root, inherited .gitignore rules)
+    stack: list[tuple[Path, str, list[IgnoreRule]]] = [(root, "", top_rules)]
+    while stack:
+        dir_path, dir_rel, rules = stack.pop()
+        if use_gitignore:
+            tree_rel = "/".join(part for part in (top_rel, dir_rel) if part)
+            rules = rules + _read_rules(dir_path, tree_rel)
+        try:
+            with os.scandir(dir_path) as scan:
+                children = sorted(scan, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirs: list[tuple[Path, str, list[IgnoreRule]]] = []
+        for child in children:
+            rel = f"{dir_rel}/{child.name}" if dir_rel else child.name
+            # Like rglob(), do not follow directory symlinks, which may form cycles
+            is_dir = child.is_dir(follow_symlinks=False)
+            if not is_dir and not child.name.endswith(suffix):
+                continue
+            if is_excluded(rel, exclude):
+                continue
+            if use_gitignore and is_ignored("/".join(part for part in (top_rel, rel) if part), is_dir, rules):
+                continue
+            if is_dir:
+                subdirs.append((Path(child.path), rel, rules))
+            elif child.is_file():
+                entries.append(FileEntry(Path(child.path), child.stat()))
+        stack.extend(reversed(subdirs))
+    return entries
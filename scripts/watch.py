@@ -0,0 +1,210 @@
+"""Watch mode: revalidate a mod as its files change, printing new and resolved findings.
+
+The inputs are polled, with no dependencies: each poll stats the configured files and walks the
+scripts, dialog and proto directories. Changes are collected until no further change shows up for
+the debounce period, so a `git checkout` touching a thousand files triggers a single run. Only the
+checks whose inputs changed run again, from the parsed state daemon.Daemon keeps in memory, which
+rescans only the changed files. Their findings are compared with the previous run's, and only the
+differences are printed.
+"""
+
+from collections.abc import Callable, Iterable
+import os
+from pathlib import Path
+import time
+
+import check_runner
+from daemon import Daemon
+from protos import PROTO_TYPES
+from scan_engine import CHECK_NAMES, ScanConfig
+from tree_walker import walk_files
+
+# Type aliases
+Snapshot = dict[Path, tuple[int, int]]  # Size and mtime of every watched file
+Findings = dict[str, list[str]]  # Lines printed by each check
+
+# Seconds between polls; a poll of vanilla Fallout 2 sized trees takes tens of milliseconds
+POLL_INTERVAL = 1.0
+# Seconds without further changes before a batch of changes is revalidated
+DEBOUNCE = 1.0
+
+
+def _add_files(snapshot: Snapshot, paths: Iterable[Path]) -> None:
+    """Add the size and mtime of existing files to a snapshot."""
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+
+
+def _list_dir(directory: Path, suffixes: tuple[str, ...]) -> list[Path]:
+    """List the files of a directory with one of some lower-case suffixes; none if it does not exist."""
+    try:
+        with os.scandir(directory) as entries:
+            return [Path(entry.path) for entry in entries if entry.name.lower().endswith(suffixes) and entry.is_file()]
+    except OSError:
+        return []
+
+
+def take_snapshot(config: ScanConfig) -> Snapshot:
+    """Stat every input of the enabled checks.
+
+    Args:
+        config: Inputs to watch, with resolved paths
+
+    Returns:
+        Size and mtime of each existing input file
+    """
+    snapshot: Snapshot = {}
+    scripts = walk_files(config.scripts_dir, "", config.exclude, config.use_gitignore)
+    for path, stat in scripts:
+        if path.suffix.lower() in (".ssl", ".h"):
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+    _add_files(snapshot, _list_dir(config.dialog_dir, (".msg",)))
+    files = (config.scripts_h, config.scripts_lst, config.worldmap_path, config.script_sets_file)
+    _add_files(snapshot, (path for path in files if path is not None))
+    if config.proto_dir is not None:
+        for type_name in PROTO_TYPES:
+            _add_files(snapshot, _list_dir(config.proto_dir / type_name, (".lst", ".pro")))
+    return snapshot
+
+
+def changed_files(old: Snapshot, new: Snapshot) -> set[Path]:
+    """Return the files added, removed or modified between two snapshots."""
+    changed = {path for path, signature in new.items() if old.get(path) != signature}
+    return changed | (old.keys() - new.keys())
+
+
+def affected_checks(config: ScanConfig, changed: Iterable[Path]) -> list[str]:
+    """Select the checks that read some changed files.
+
+    Args:
+        config: Inputs, with resolved paths
+        changed: Changed files, from changed_files()
+
+    Returns:
+        Names of the affected checks, in run order
+    """
+    registry_inputs = {config.scripts_h, config.scripts_lst}
+    worldmap_inputs = {config.worldmap_path, config.script_sets_file}
+    affected: set[str] = set()
+    for path in changed:
+        suffix = path.suffix.lower()
+        if path in registry_inputs:
+            affected |= {"scripts", "lvars", "worldmap"}
+        elif path in worldmap_inputs or (config.proto_dir is not None and path.is_relative_to(config.proto_dir)):
+            affected.add("worldmap")
+        elif suffix in (".ssl", ".h"):
+            affected |= {"lvars", "msgs"}
+        elif suffix == ".msg":
+            affected.add("msgs")
+    return [name for name in CHECK_NAMES if name in affected]
+
+
+def diff_findings(old: list[str], new: list[str]) -> tuple[list[str], list[str]]:
+    """Compare the findings of two runs of a check.
+
+    Args:
+        old: Lines printed by the previous run
+        new: Lines printed by this run
+
+    Returns:
+        Tuple of (new findings, resolved findings), each in printed order
+    """
+    old_set = set(old)
+    new_set = set(new)
+    return [line for line in new if line not in old_set], [line for line in old if line not in new_set]
+
+
+class Watcher:
+    """Validation state of a mod, revalidated in batches as its files change."""
+
+    def __init__(
+        self,
+        config: ScanConfig,
+        poll_interval: float = POLL_INTERVAL,
+        debounce: float = DEBOUNCE,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a watcher; nothing is read until start().
+
+        Args:
+            config: Inputs and enabled checks
+            poll_interval: Seconds between polls
+            debounce: Seconds without further changes before a batch is revalidated
+            sleep: Function to wait with, replaceable in tests
+            clock: Monotonic clock measuring the debounce period, replaceable in tests
+        """
+        resolved = {
+            name: path.resolve()
+            for name in ("scripts_h", "scripts_lst", "worldmap_path", "script_sets_file", "proto_dir", "dialog_dir")
+            if (path := getattr(config, name)) is not None
+        }
+        self.state = Daemon(config._replace(**resolved))
+        self.config = self.state.config
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._sleep = sleep
+        self._clock = clock
+        self.snapshot: Snapshot = {}
+        self.findings: Findings = {}
+
+    def start(self) -> bool:
+        """Run every enabled check and print its findings, as a one-off run would.
+
+        Returns:
+            True if some check failed, False otherwise
+        """
+        self.snapshot = take_snapshot(self.config)
+        results = self.state.validate_project(totals=False)
+        self.findings = {result.name: result.output.splitlines() for result in results}
+        return check_runner.report(results)
+
+    def wait(self) -> set[Path]:
+        """Poll until files change, then until no more change for the debounce period.
+
+        Returns:
+            Files changed over the whole batch
+        """
+        batch: set[Path] = set()
+        quiet_since = 0.0
+        while not batch or self._clock() - quiet_since < self.debounce:
+            self._sleep(self.poll_interval)
+            snapshot = take_snapshot(self.config)
+            changed = changed_files(self.snapshot, snapshot)
+            self.snapshot = snapshot
+            if changed:
+                batch |= changed
+                quiet_since = self._clock()
+        return batch
+
+    def revalidate(self, changed: set[Path]) -> None:
+        """Rerun the checks affected by changed files and print how their findings changed.
+
+        Args:
+            changed: Files changed since the previous run
+        """
+        names = affected_checks(self.config, changed)
+        print(f"{len(changed)} changed file(s), rerunning: {', '.join(names) or 'nothing'}")
+        found_changes = False
+        for result in self.state.validate_project(names, totals=False):
+            lines = result.output.splitlines()
+            new, resolved = diff_findings(self.findings.get(result.name, []), lines)
+            self.findings[result.name] = lines
+            for line in new:
+                print(f"+ {result.name}: {line}")
+            for line in resolved:
+                print(f"- {result.name}: {line}")
+            found_changes = found_changes or bool(new or resolved)
+        if not found_changes:
+            print("No new or resolved findings.")
+
+    def run(self) -> None:
+        """Validate, then revalidate on every batch of changes until interrupted."""
+        self.start()
+        print("Watching for changes, press Ctrl+C to stop.")
+        while True:
+            self.revalidate(self.wait())
@@ -7,17 +7,52 @@ worldmap.txt is UTF-8/ASCII encoded.
 """
 
 import argparse
-import configparser
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 import re
 import sys
+from typing import NamedTuple
+
+from incremental import any_changed, any_changed_under, changed_since
+from metrics import Metrics
+from profiling import profiled
+from protos import ProtoIndex
+from scan_cache import ScanCache
+from script_registry import ScriptRegistry
+from script_sets import ScriptSet, ScriptSetIndex, parse_script_set, read_script_sets
 
 # Type aliases
-ScriptSet = list[int]  # A set of script numbers that can appear together
 AllowedScriptSets = list[ScriptSet]  # List of allowed script combinations
 ScriptNames = dict[int, str]
 ScriptDescriptions = dict[int, str]
-SectionLines = dict[str, int]
+
+_ENCOUNTER_PREFIX = "Encounter: "
+# Numeric fields of an encounter entry, e.g. "Ratio:50%, pid:16777216, Script:12"
+_ENTRY_FIELD_REGEX = re.compile(r"(Ratio|[Pp]id|Script):(\d+)")
+
+
+class EncounterEntry(NamedTuple):
+    """A key of an encounter section, usually a type_NN critter."""
+
+    key: str  # Lower-case key, e.g. "type_00"
+    line: int  # 1-based line number in worldmap.txt
+    ratio: int | None  # Ratio:NN%
+    pid: int | None  # Pid:NNN
+    script: int | None  # Script:NNN
+    dead: bool  # Value starts with "Dead,"; scripts of dead critters don't matter
+
+
+class Encounter(NamedTuple):
+    """An [Encounter: ...] section of worldmap.txt."""
+
+    section: str  # Section name, e.g. "Encounter: Den_Slavers"
+    line: int  # 1-based line number of the section header
+    entries: dict[str, EncounterEntry]  # Entries by key
+
+    def scripts(self) -> ScriptSet:
+        """Return the distinct scripts of the encounter's living critters, sorted."""
+        return sorted({entry.script for entry in self.entries.values() if entry.script is not None and not entry.dead})
+
 
 parser = argparse.ArgumentParser(
     description="Find discrepancies in worldmap.txt",
@@ -27,14 +62,46 @@ parser = argparse.ArgumentParser(
 parser.add_argument("worldmap", help="worldmap.txt path")
 parser.add_argument("--scripts-h", dest="scripts_h", help="scripts.h path", required=False)
 parser.add_argument("--scripts-lst", dest="scripts_lst", help="scripts.lst path", required=False)
+parser.add_argument(
+    "--proto-dir",
+    dest="proto_dir",
+    metavar="DIR",
+    help="check encounter Pids against critters/critters.lst, items/items.lst and their .pro files in DIR, "
+    "e.g. data/proto",
+)
+parser.add_argument("--cache-dir", dest="cache_dir", help="directory to cache proto lists and headers in between runs")
+parser.add_argument(
+    "--changed-since",
+    dest="changed_since",
+    metavar="REF",
+    help="skip the check unless worldmap.txt, scripts.h, scripts.lst, the script sets file or the protos changed "
+    "since this git ref",
+)
+parser.add_argument(
+    "--metrics",
+    metavar="FILE",
+    help="write per-phase performance metrics to FILE as JSON, and to the GitHub job summary if there is one",
+)
+parser.add_argument(
+    "--profile",
+    metavar="DIR",
+    help="profile the run and write NAME.pstats and NAME.collapsed flamegraph stacks to DIR",
+)
 parser.add_argument(
     "-s",
     dest="script_sets",
-    help="allow sets of scripts to be present in an encounter together, like so: '-s 100,101  200,201,202'",
+    help="allow sets of scripts, and any of their subsets, to be present in an encounter together, like so: "
+    "'-s 100,101  200,201,202'",
     action="append",
     nargs="+",
     required=False,
 )
+parser.add_argument(
+    "--script-sets-file",
+    dest="script_sets_file",
+    metavar="FILE",
+    help="also allow the script sets in FILE, one per line, with numbers separated by commas or spaces",
+)
 
 
 def get_allowed_script_sets(script_sets: list[list[str]] | None) -> AllowedScriptSets:
@@ -48,56 +115,117 @@ def get_allowed_script_sets(script_sets: list[list[str]] | None) -> AllowedScrip
     """
     allowed_script_sets: AllowedScriptSets = []
     if script_sets:
-        allow_sets = script_sets[0]
-        for allow_set in allow_sets:
-            content = allow_set.split("#", 1)[0].split(";", 1)[0].strip()
-            if not content:
-                continue
-            allow_list = [item.strip() for item in content.split(",") if item.strip()]
-            # Convert to int for proper numeric sorting
-            allow_list_int = sorted(int(x) for x in allow_list)
-            allowed_script_sets.append(allow_list_int)
+        for allow_set in script_sets[0]:
+            script_set = parse_script_set(allow_set)
+            if script_set is not None:
+                allowed_script_sets.append(script_set)
     return allowed_script_sets
 
 
+def load_allowed_sets(script_sets: AllowedScriptSets, script_sets_file: Path | None) -> ScriptSetIndex:
+    """Index the allowed script sets, exiting with an error if their file does not exist.
+
+    Args:
+        script_sets: Allowed sets given directly, e.g. from get_allowed_script_sets()
+        script_sets_file: File with more allowed sets, one per line, or None
+
+    Returns:
+        Index of all allowed sets
+    """
+    if script_sets_file is not None:
+        if not script_sets_file.is_file():
+            print(f"{script_sets_file} does not exist.")
+            sys.exit(1)
+        script_sets = script_sets + read_script_sets(script_sets_file)
+    return ScriptSetIndex(script_sets)
+
+
+def _existing(path: Path | None) -> Path | None:
+    """Return path if it names an existing file, None otherwise."""
+    return path if path is not None and path.exists() else None
+
+
 def get_script_names(scripts_h_path: Path | None) -> ScriptNames:
     """Parse scripts.h and return a map of script number to symbolic name."""
-    if scripts_h_path is None or not scripts_h_path.exists():
-        return {}
-
-    script_names: ScriptNames = {}
-    pattern = re.compile(r"#define\s+(\S+)\s+\((\d+)\)")
-    for line in scripts_h_path.read_text(encoding="utf-8", errors="replace").splitlines():
-        match = pattern.search(line)
-        if match:
-            script_names[int(match.group(2))] = match.group(1)
-    return script_names
+    return ScriptRegistry.load(_existing(scripts_h_path), None).symbols()
 
 
 def get_script_descriptions(scripts_lst_path: Path | None) -> ScriptDescriptions:
     """Parse scripts.lst and return a map of script number to human description."""
-    if scripts_lst_path is None or not scripts_lst_path.exists():
-        return {}
-
-    script_descriptions: ScriptDescriptions = {}
-    for index, line in enumerate(scripts_lst_path.read_text(encoding="utf-8", errors="replace").splitlines(), start=1):
-        _, _, comment = line.partition(";")
-        description = comment.split("#", 1)[0].strip()
-        if description:
-            script_descriptions[index] = description
-    return script_descriptions
-
-
-def get_section_lines(worldmap_path: Path) -> SectionLines:
-    """Return the source line number for each INI section header."""
-    section_lines: SectionLines = {}
-    for line_number, line in enumerate(
-        worldmap_path.read_text(encoding="utf-8", errors="replace").splitlines(), start=1
-    ):
-        stripped = line.strip()
-        if stripped.startswith("[") and stripped.endswith("]"):
-            section_lines[stripped[1:-1]] = line_number
-    return section_lines
+    return ScriptRegistry.load(None, _existing(scripts_lst_path)).descriptions_by_num()
+
+
+def parse_entry(key: str, line_number: int, value: str) -> EncounterEntry:
+    """Parse the value of an encounter key into a record, in one pass over the value.
+
+    Args:
+        key: Lower-case key, e.g. "type_00"
+        line_number: Line of the key in worldmap.txt
+        value: Value with surrounding whitespace removed, e.g. "Dead, Ratio:50%, pid:16777216, Script:12"
+
+    Returns:
+        Entry with the first Ratio, Pid and Script field of the value
+    """
+    fields: dict[str, int] = {}
+    for match in _ENTRY_FIELD_REGEX.finditer(value):
+        fields.setdefault(match[1].lower(), int(match[2]))
+    return EncounterEntry(
+        key, line_number, fields.get("ratio"), fields.get("pid"), fields.get("script"), value.startswith("Dead,")
+    )
+
+
+def iter_encounters(lines: Iterable[str]) -> Iterator[Encounter]:
+    """Stream the encounter sections of worldmap.txt.
+
+    Lines are read like the engine reads its config files: `;` starts a comment anywhere in a
+    line, keys are case-insensitive and a repeated key replaces the earlier one. Lines starting
+    with `#` are comments too, as they were for configparser. Each section header yields its own
+    encounter, so a section that appears twice is yielded twice; see read_encounters().
+
+    Args:
+        lines: Lines of worldmap.txt, e.g. an open file
+
+    Yields:
+        Sections named "Encounter: ...", each once all of its lines have been read
+    """
+    encounter: Encounter | None = None
+    for line_number, line in enumerate(lines, start=1):
+        stripped = line.split(";", 1)[0].strip()
+        if stripped.startswith("[") and "]" in stripped:
+            if encounter is not None:
+                yield encounter
+            section = stripped[1 : stripped.index("]")]
+            encounter = Encounter(section, line_number, {}) if section.startswith(_ENCOUNTER_PREFIX) else None
+            continue
+        if encounter is None or stripped.startswith("#"):
+            continue
+        key, sep, value = stripped.partition("=")
+        if sep:
+            key = key.strip().lower()
+            encounter.entries[key] = parse_entry(key, line_number, value.strip())
+    if encounter is not None:
+        yield encounter
+
+
+def read_encounters(worldmap_path: Path) -> list[Encounter]:
+    """Read the encounter sections of worldmap.txt in a single pass.
+
+    Like in the engine, a section that appears more than once is merged into its first
+    appearance, with later keys replacing earlier ones.
+
+    Args:
+        worldmap_path: Path to worldmap.txt
+
+    Returns:
+        Encounters in the order they first appear
+    """
+    encounters: dict[str, Encounter] = {}
+    with open(worldmap_path, encoding="utf-8", errors="replace") as fhandle:
+        for encounter in iter_encounters(fhandle):
+            first = encounters.setdefault(encounter.section, encounter)
+            if first is not encounter:
+                first.entries.update(encounter.entries)
+    return list(encounters.values())
 
 
 def format_script_combination(
@@ -118,59 +246,123 @@ def format_script_combination(
     return "\n".join(lines)
 
 
-def main(argv: list[str] | None = None) -> None:
-    """Main entry point for worldmap validation."""
-    args = parser.parse_args(argv)
-    error = False
-    allowed_sets = get_allowed_script_sets(args.script_sets)
-
-    worldmap_path = Path(args.worldmap)
+def check_worldmap_file(worldmap_path: Path) -> None:
+    """Exit with an error unless worldmap.txt exists and is a regular file."""
     if not worldmap_path.exists():
-        print(f"{args.worldmap} does not exist.")
+        print(f"{worldmap_path} does not exist.")
         sys.exit(1)
     if not worldmap_path.is_file():
-        print(f"{args.worldmap} is not a file")
+        print(f"{worldmap_path} is not a file")
         sys.exit(1)
 
-    script_names = get_script_names(Path(args.scripts_h) if args.scripts_h else None)
-    script_descriptions = get_script_descriptions(Path(args.scripts_lst) if args.scripts_lst else None)
-    section_lines = get_section_lines(worldmap_path)
 
-    wmap = configparser.ConfigParser(interpolation=None)
-    wmap.read(str(worldmap_path))
+def check_encounters(
+    encounters: Iterable[Encounter],
+    allowed_sets: ScriptSetIndex,
+    script_names: ScriptNames,
+    script_descriptions: ScriptDescriptions,
+) -> bool:
+    """Search encounters for script combinations that are not allowed.
+
+    Args:
+        encounters: Encounters from read_encounters()
+        allowed_sets: Script combinations allowed in one encounter, along with their subsets
+        script_names: Script names from scripts.h, for reporting
+        script_descriptions: Script descriptions from scripts.lst, for reporting
 
-    for section in wmap.sections():
-        if not section.startswith("Encounter: "):
-            continue
+    Returns:
+        True if problems were found, False otherwise
+    """
+    error = False
+    for encounter in encounters:
+        scripts = encounter.scripts()
+        if len(scripts) > 1 and not allowed_sets.allows(scripts):
+            print(
+                format_script_combination(encounter.section, encounter.line, scripts, script_names, script_descriptions)
+            )
+            error = True
+    return error
+
+
+def check_pids(encounters: Iterable[Encounter], protos: ProtoIndex) -> bool:
+    """Search encounters for Pids that the protos do not define.
 
-        options = wmap.options(section)
-        scripts: set[int] = set()
-        for option in options:
-            value = wmap.get(section, option)
-
-            # Dead critters don't matter.
-            if value.startswith("Dead,"):
-                continue
-
-            match = re.search(r"Script:(\d+)", value)
-            if match:
-                script_num = int(match.groups()[0])
-                scripts.add(script_num)
-        if len(scripts) > 1:
-            scripts_list = sorted(scripts)
-            if scripts_list not in allowed_sets:
-                print(
-                    format_script_combination(
-                        section,
-                        section_lines.get(section),
-                        scripts_list,
-                        script_names,
-                        script_descriptions,
-                    )
-                )
+    Args:
+        encounters: Encounters from read_encounters()
+        protos: Index of the mod's protos
+
+    Returns:
+        True if problems were found, False otherwise
+    """
+    error = False
+    for encounter in encounters:
+        for entry in encounter.entries.values():
+            problem = None if entry.pid is None else protos.problem(entry.pid)
+            if problem:
+                print(f"{encounter.section} (line {entry.line}) {entry.key}: Pid {entry.pid} {problem}")
                 error = True
-    if error:
-        sys.exit(1)
+    return error
+
+
+def load_protos(proto_dir: str | Path, cache_dir: str | None) -> tuple[ProtoIndex, ScanCache]:
+    """Index a proto directory, reusing and updating the cache of earlier runs.
+
+    Args:
+        proto_dir: Proto directory, e.g. data/proto
+        cache_dir: Cache directory, or None to not cache
+
+    Returns:
+        Tuple of (proto index, the cache it used, for its hit counts)
+    """
+    cache = ScanCache(cache_dir, "protos")
+    protos = ProtoIndex.load(proto_dir, cache)
+    cache.save()
+    return protos, cache
+
+
+def main(argv: list[str] | None = None, metrics: Metrics | None = None) -> None:
+    """Main entry point for worldmap validation.
+
+    Args:
+        argv: Command line arguments; sys.argv[1:] if None
+        metrics: Collector to record phase metrics in, e.g. shared by action.py; by default a new
+            one, written out if --metrics is given
+    """
+    args = parser.parse_args(argv)
+    with profiled(args.profile, "worldmap"):
+        script_sets_file = Path(args.script_sets_file) if args.script_sets_file else None
+        allowed_sets = load_allowed_sets(get_allowed_script_sets(args.script_sets), script_sets_file)
+        metrics = metrics or Metrics()
+
+        worldmap_path = Path(args.worldmap)
+        check_worldmap_file(worldmap_path)
+
+        changed = changed_since(args.changed_since, worldmap_path)
+        inputs = [worldmap_path, args.scripts_h, args.scripts_lst, script_sets_file]
+        if not any_changed(inputs, changed) and not any_changed_under(args.proto_dir, changed):
+            print(f"worldmap.txt, scripts.h and scripts.lst unchanged since {args.changed_since}, skipping.")
+            return
+
+        with metrics.phase("worldmap", "extract") as extract:
+            scripts_h = _existing(Path(args.scripts_h) if args.scripts_h else None)
+            scripts_lst = _existing(Path(args.scripts_lst) if args.scripts_lst else None)
+            registry = ScriptRegistry.load(scripts_h, scripts_lst)
+            script_names = registry.symbols()
+            script_descriptions = registry.descriptions_by_num()
+            encounters = read_encounters(worldmap_path)
+            extract.add_files(path for path in (worldmap_path, scripts_h, scripts_lst) if path is not None)
+            protos = None
+            if args.proto_dir:
+                protos, proto_cache = load_protos(args.proto_dir, args.cache_dir)
+                extract.add_cache(proto_cache)
+        with metrics.phase("worldmap", "check"):
+            found_problems = check_encounters(encounters, allowed_sets, script_names, script_descriptions)
+            if protos is not None:
+                found_problems = check_pids(encounters, protos) or found_problems
+        if args.metrics:
+            metrics.write(args.metrics)
+        if found_problems:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
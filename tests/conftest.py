@@ -1,5 +1,6 @@
 """Shared pytest fixtures for the Fallout validator test suite."""
 
+from collections.abc import Callable
 import os
 from pathlib import Path
 import subprocess
@@ -15,6 +16,8 @@ _scripts_dir = Path(__file__).parent.parent / "scripts"
 if str(_scripts_dir) not in sys.path:
     sys.path.insert(0, str(_scripts_dir))
 
+import scan_engine
+
 
 @pytest.fixture
 def fixtures_dir() -> Path:
@@ -22,6 +25,55 @@ def fixtures_dir() -> Path:
     return Path(__file__).parent / "fixtures"
 
 
+def _touch(path: Path, text: str) -> None:
+    """Write a file and move its mtime forward, so the change shows on coarse clocks too."""
+    mtime_ns = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+
+
+@pytest.fixture
+def touch() -> Callable[[Path, str], None]:
+    """Return a function that writes a file, moving its mtime forward if it already exists."""
+    return _touch
+
+
+@pytest.fixture
+def mod_tree(tmp_path: Path) -> scan_engine.ScanConfig:
+    """Write a small mod tree with a shared header and return its engine configuration.
+
+    vcdoctor needs more LVARs than scripts.lst allows and references message 101, which its .msg
+    file lacks; both scripts include common.h, whose message 150 only vcdoctor.msg defines.
+    """
+    scripts_dir = tmp_path / "scripts_src"
+    dialog_dir = tmp_path / "dialog"
+    (scripts_dir / "headers").mkdir(parents=True)
+    dialog_dir.mkdir()
+    (scripts_dir / "headers" / "common.h").write_text(
+        "#define LVAR_Shared   (3)\nprocedure greet begin display_mstr(150); end\n", encoding="utf-8"
+    )
+    (scripts_dir / "vcdoctor.ssl").write_text(
+        '#include "headers/common.h"\n#define LVAR_Status   (0)\n   display_mstr(100)\n   display_mstr(101)\n',
+        encoding="utf-8",
+    )
+    (scripts_dir / "vcmerch.ssl").write_text(
+        '#include "headers/common.h"\n   display_mstr(100)\n   display_msg(g_mstr(200))\n', encoding="utf-8"
+    )
+    (dialog_dir / "vcdoctor.msg").write_bytes(b"{100}{}{Hello.}\n{150}{}{Hi.}\n")
+    (dialog_dir / "vcmerch.msg").write_bytes(b"{100}{}{Wares.}\n")
+    (dialog_dir / "generic.msg").write_bytes(b"{200}{}{Bye.}\n")
+    scripts_h = tmp_path / "scripts.h"
+    scripts_h.write_text("#define SCRIPT_VCDOCTOR    (1)\n#define SCRIPT_VCMERCH     (2)\n", encoding="utf-8")
+    scripts_lst = tmp_path / "scripts.lst"
+    scripts_lst.write_text(
+        "vcdoctor.int    ; vc doctor    # local_vars=2\nvcmerch.int     ; vc merchant  # local_vars=4\n",
+        encoding="utf-8",
+    )
+    return scan_engine.ScanConfig(
+        scripts_dir=scripts_dir, dialog_dir=dialog_dir, scripts_h=scripts_h, scripts_lst=scripts_lst
+    )
+
+
 @pytest.fixture(scope="session")
 def integration_repo(tmp_path_factory: pytest.TempPathFactory) -> Path:
     """Return the managed integration checkout, updating it to the pinned commit if needed.
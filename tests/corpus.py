@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Generate synthetic Fallout mod trees for benchmarks.
+
+A generated tree has the action's default layout and passes every validator: scripts with NAME
+and LVAR defines, dialog nodes and message calls, a shared header, a .msg file per script,
+generic.msg, scripts.h, scripts.lst, and worldmap.txt encounters. Sizes are given as multiples of
+vanilla Fallout 2, and the same seed always gives the same tree.
+"""
+
+import argparse
+from pathlib import Path
+import random
+from typing import NamedTuple
+
+# Rough size of vanilla Fallout 2: scripts in scripts.lst, [Encounter: ...] sections in worldmap.txt
+VANILLA_SCRIPTS = 1300
+VANILLA_ENCOUNTERS = 700
+# Scripts per directory under scripts_src, like the per-area folders of real mods
+_SCRIPTS_PER_DIR = 100
+# Generic messages in generic.msg, referenced by scripts through g_mstr()
+_GENERIC_MESSAGES = range(100, 200)
+# Chances of a dialog node using floater_rand(), a commented-out call and a generic message
+_FLOATER_CHANCE = 0.3
+_COMMENTED_CALL_CHANCE = 0.2
+_GENERIC_CALL_CHANCE = 0.2
+# Chance of an encounter critter being dead, with another script than the encounter's
+_DEAD_CRITTER_CHANCE = 0.1
+
+_COMMON_H = """\
+/*
+   Shared definitions of the synthetic scripts
+*/
+
+#ifndef COMMON_H
+#define COMMON_H
+
+#define SYNTH_FLAG_SEEN         (1)
+#define SYNTH_FLAG_ANGRY        (2)
+
+#define synth_bye               display_msg(g_mstr(100))
+
+#endif
+"""
+
+parser = argparse.ArgumentParser(
+    description="Generate a synthetic Fallout mod tree for benchmarks",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+)
+parser.add_argument("OUTPUT_DIR", help="directory to generate the tree in")
+parser.add_argument("--scale", type=float, default=1.0, help="size as a multiple of vanilla Fallout 2")
+parser.add_argument("--seed", type=int, default=0, help="random seed")
+
+
+class CorpusPaths(NamedTuple):
+    """Inputs of a generated tree, as the validators take them."""
+
+    scripts_dir: Path
+    dialog_dir: Path
+    scripts_h: Path
+    scripts_lst: Path
+    worldmap: Path
+
+
+def script_name(number: int) -> str:
+    """Return the lower-case name of a synthetic script, e.g. "zs00042"."""
+    return f"zs{number:05d}"
+
+
+def corpus_paths(root: Path) -> CorpusPaths:
+    """Return where the inputs of a tree generated in root are."""
+    return CorpusPaths(
+        scripts_dir=root / "scripts_src",
+        dialog_dir=root / "data" / "text" / "english" / "dialog",
+        scripts_h=root / "scripts_src" / "headers" / "scripts.h",
+        scripts_lst=root / "data" / "scripts" / "scripts.lst",
+        worldmap=root / "data" / "data" / "worldmap.txt",
+    )
+
+
+def generate_script(number: int, rng: random.Random) -> tuple[str, list[int], int]:
+    """Generate one script.
+
+    Args:
+        number: Script number, its line in scripts.lst
+        rng: Random source
+
+    Returns:
+        Tuple of (script source, script message IDs it references, LVARs it defines)
+    """
+    name = script_name(number).upper()
+    num_lvars = rng.randint(0, 8)
+    num_nodes = rng.randint(3, 30)
+    messages: list[int] = []
+    lines = [
+        "/*",
+        f"   Synthetic script {number}",
+        "*/",
+        "",
+        '#include "../headers/common.h"',
+        "",
+        f"#define NAME                    SCRIPT_{name}",
+        "",
+    ]
+    lines += [f"#define LVAR_Var{i:<16d}({i})" for i in range(num_lvars)]
+    lines += ["", "procedure start;", "procedure talk_p_proc;", "procedure look_at_p_proc;"]
+    lines += [f"procedure node{node:03d};" for node in range(1, num_nodes + 1)]
+    lines += ["", "procedure start begin", "end", "", "procedure talk_p_proc begin"]
+    lines += ["   start_gdialog(NAME, self_obj, 4, -1, -1);", "   gSay_Start;", "      call node001;", "   gSay_End;"]
+    lines += ["   end_dialogue;", "end", "", "procedure look_at_p_proc begin", "   script_overrides;"]
+    messages += [100, 101]
+    lines += ["   if (local_var(0) == SYNTH_FLAG_SEEN) then", "      display_mstr(100);", "   else"]
+    lines += ["      display_mstr(101); // first look", "end"]
+
+    for node in range(1, num_nodes + 1):
+        base = 100 + node * 10
+        next_node = node + 1 if node < num_nodes else 1
+        lines += ["", f"procedure node{node:03d} begin", f"   Reply({base});"]
+        lines += [f"   NOption({base + 1}, node{next_node:03d}, 4);", f"   GOption({base + 2}, node{node:03d}, 4);"]
+        messages += [base, base + 1, base + 2]
+        if rng.random() < _FLOATER_CHANCE:
+            lines.append(f"   floater_rand({base + 3}, {base + 5});")
+            messages += [base + 3, base + 4, base + 5]
+        if rng.random() < _COMMENTED_CALL_CHANCE:
+            lines += ["   /* Unused:", f"   display_mstr({base + 9});", "   */"]
+        if rng.random() < _GENERIC_CALL_CHANCE:
+            lines.append(f"   display_msg(g_mstr({rng.choice(_GENERIC_MESSAGES)}));")
+        lines += ["   synth_bye;", "end"]
+    return "\n".join(lines) + "\n", messages, num_lvars
+
+
+def generate_msg(messages: list[int], rng: random.Random) -> str:
+    """Generate a .msg file defining the given messages and a few unused ones."""
+    ids = sorted(set(messages) | {rng.randint(100, 999) for _ in range(3)})
+    return "".join(f"{{{msg_id}}}{{}}{{Synthetic line {msg_id}.}}\n" for msg_id in ids)
+
+
+def generate_worldmap(num_encounters: int, num_scripts: int, rng: random.Random) -> str:
+    """Generate worldmap.txt encounters, each with critters of at most one script."""
+    sections: list[str] = ["; Synthetic worldmap", ""]
+    for encounter in range(1, num_encounters + 1):
+        script = rng.randint(1, num_scripts)
+        sections.append(f"[Encounter: SYNTH_E{encounter:05d}]")
+        sections.append("position=surrounding, spacing:3")
+        for critter in range(rng.randint(1, 6)):
+            dead = "Dead, " if rng.random() < _DEAD_CRITTER_CHANCE else ""
+            other = rng.randint(1, num_scripts)
+            script_num = other if dead else script
+            sections.append(f"type_{critter:02d}={dead}Ratio:50%, pid:{16777216 + critter}, Script:{script_num}")
+        sections.append("")
+    return "\n".join(sections)
+
+
+def generate(root: str | Path, scale: float = 1.0, seed: int = 0) -> CorpusPaths:
+    """Generate a synthetic mod tree.
+
+    Args:
+        root: Directory to generate the tree in
+        scale: Size as a multiple of vanilla Fallout 2
+        seed: Random seed
+
+    Returns:
+        Paths of the generated inputs
+    """
+    rng = random.Random(seed)
+    paths = corpus_paths(Path(root))
+    num_scripts = max(1, round(VANILLA_SCRIPTS * scale))
+    num_encounters = max(1, round(VANILLA_ENCOUNTERS * scale))
+    for directory in (paths.scripts_h.parent, paths.dialog_dir, paths.scripts_lst.parent, paths.worldmap.parent):
+        directory.mkdir(parents=True, exist_ok=True)
+    (paths.scripts_h.parent / "common.h").write_text(_COMMON_H, encoding="utf-8")
+    generic = "".join(f"{{{msg_id}}}{{}}{{Generic line {msg_id}.}}\n" for msg_id in _GENERIC_MESSAGES)
+    (paths.dialog_dir / "generic.msg").write_text(generic, encoding="cp1252")
+
+    h_lines: list[str] = []
+    lst_lines: list[str] = []
+    for number in range(1, num_scripts + 1):
+        name = script_name(number)
+        script_dir = paths.scripts_dir / f"area{(number - 1) // _SCRIPTS_PER_DIR:04d}"
+        script_dir.mkdir(exist_ok=True)
+        source, messages, num_lvars = generate_script(number, rng)
+        (script_dir / f"{name}.ssl").write_text(source, encoding="utf-8")
+        (paths.dialog_dir / f"{name}.msg").write_text(generate_msg(messages, rng), encoding="cp1252")
+        h_lines.append(f"#define SCRIPT_{name.upper():<24}({number})    // {name}.int ; Synthetic script {number}\n")
+        local_vars = num_lvars + rng.randint(0, 2)
+        lst_lines.append(f"{name}.int      ; Synthetic script {number}            # local_vars={local_vars}\n")
+    paths.scripts_h.write_text("".join(h_lines), encoding="utf-8")
+    paths.scripts_lst.write_text("".join(lst_lines), encoding="cp1252")
+    paths.worldmap.write_text(generate_worldmap(num_encounters, num_scripts, rng), encoding="utf-8")
+    return paths
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Main entry point for corpus generation."""
+    args = parser.parse_args(argv)
+    paths = generate(args.OUTPUT_DIR, args.scale, args.seed)
+    print(f"Generated {paths.scripts_dir.parent}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Frozen reference implementations of the validators' parsing, for differential tests.
+
+These are the original line-by-line regex parsers the optimized code paths replaced, kept
+unoptimized on purpose: test_oracles.py feeds the same generated inputs to both and requires
+identical results. Do not speed them up or share code with scripts/; change them only together
+with a deliberate change of validator behavior.
+
+Deliberate changes made since the originals, which the references follow:
+- Comments and string literals no longer count. strip_code() removes them line by line with the
+  lexer's rules, and the original regexes run over what is left.
+- Every floater_rand/Reply_Rand range in a line counts, not only the first one.
+- A key repeated in a worldmap.txt section replaces the earlier one, as in the engine, instead of
+  being an error.
+- Encounter scripts that are a subset of an allowed set are allowed, not only exact matches.
+"""
+
+import configparser
+from pathlib import Path
+import re
+
+# Original message patterns of dialogs.py
+_MSG_REGEX0 = re.compile(
+    r"[^_]+(?:display_mstr|floater|dude_floater|Reply|GOption|GLowOption|NOption"
+    r"|NLowOption|BOption|BLowOption|GMessage|NMessage|BMessage) *\( *([0-9]{3,5}) *[,\)]"
+)
+_MSG_REGEX1 = re.compile(r"[^_]+mstr *\( *([0-9]{3,5}) *\)")
+_MSG_REGEX_GEN = re.compile(r"[^_]+g_mstr *\( *([0-9]{3,5}) *\)")
+# Every range, unless the call is the tail of a longer identifier like my_floater_rand
+_RANGE_REGEX = re.compile(r"(?<!_)(?:floater_rand|Reply_Rand) *\( *([0-9]{3,5}) *, *([0-9]{3,5})")
+_NAME_REGEX = re.compile(r"#define NAME +SCRIPT_([A-Z0-9_]+)")
+# Original patterns of lvars.py and scripts_lst.py
+_LVAR_REGEX = re.compile(r"^#define\s+LVAR_\w+\s+\((\d+)\)\s+.*")
+_LOCAL_VARS_REGEX = re.compile(r"^(\w+)\.int.*local_vars=(\d+)")
+_SCRIPT_DEFINE_REGEX = re.compile(r"^#define\s+SCRIPT_(\w+)\s+\((\d+)\)\s+.*")
+
+
+def strip_code(text: str) -> list[str]:
+    """Blank out comments and string literals, one character at a time.
+
+    Each comment, or each line of a block comment, becomes a single space and each string literal
+    becomes "". String literals and line comments end at the end of the line.
+
+    Args:
+        text: Script text
+
+    Returns:
+        Code of every line, with its line ending
+    """
+    lines = text.split("\n")
+    code: list[str] = []
+    in_block = False
+    for number, line in enumerate(lines):
+        ending = "\n" if number < len(lines) - 1 else ""
+        body = line.rstrip("\r")
+        ending = line[len(body) :] + ending
+        parts: list[str] = []
+        i = 0
+        if in_block and body:
+            parts.append(" ")
+        while i < len(body):
+            if in_block:
+                if body[i : i + 2] == "*/":
+                    in_block = False
+                    i += 2
+                else:
+                    i += 1
+            elif body[i : i + 2] == "//":
+                parts.append(" ")
+                break
+            elif body[i : i + 2] == "/*":
+                parts.append(" ")
+                in_block = True
+                i += 2
+            elif body[i] == '"':
+                parts.append('""')
+                i += 1
+                while i < len(body) and body[i] != '"':
+                    i += 1
+                i += 1
+            else:
+                parts.append(body[i])
+                i += 1
+        if ending:
+            parts.append(" " if in_block else ending)
+        code.append("".join(parts))
+    return code
+
+
+def line_messages(line: str) -> tuple[list[str], list[str], list[tuple[int, int]]]:
+    """Return (script message IDs, generic message IDs, message ranges) of a line of code."""
+    messages = _MSG_REGEX0.findall(line) + _MSG_REGEX1.findall(line)
+    ranges = [(int(first), int(last)) for first, last in _RANGE_REGEX.findall(line)]
+    return messages, _MSG_REGEX_GEN.findall(line), ranges
+
+
+def script_messages(text: str) -> tuple[list[str], list[str], str | None, list[tuple[int, int]]]:
+    """Return (script message IDs, generic message IDs, NAME define, message ranges) of a script."""
+    messages: list[str] = []
+    gen_messages: list[str] = []
+    ranges: list[tuple[int, int]] = []
+    name = None
+    for line in strip_code(text):
+        match = _NAME_REGEX.search(line)
+        if name is None and match:
+            name = match[1]
+        line_msgs, line_gen, line_ranges = line_messages(line)
+        messages += line_msgs
+        gen_messages += line_gen
+        ranges += line_ranges
+    return messages, gen_messages, name, ranges
+
+
+def max_lvar(text: str) -> int:
+    """Return the number of LVARs a script defines: its highest LVAR index plus one, or 0."""
+    max_index = -1
+    for line in strip_code(text):
+        match = _LVAR_REGEX.match(line)
+        if match:
+            max_index = max(max_index, int(match[1]))
+    return max_index + 1
+
+
+def parse_lst(scripts_lst_path: str | Path) -> dict[int, str]:
+    """Return script names by line number in scripts.lst."""
+    lst_by_num: dict[int, str] = {}
+    with open(scripts_lst_path, encoding="utf-8") as fhandle:
+        for linenum, line in enumerate(fhandle, start=1):
+            lst_by_num[linenum] = line.split(".", maxsplit=1)[0].strip().upper()
+    return lst_by_num
+
+
+def lvars_map(scripts_lst_path: str | Path) -> dict[str, int]:
+    """Return allocated LVARs by lower-case script name in scripts.lst; the first entry wins."""
+    lvars: dict[str, int] = {}
+    with open(scripts_lst_path, encoding="utf-8") as fhandle:
+        for line in fhandle:
+            match = _LOCAL_VARS_REGEX.match(line)
+            if match and match[1].lower() not in lvars:
+                lvars[match[1].lower()] = int(match[2])
+    return lvars
+
+
+def parse_h(scripts_h_path: str | Path) -> tuple[dict[int, str], dict[str, int]]:
+    """Return (script names by number, script numbers by name) in scripts.h."""
+    h_by_num: dict[int, str] = {}
+    h_by_name: dict[str, int] = {}
+    with open(scripts_h_path, encoding="utf-8") as fhandle:
+        for line in fhandle:
+            match = _SCRIPT_DEFINE_REGEX.match(line)
+            if match:
+                h_by_num[int(match[2])] = match[1]
+                h_by_name[match[1]] = int(match[2])
+    return h_by_num, h_by_name
+
+
+def worldmap_report(worldmap_path: str | Path, allowed_sets: list[list[int]]) -> str:
+    """Return what worldmap.py prints for a worldmap.txt without scripts.h and scripts.lst."""
+    section_lines: dict[str, int] = {}
+    for line_number, line in enumerate(Path(worldmap_path).read_text(encoding="utf-8").splitlines(), start=1):
+        stripped = line.strip()
+        if stripped.startswith("[") and stripped.endswith("]"):
+            section_lines[stripped[1:-1]] = line_number
+
+    wmap = configparser.ConfigParser(interpolation=None, strict=False)
+    wmap.read(str(worldmap_path), encoding="utf-8")
+    report: list[str] = []
+    for section in wmap.sections():
+        if not section.startswith("Encounter: "):
+            continue
+        scripts: set[int] = set()
+        for option in wmap.options(section):
+            value = wmap.get(section, option)
+            if value.startswith("Dead,"):
+                continue
+            match = re.search(r"Script:(\d+)", value)
+            if match:
+                scripts.add(int(match[1]))
+        scripts_list = sorted(scripts)
+        if len(scripts_list) > 1 and not any(scripts <= set(allowed) for allowed in allowed_sets):
+            width = max(len(str(script)) for script in scripts_list)
+            line_number = section_lines.get(section)
+            location = f" (line {line_number})" if line_number is not None else ""
+            report.append(f"{section}{location} script combination is not allowed:\n")
+            report += [f'  {script:<{width}} = <unknown> = "<unknown>"\n' for script in scripts_list]
+    return "".join(report)
@@ -1,11 +1,14 @@
 """Tests for action.py — GitHub Action dispatcher and env var defaults."""
 
+import json
 import os
 from pathlib import Path
-from unittest.mock import patch
+import sys
+from unittest.mock import ANY, patch
 
 import action
 import pytest
+import scan_engine
 
 
 def test_parse_script_sets_empty() -> None:
@@ -59,38 +62,83 @@ def test_main_defaults_values() -> None:
 
     Verifies that every os.environ.get() call has a default (fix 3 regression guard).
     """
-    # Patch each validator's main to a no-op so we only test that defaults are reached
+    # Patch the scan engine to a no-op so we only test that defaults are reached
+    with patch("scan_engine.run") as mock_run, patch.dict(os.environ, {}, clear=True):
+        action.main()
+        mock_run.assert_called_once_with(
+            scan_engine.ScanConfig(
+                scripts_dir=Path("scripts_src"),
+                dialog_dir=Path("data/text/english/dialog"),
+                scripts_h=Path("scripts_src/headers/scripts.h"),
+                scripts_lst=Path("data/scripts/scripts.lst"),
+                allowed_sets=[],
+            )
+        )
+
+
+def test_main_watch() -> None:
+    """main() with --watch runs the watcher on the env configuration until interrupted."""
+    with (
+        patch("watch.Watcher") as mock_watcher,
+        patch("scan_engine.run") as mock_run,
+        patch.dict(os.environ, {"INPUT_CHECK_LVARS": "false"}, clear=True),
+    ):
+        mock_watcher.return_value.run.side_effect = KeyboardInterrupt
+        action.main(["--watch", "--debounce", "0.2"])
+        mock_run.assert_not_called()
+        mock_watcher.assert_called_once_with(action.get_scan_config(), 1.0, 0.2)
+        mock_watcher.return_value.run.assert_called_once_with()
+
+
+def test_main_changed_since_defaults() -> None:
+    """main() dispatches to each validator's main() when INPUT_CHANGED_SINCE is set."""
     with (
-        patch("scripts_lst.main") as mock_scripts,
-        patch("lvars.main") as mock_lvars,
-        patch("dialogs.main") as mock_dialogs,
+        patch("scripts_lst.main", return_value=None) as mock_scripts,
+        patch("lvars.main", return_value=None) as mock_lvars,
+        patch("dialogs.main", return_value=None) as mock_dialogs,
+        patch("scan_engine.run") as mock_run,
+        patch.dict(os.environ, {"INPUT_CHANGED_SINCE": "main"}, clear=True),
+    ):
+        action.main()
+        mock_run.assert_not_called()
+        changed_argv = ["--changed-since", "main"]
+        mock_scripts.assert_called_once_with(
+            ["scripts_src/headers/scripts.h", "data/scripts/scripts.lst", *changed_argv], metrics=ANY
+        )
+        mock_lvars.assert_called_once_with(["scripts_src", "data/scripts/scripts.lst", *changed_argv], metrics=ANY)
+        mock_dialogs.assert_called_once_with(
+            ["data/text/english/dialog", "scripts_src", "--jobs", "1", *changed_argv], metrics=ANY
+        )
+
+
+def test_main_cache_dir() -> None:
+    """main() passes INPUT_CACHE_DIR and INPUT_JOBS to the scan engine."""
+    with (
+        patch("scan_engine.run") as mock_run,
         patch.dict(
             os.environ,
             {
-                "INPUT_CHECK_SCRIPTS": "true",
-                "INPUT_CHECK_LVARS": "true",
-                "INPUT_CHECK_MSGS": "true",
+                "INPUT_CHECK_SCRIPTS": "false",
+                "INPUT_CACHE_DIR": ".cache",
+                "INPUT_JOBS": "4",
                 "INPUT_WORLDMAP_PATH": "",
             },
             clear=True,
         ),
     ):
         action.main()
-        mock_scripts.assert_called_once_with(["scripts_src/headers/scripts.h", "data/scripts/scripts.lst"])
-        mock_lvars.assert_called_once_with(["scripts_src", "data/scripts/scripts.lst"])
-        mock_dialogs.assert_called_once_with(["data/text/english/dialog", "scripts_src"])
+        config = mock_run.call_args.args[0]
+        assert not config.check_scripts
+        assert config.cache_dir == ".cache"
+        expected_jobs = 4
+        assert config.jobs == expected_jobs
 
 
 def test_main_worldmap_path(tmp_path: Path) -> None:
-    """main() invokes worldmap.main() when INPUT_WORLDMAP_PATH is set."""
+    """main() passes INPUT_WORLDMAP_PATH, the parsed script sets and their file to the scan engine."""
     wmap = tmp_path / "worldmap.txt"
-    scripts_h = tmp_path / "scripts.h"
-    scripts_lst = tmp_path / "scripts.lst"
-    wmap.write_text("[Encounter: E01]\ntype_00=Pid:16777225, Script:100\n", encoding="utf-8")
-    scripts_h.write_text("#define SCRIPT_ALPHA (100)\n", encoding="utf-8")
-    scripts_lst.write_text("alpha.int ; Alpha script\n", encoding="utf-8")
     with (
-        patch("worldmap.main") as mock_worldmap,
+        patch("scan_engine.run") as mock_run,
         patch.dict(
             os.environ,
             {
@@ -98,29 +146,28 @@ def test_main_worldmap_path(tmp_path: Path) -> None:
                 "INPUT_CHECK_LVARS": "false",
                 "INPUT_CHECK_MSGS": "false",
                 "INPUT_WORLDMAP_PATH": str(wmap),
-                "INPUT_SCRIPTS_H": str(scripts_h),
-                "INPUT_SCRIPTS_LST": str(scripts_lst),
-                "INPUT_WORLDMAP_SCRIPT_SETS": "",
+                "INPUT_WORLDMAP_SCRIPT_SETS": "200 100\n300 301",
+                "INPUT_WORLDMAP_SCRIPT_SETS_FILE": str(tmp_path / "script_sets.txt"),
+                "INPUT_PROTO_DIR": str(tmp_path / "proto"),
             },
             clear=True,
         ),
     ):
         action.main()
-        mock_worldmap.assert_called_once_with(
-            [str(wmap), "--scripts-h", str(scripts_h), "--scripts-lst", str(scripts_lst)]
-        )
+        config = mock_run.call_args.args[0]
+        assert config.worldmap_path == wmap
+        assert config.allowed_sets == [[100, 200], [300, 301]]
+        assert config.script_sets_file == tmp_path / "script_sets.txt"
+        assert config.proto_dir == tmp_path / "proto"
 
 
-def test_main_worldmap_with_sets(tmp_path: Path) -> None:
-    """main() passes parsed script sets to worldmap.main() when INPUT_WORLDMAP_SCRIPT_SETS is set."""
+def test_main_worldmap_changed_since(tmp_path: Path) -> None:
+    """main() invokes worldmap.main() with parsed script sets when INPUT_CHANGED_SINCE is set."""
     wmap = tmp_path / "worldmap.txt"
     scripts_h = tmp_path / "scripts.h"
     scripts_lst = tmp_path / "scripts.lst"
-    wmap.write_text("[Encounter: E01]\ntype_00=Pid:16777225, Script:100\n", encoding="utf-8")
-    scripts_h.write_text("#define SCRIPT_ALPHA (100)\n", encoding="utf-8")
-    scripts_lst.write_text("alpha.int ; Alpha script\n", encoding="utf-8")
     with (
-        patch("worldmap.main") as mock_worldmap,
+        patch("worldmap.main", return_value=None) as mock_worldmap,
         patch.dict(
             os.environ,
             {
@@ -131,16 +178,50 @@ def test_main_worldmap_with_sets(tmp_path: Path) -> None:
                 "INPUT_SCRIPTS_H": str(scripts_h),
                 "INPUT_SCRIPTS_LST": str(scripts_lst),
                 "INPUT_WORLDMAP_SCRIPT_SETS": "100 200",
+                "INPUT_WORLDMAP_SCRIPT_SETS_FILE": "script_sets.txt",
+                "INPUT_PROTO_DIR": "data/proto",
+                "INPUT_CACHE_DIR": ".cache",
+                "INPUT_CHANGED_SINCE": "main",
             },
             clear=True,
         ),
     ):
         action.main()
         mock_worldmap.assert_called_once_with(
-            [str(wmap), "--scripts-h", str(scripts_h), "--scripts-lst", str(scripts_lst), "-s", "100,200"]
+            [
+                str(wmap),
+                "--scripts-h",
+                str(scripts_h),
+                "--scripts-lst",
+                str(scripts_lst),
+                "-s",
+                "100,200",
+                "--script-sets-file",
+                "script_sets.txt",
+                "--proto-dir",
+                "data/proto",
+                "--cache-dir",
+                ".cache",
+                "--changed-since",
+                "main",
+            ],
+            metrics=ANY,
         )
 
 
+def test_main_engine_runs_checks(fixtures_dir: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """main() runs the enabled checks over the fixtures in one scan engine pass."""
+    env = {
+        "INPUT_CHECK_SCRIPTS": "false",
+        "INPUT_SCRIPTS_LST": str(fixtures_dir / "scripts.lst"),
+        "INPUT_SCRIPTS_DIR": str(fixtures_dir),
+        "INPUT_DIALOG_DIR": str(fixtures_dir),
+    }
+    with patch.dict(os.environ, env, clear=True):
+        action.main()
+    assert "Messages checked:" in capsys.readouterr().out
+
+
 @pytest.mark.integration
 def test_integration_action(integration_repo: Path) -> None:
     """Integration: action.main() passes against Fallout2 Unofficial Patch data."""
@@ -156,3 +237,76 @@ def test_integration_action(integration_repo: Path) -> None:
     }
     with patch.dict(os.environ, env, clear=True):
         action.main()
+
+
+def test_main_exclude() -> None:
+    """main() passes INPUT_EXCLUDE globs and INPUT_USE_GITIGNORE to the scan engine and validators."""
+    env = {"INPUT_EXCLUDE": "build\n# comment\n\n  vendor/*  \n", "INPUT_USE_GITIGNORE": "false"}
+    with patch("scan_engine.run") as mock_run, patch.dict(os.environ, env, clear=True):
+        action.main()
+        config = mock_run.call_args.args[0]
+        assert config.exclude == ("build", "vendor/*")
+        assert not config.use_gitignore
+
+    env["INPUT_CHANGED_SINCE"] = "main"
+    with (
+        patch("scripts_lst.main", return_value=None),
+        patch("lvars.main", return_value=None) as mock_lvars,
+        patch("dialogs.main", return_value=None),
+        patch.dict(os.environ, env, clear=True),
+    ):
+        action.main()
+        walk_argv = ["--exclude", "build", "--exclude", "vendor/*", "--no-gitignore"]
+        mock_lvars.assert_called_once_with(
+            ["scripts_src", "data/scripts/scripts.lst", *walk_argv, "--changed-since", "main"], metrics=ANY
+        )
+
+
+def test_main_changed_since_runs_all_validators(capsys: pytest.CaptureFixture[str]) -> None:
+    """main() runs every validator despite failures and exits once with a combined status."""
+
+    def failing_main(argv: list[str], metrics: object) -> None:
+        print(f"problem in {argv[0]}")
+        sys.exit(1)
+
+    with (
+        patch("scripts_lst.main", failing_main),
+        patch("lvars.main", return_value=None) as mock_lvars,
+        patch("dialogs.main", failing_main),
+        patch.dict(os.environ, {"INPUT_CHANGED_SINCE": "main"}, clear=True),
+        pytest.raises(SystemExit) as exc_info,
+    ):
+        action.main()
+    assert exc_info.value.code == 1
+    mock_lvars.assert_called_once()
+    assert capsys.readouterr().out == (
+        "problem in scripts_src/headers/scripts.h\nproblem in data/text/english/dialog\nFailed checks: scripts, msgs\n"
+    )
+
+
+def test_main_metrics(tmp_path: Path) -> None:
+    """main() passes INPUT_METRICS to the scan engine and writes validator metrics in incremental runs."""
+    metrics_path = tmp_path / "metrics.json"
+    env = {"INPUT_METRICS": str(metrics_path)}
+    with patch("scan_engine.run") as mock_run, patch.dict(os.environ, env, clear=True):
+        action.main()
+        assert mock_run.call_args.args[0].metrics_path == str(metrics_path)
+
+    env |= {"INPUT_CHANGED_SINCE": "main", "INPUT_CHECK_LVARS": "false", "INPUT_CHECK_MSGS": "false"}
+    with patch("scripts_lst.main", return_value=None), patch.dict(os.environ, env, clear=True):
+        action.main()
+    assert json.loads(metrics_path.read_text(encoding="utf-8")) == []
+
+
+def test_main_profile(tmp_path: Path) -> None:
+    """main() passes INPUT_PROFILE to the scan engine and to each validator in incremental runs."""
+    env = {"INPUT_PROFILE": str(tmp_path)}
+    with patch("scan_engine.run") as mock_run, patch.dict(os.environ, env, clear=True):
+        action.main()
+        assert mock_run.call_args.args[0].profile_dir == str(tmp_path)
+
+    env |= {"INPUT_CHANGED_SINCE": "main", "INPUT_CHECK_LVARS": "false", "INPUT_CHECK_MSGS": "false"}
+    with patch("scripts_lst.main", return_value=None) as mock_scripts, patch.dict(os.environ, env, clear=True):
+        action.main()
+        argv = mock_scripts.call_args.args[0]
+        assert argv[-2:] == ["--profile", str(tmp_path)]
@@ -0,0 +1,222 @@
+"""Scaling benchmarks of the validators over synthetic mod trees from corpus.py.
+
+Each validator is timed at 1x, 10x and 100x the size of vanilla Fallout 2 and must scale near
+linearly. Times are divided by a fixed pure-Python workload timed on the same machine and by the
+number of scripts, and the resulting cost must stay within tolerance of benchmark_baseline.json.
+Extraction is pinned to this process, like the single-threaded calibration workload. Costs still
+depend on the machine, so each file records the CPU count it was measured with, and costs
+recorded on a machine with a different count are not compared against.
+
+A baseline recorded after a slowdown hides it, so costs are also held against
+benchmark_original.json: what the original validator scripts, from before the shared lexer, caches
+and scan engine, cost on the same trees. The engine may cost no more than running all of them.
+
+Opt-in, as the 100x tree takes minutes to generate and check: `pytest -m benchmark`. Set
+FALLOUT_BENCH_SCALES to time other scales, e.g. "0.1,1", and FALLOUT_BENCH_UPDATE=1 to store the
+measured costs as the new baseline. To measure the original costs, set FALLOUT_BENCH_ORIGINAL to
+the scripts directory of a checkout of the original validators; they are run as scripts, with the
+startup of a bare interpreter taken off their times.
+"""
+
+from collections.abc import Callable
+from itertools import pairwise
+import json
+import os
+from pathlib import Path
+import re
+import subprocess
+import sys
+import time
+
+from corpus import VANILLA_SCRIPTS, CorpusPaths, generate
+import daemon
+import dialogs
+import lvars
+import pytest
+import scan_engine
+import scripts_lst
+import worldmap
+
+pytestmark = pytest.mark.benchmark
+
+SCALES = tuple(sorted(float(scale) for scale in os.environ.get("FALLOUT_BENCH_SCALES", "1,10,100").split(",")))
+BASELINE_PATH = Path(__file__).parent / "benchmark_baseline.json"
+ORIGINAL_PATH = Path(__file__).parent / "benchmark_original.json"
+ORIGINAL_DIR = os.environ.get("FALLOUT_BENCH_ORIGINAL", "")
+# Allowed growth beyond linear between consecutive scales, e.g. 10x the scripts may take 15x the time
+_SCALING_SLACK = 1.5
+# Allowed cost over the baseline, or over the original implementation, before a benchmark fails;
+# runs of the same code on one machine vary by up to 1.6x, while the slowdowns to catch cost 4-6x
+_REGRESSION_TOLERANCE = 2.0
+# Runs of each benchmark below this scale, the fastest one counting; larger runs are timed once
+_REPEATS = 3
+_REPEAT_BELOW_SCALE = 10
+# Seconds of runs to time at least, so that fast benchmarks are repeated until noise settles
+_MIN_SECONDS = 1.0
+# Seconds a warm daemon may take to validate a saved script, whatever the tree size
+_DAEMON_LATENCY = 0.05
+
+# Command line arguments of the validator scripts, the same for the original ones
+ARGS: dict[str, Callable[[CorpusPaths], list[str]]] = {
+    "scripts_lst": lambda paths: [str(paths.scripts_h), str(paths.scripts_lst)],
+    "lvars": lambda paths: [str(paths.scripts_dir), str(paths.scripts_lst)],
+    "dialogs": lambda paths: [str(paths.dialog_dir), str(paths.scripts_dir)],
+    "worldmap": lambda paths: [
+        str(paths.worldmap),
+        "--scripts-h",
+        str(paths.scripts_h),
+        "--scripts-lst",
+        str(paths.scripts_lst),
+    ],
+}
+
+VALIDATORS: dict[str, Callable[[CorpusPaths], None]] = {
+    "scripts_lst": lambda paths: scripts_lst.main(ARGS["scripts_lst"](paths)),
+    "lvars": lambda paths: lvars.main(ARGS["lvars"](paths)),
+    "dialogs": lambda paths: dialogs.main([*ARGS["dialogs"](paths), "--jobs", "1"]),
+    "worldmap": lambda paths: worldmap.main(ARGS["worldmap"](paths)),
+    "engine": lambda paths: scan_engine.run(
+        scan_engine.ScanConfig(
+            scripts_dir=paths.scripts_dir,
+            dialog_dir=paths.dialog_dir,
+            scripts_h=paths.scripts_h,
+            scripts_lst=paths.scripts_lst,
+            worldmap_path=paths.worldmap,
+            jobs=1,
+        )
+    ),
+}
+
+
+def _workload() -> None:
+    """Fixed mix of bytes handling and regex matching, like the validators' inner loops."""
+    lines = b"   display_mstr(100); // comment\n#define LVAR_Flags (0)\n" * 2000
+    pattern = re.compile(rb"\(([0-9]+)\)")
+    for _ in range(10):
+        for line in lines.splitlines():
+            pattern.search(line)
+
+
+def _best_time(func: Callable[[], None], repeats: int) -> float:
+    """Return the fastest of several timed calls, in seconds.
+
+    Calls are repeated beyond the given count until they add up to _MIN_SECONDS.
+    """
+    times: list[float] = []
+    while len(times) < repeats or sum(times) < _MIN_SECONDS:
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@pytest.fixture(scope="session")
+def calibration() -> float:
+    """Seconds this machine takes for the fixed workload."""
+    return _best_time(_workload, 5)
+
+
+def _original_cost(original: dict[str, float], validator: str, scale: float) -> float | None:
+    """Return the cost of the original implementation of a validator, or None if it was not measured.
+
+    The engine replaces running every validator, so its original cost is theirs added up.
+    """
+    names = list(ARGS) if validator == "engine" else [validator]
+    costs = [original.get(f"{name}@{scale:g}x") for name in names]
+    return None if None in costs else sum(costs)  # type: ignore[arg-type]
+
+
+def _read_costs(json_path: Path) -> dict[str, float]:
+    """Return the calibrated costs stored in a JSON file, or none if they were measured with another CPU count."""
+    if not json_path.exists():
+        return {}
+    stored = json.loads(json_path.read_text(encoding="utf-8"))
+    return stored["costs"] if stored["cpu_count"] == os.cpu_count() else {}
+
+
+def _write_costs(json_path: Path, costs: dict[str, float]) -> None:
+    """Merge calibrated costs into a JSON file of them, replacing any measured with another CPU count."""
+    stored = _read_costs(json_path) | {key: round(cost, 3) for key, cost in costs.items()}
+    data = {"cpu_count": os.cpu_count(), "costs": dict(sorted(stored.items()))}
+    json_path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+@pytest.fixture(scope="session")
+def corpora(tmp_path_factory: pytest.TempPathFactory) -> dict[float, CorpusPaths]:
+    """Synthetic trees at every benchmarked scale."""
+    root = tmp_path_factory.mktemp("corpus")
+    return {scale: generate(root / f"{scale:g}x", scale) for scale in SCALES}
+
+
+@pytest.mark.parametrize("validator", VALIDATORS)
+def test_scaling(
+    validator: str, corpora: dict[float, CorpusPaths], calibration: float, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """A validator scales near linearly and costs no more per script than the baseline allows."""
+    times: dict[float, float] = {}
+    for scale, paths in corpora.items():
+        repeats = _REPEATS if scale < _REPEAT_BELOW_SCALE else 1
+        times[scale] = _best_time(lambda paths=paths: VALIDATORS[validator](paths), repeats)
+        capsys.readouterr()
+
+    for small, large in pairwise(SCALES):
+        growth = times[large] / times[small]
+        assert growth <= large / small * _SCALING_SLACK, (
+            f"{validator}: {large / small:g}x the scripts took {growth:.1f}x"
+        )
+
+    # Calibrated seconds per thousand scripts
+    costs = {
+        f"{validator}@{scale:g}x": times[scale] / calibration / (VANILLA_SCRIPTS * scale) * 1000 for scale in SCALES
+    }
+    if os.environ.get("FALLOUT_BENCH_UPDATE"):
+        _write_costs(BASELINE_PATH, costs)
+        return
+    baseline = _read_costs(BASELINE_PATH)
+    original = _read_costs(ORIGINAL_PATH)
+    for scale in SCALES:
+        key = f"{validator}@{scale:g}x"
+        if key in baseline:
+            limit = baseline[key] * _REGRESSION_TOLERANCE
+            assert costs[key] <= limit, f"{key} costs {costs[key]:.3f}, baseline {baseline[key]:.3f}"
+        original_cost = _original_cost(original, validator, scale)
+        if original_cost is not None:
+            limit = original_cost * _REGRESSION_TOLERANCE
+            assert costs[key] <= limit, f"{key} costs {costs[key]:.3f}, original implementation {original_cost:.3f}"
+
+
+@pytest.mark.skipif(not ORIGINAL_DIR, reason="set FALLOUT_BENCH_ORIGINAL to measure the original validators")
+@pytest.mark.parametrize("validator", ARGS)
+def test_record_original(validator: str, corpora: dict[float, CorpusPaths], calibration: float) -> None:
+    """Measure the original implementation of a validator and store its costs."""
+    script = Path(ORIGINAL_DIR) / f"{validator}.py"
+    startup = _best_time(lambda: subprocess.run([sys.executable, "-c", "pass"], check=True), _REPEATS)
+    costs: dict[str, float] = {}
+    for scale, paths in corpora.items():
+        repeats = _REPEATS if scale < _REPEAT_BELOW_SCALE else 1
+        command = [sys.executable, str(script), *ARGS[validator](paths)]
+        elapsed = _best_time(lambda command=command: subprocess.run(command, check=False, capture_output=True), repeats)
+        costs[f"{validator}@{scale:g}x"] = (elapsed - startup) / calibration / (VANILLA_SCRIPTS * scale) * 1000
+    _write_costs(ORIGINAL_PATH, costs)
+
+
+def test_daemon_latency(corpora: dict[float, CorpusPaths]) -> None:
+    """A warm daemon revalidates a saved script within tens of milliseconds."""
+    for scale, paths in corpora.items():
+        state = daemon.Daemon(
+            scan_engine.ScanConfig(
+                scripts_dir=paths.scripts_dir,
+                dialog_dir=paths.dialog_dir,
+                scripts_h=paths.scripts_h,
+                scripts_lst=paths.scripts_lst,
+            )
+        )
+        state.validate_project()
+        script = next(paths.scripts_dir.rglob("*.ssl"))
+
+        def save(script: Path = script, state: daemon.Daemon = state) -> None:
+            os.utime(script)
+            state.validate_file(script)
+
+        latency = _best_time(save, _REPEATS)
+        assert latency <= _DAEMON_LATENCY, f"{scale:g}x: validating a saved script took {latency * 1000:.1f} ms"
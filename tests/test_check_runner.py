@@ -0,0 +1,64 @@
+"""Tests for check_runner.py — concurrent checks with captured output."""
+
+import sys
+import threading
+
+import check_runner
+import pytest
+
+
+def test_run_checks_order_and_status() -> None:
+    """Results keep the checks' order whatever order they finish in, and sys.exit() marks a failure."""
+    second_done = threading.Event()
+
+    def first() -> bool:
+        second_done.wait(timeout=5)
+        print("first")
+        return False
+
+    def second() -> None:
+        print("second")
+        second_done.set()
+        sys.exit(1)
+
+    results = check_runner.run_checks({"first": first, "second": second, "third": lambda: True})
+    assert results == [
+        check_runner.CheckResult("first", failed=False, output="first\n"),
+        check_runner.CheckResult("second", failed=True, output="second\n"),
+        check_runner.CheckResult("third", failed=True, output=""),
+    ]
+
+
+def test_run_checks_exception() -> None:
+    """A check that raises fails with its traceback as output, and the other checks still report."""
+
+    def broken() -> bool:
+        print("reading script sets")
+        raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+    results = check_runner.run_checks({"broken": broken, "fine": lambda: False})
+    assert [(result.name, result.failed) for result in results] == [("broken", True), ("fine", False)]
+    output = results[0].output
+    assert output.startswith("reading script sets\nTraceback (most recent call last):\n")
+    assert output.endswith(
+        "UnicodeDecodeError: 'utf-8' codec can't decode byte 0xff in position 0: invalid start byte\n"
+    )
+
+
+def test_run_checks_concurrently() -> None:
+    """Checks run at the same time rather than one after another."""
+    barrier = threading.Barrier(3, timeout=5)
+    results = check_runner.run_checks({name: barrier.wait for name in ("a", "b", "c")})
+    assert [result.name for result in results] == ["a", "b", "c"]
+
+
+def test_report(capsys: pytest.CaptureFixture[str]) -> None:
+    """report() prints each output in order followed by the failed checks."""
+    results = [
+        check_runner.CheckResult("scripts", failed=True, output="Dupe\n"),
+        check_runner.CheckResult("msgs", failed=False, output="Messages checked: 1\n"),
+    ]
+    assert check_runner.report(results)
+    assert capsys.readouterr().out == "Dupe\nMessages checked: 1\nFailed checks: scripts\n"
+    assert not check_runner.report(results[1:])
+    assert capsys.readouterr().out == "Messages checked: 1\n"
@@ -0,0 +1,163 @@
+"""Tests for daemon.py — in-memory validation state answering JSON-RPC requests."""
+
+from collections.abc import Callable
+import io
+import json
+from pathlib import Path
+import socket
+import threading
+import time
+
+import daemon
+import pytest
+import scan_engine
+
+
+def _output(results: list) -> dict[str, str]:
+    """Return what each check printed, by check name."""
+    return {result.name: result.output for result in results}
+
+
+def test_validate_file(mod_tree: scan_engine.ScanConfig, touch: Callable[[Path, str], None]) -> None:
+    """A script is checked on its own, and only rescanned once it changes."""
+    config = mod_tree
+    state = daemon.Daemon(config)
+    doctor = config.scripts_dir / "vcdoctor.ssl"
+    output = _output(state.validate_file(doctor))
+    assert set(output) == {"lvars", "msgs"}
+    assert output["msgs"] == f"Messages in {doctor.resolve()} missing from {config.dialog_dir / 'vcdoctor.msg'}: 101\n"
+    assert output["lvars"].startswith("Script vcdoctor max LVAR index is 3")
+
+    misses = state.facts.misses
+    state.validate_file(doctor)
+    assert state.facts.misses == misses
+
+    touch(doctor, '#include "headers/common.h"\n#define LVAR_Flags   (5)\n   display_mstr(100)\n')
+    output = _output(state.validate_file(doctor))
+    assert state.facts.misses == misses + 1
+    assert output["msgs"] == ""
+    assert output["lvars"].startswith("Script vcdoctor max LVAR index is 5")
+
+
+def test_validate_dependents(mod_tree: scan_engine.ScanConfig, touch: Callable[[Path, str], None]) -> None:
+    """A .msg file or header is checked together with the scripts using it."""
+    config = mod_tree
+    state = daemon.Daemon(config)
+    state.validate_project()
+    doctor_msg = config.dialog_dir / "vcdoctor.msg"
+    touch(doctor_msg, "{100}{}{Hello.}\n{101}{}{Again.}\n{150}{}{Hi.}\n")
+    assert _output(state.validate_file(doctor_msg))["msgs"] == ""
+
+    merch_msg = config.dialog_dir / "vcmerch.msg"
+    touch(merch_msg, "{200}{}{Wares.}\n")
+    output = _output(state.validate_file(merch_msg))["msgs"]
+    assert output.startswith(f"Messages in {(config.scripts_dir / 'vcmerch.ssl').resolve()} missing")
+
+    header = config.scripts_dir / "headers" / "common.h"
+    touch(header, "#define LVAR_Shared   (2)\n")
+    output = _output(state.validate_file(header))["lvars"]
+    assert output.startswith("Script vcdoctor max LVAR index is 2")
+    assert "vcmerch" not in output
+
+
+def test_validate_project_matches_engine(
+    capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig, touch: Callable[[Path, str], None]
+) -> None:
+    """A project request reports what a scan engine run prints, also after a registry change."""
+    config = mod_tree
+    state = daemon.Daemon(config)
+    for lst_text in ("vcdoctor.int ; doctor # local_vars=0\n", "vcdoctor.int ; doctor\nvcdoctor.int ; again\n"):
+        touch(config.scripts_lst, lst_text)
+        with pytest.raises(SystemExit):
+            scan_engine.run(config)
+        expected = capsys.readouterr().out
+        results = state.validate_file(config.scripts_lst)
+        assert [result.name for result in results] == ["scripts", "lvars", "msgs"]
+        failed = ", ".join(result.name for result in results if result.failed)
+        assert "".join(result.output for result in results) + f"Failed checks: {failed}\n" == expected
+
+
+def test_handle_requests(tmp_path: Path, mod_tree: scan_engine.ScanConfig) -> None:
+    """Requests are answered with check results or JSON-RPC errors; notifications get no answer."""
+    config = mod_tree
+    state = daemon.Daemon(config)
+    doctor = str(config.scripts_dir / "vcdoctor.ssl")
+    requests = [
+        {"jsonrpc": "2.0", "id": 1, "method": "validate", "params": {"file": doctor}},
+        {"jsonrpc": "2.0", "method": "validate", "params": {"file": doctor}},
+        {"jsonrpc": "2.0", "id": 2, "method": "validate", "params": {"file": str(tmp_path / "missing.ssl")}},
+        {"jsonrpc": "2.0", "id": 3, "method": "validate", "params": {}},
+        {"jsonrpc": "2.0", "id": 4, "method": "lint"},
+        {"id": 5, "method": "validate"},
+        {"jsonrpc": "2.0", "id": 6, "method": "shutdown"},
+        {"jsonrpc": "2.0", "id": 7, "method": "validate", "params": {"project": True}},
+    ]
+    lines = [json.dumps(request) for request in requests]
+    reader = io.StringIO("\n".join([*lines[:2], "{oops", "", *lines[2:]]) + "\n")
+    writer = io.StringIO()
+    assert daemon.serve(state, reader, writer)
+
+    responses = [json.loads(line) for line in writer.getvalue().splitlines()]
+    assert [response["id"] for response in responses] == [1, None, 2, 3, 4, None, 6]
+    assert responses[0]["result"]["failed"]
+    assert responses[0]["result"]["checks"][1]["name"] == "msgs"
+    errors = [response["error"]["code"] for response in responses[1:-1]]
+    assert errors == [
+        daemon.PARSE_ERROR,
+        daemon.SERVER_ERROR,
+        daemon.INVALID_PARAMS,
+        daemon.METHOD_NOT_FOUND,
+        daemon.INVALID_REQUEST,
+    ]
+    assert responses[-1]["result"] is None
+
+
+def test_handle_unexpected_error(mod_tree: scan_engine.ScanConfig) -> None:
+    """A request failing in an unexpected way gets a server error, and later requests are still answered."""
+    config = mod_tree
+    state = daemon.Daemon(config)
+    bad = {"jsonrpc": "2.0", "id": 1, "method": "validate", "params": {"file": "a\u0000b.ssl"}}
+    good = {
+        "jsonrpc": "2.0",
+        "id": 2,
+        "method": "validate",
+        "params": {"file": str(config.scripts_dir / "vcdoctor.ssl")},
+    }
+    reader = io.StringIO(json.dumps(bad) + "\n" + json.dumps(good) + "\n")
+    writer = io.StringIO()
+    assert not daemon.serve(state, reader, writer)
+
+    error, result = (json.loads(line) for line in writer.getvalue().splitlines())
+    assert error["error"]["code"] == daemon.SERVER_ERROR
+    assert "null" in error["error"]["message"]
+    assert result["result"]["checks"]
+
+
+def test_serve_socket(tmp_path: Path, mod_tree: scan_engine.ScanConfig) -> None:
+    """Clients of the Unix socket are answered one connection at a time until a shutdown request."""
+    config = mod_tree
+    state = daemon.Daemon(config)
+    socket_path = tmp_path / "daemon.sock"
+    # Left behind by a daemon that was killed
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(str(socket_path))
+    server = threading.Thread(target=daemon.serve_socket, args=(state, socket_path))
+    server.start()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            if client.connect_ex(str(socket_path)) == 0:
+                break
+        time.sleep(0.01)
+
+    for request_id, method in ((1, "validate"), (2, "shutdown")):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(socket_path))
+            request = {"jsonrpc": "2.0", "id": request_id, "method": method, "params": {"project": True}}
+            client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            client.shutdown(socket.SHUT_WR)
+            response = json.loads(client.makefile("r", encoding="utf-8").readline())
+        assert response["id"] == request_id
+    server.join(10)
+    assert not server.is_alive()
+    assert not socket_path.exists()
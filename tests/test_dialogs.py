@@ -1,9 +1,12 @@
 """Tests for dialogs.py — validates dialog message references in Fallout scripts."""
 
 from pathlib import Path
+import time
 
 import dialogs
+import parallel
 import pytest
+from scan_cache import ScanCache
 
 
 def test_get_generic_messages(fixtures_dir: Path) -> None:
@@ -38,6 +41,81 @@ def test_get_script_messages_empty_line() -> None:
     assert result == []
 
 
+def test_get_messages_from_file_skips_comments_and_strings() -> None:
+    """get_messages_from_file ignores calls in trailing comments, block comments and string literals."""
+    script_text = (
+        "   display_mstr(100); // display_mstr(101)\n"
+        "   /* display_mstr(102)\n"
+        "      display_mstr(103) */ display_mstr(104)\n"
+        '   debug_msg("display_mstr(105)");\n'
+    )
+    assert dialogs.get_messages_from_file(script_text) == {"script": ["100", "104"], "gen": []}
+
+
+def test_get_dialog_path_ignores_commented_name(tmp_path: Path) -> None:
+    """get_dialog_path skips a commented-out NAME define."""
+    script_text = "// #define NAME SCRIPT_OLD\n#define NAME SCRIPT_NEW\n"
+    assert dialogs.get_dialog_path(script_text, tmp_path / "x.ssl", tmp_path) == tmp_path / "new.msg"
+
+
+def test_scan_line_script_and_generic() -> None:
+    """scan_line returns script and generic message IDs from a single pass over the line."""
+    result = dialogs.scan_line("   NOption(101, Node002, 004); display_msg(g_mstr(200));")
+    assert result == (["101"], ["200"], [])
+
+
+def test_scan_line_last_call_per_underscore_free_stretch() -> None:
+    """scan_line keeps the historical regex result: one call per underscore-free stretch of the line."""
+    assert dialogs.scan_line("   Reply(100); Reply(101)") == (["101"], [], [])
+    assert dialogs.scan_line("   Reply(100); x_y Reply(101)") == (["100", "101"], [], [])
+
+
+def test_scan_line_requires_leading_character() -> None:
+    """scan_line ignores calls at the very start of the line or directly after an underscore."""
+    assert dialogs.scan_line("display_mstr(100)") == ([], [], [])
+    assert dialogs.scan_line("   my_floater(100)") == ([], [], [])
+
+
+def test_scan_line_all_ranges() -> None:
+    """scan_line keeps every range call on a line as an interval."""
+    line = "   floater_rand(100, 102); Reply_Rand(200,299); my_floater_rand(300, 301)"
+    assert dialogs.scan_line(line) == ([], [], [(100, 102), (200, 299)])
+
+
+def test_format_ranges() -> None:
+    """format_ranges joins multi-ID ranges with an en dash and prints single IDs plainly."""
+    assert dialogs.format_ranges([(150, 162), (170, 170)]) == "150\u2013162 170"
+
+
+def test_scan_line_long_line() -> None:
+    """scan_line handles long underscore-free lines without quadratic backtracking."""
+    line = "   " + "x" * 200_000 + " floater(100)"
+    assert dialogs.scan_line(line) == (["100"], [], [])
+
+
+def test_scan_line_many_calls_on_one_line() -> None:
+    """scan_line time grows linearly with the number of calls on a single line."""
+    call_group = b" Reply(100) mstr(101) a_Reply(102) x_"
+    small_count = 10_000
+    growth = 4
+    # Linear scanning takes about 4x as long for 4x the calls; the old per-call line lookups took 16x
+    max_time_ratio = 8
+
+    def best_time(line: bytes) -> float:
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            dialogs.scan_line(line)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    messages, gen_messages, ranges = dialogs.scan_line(call_group * small_count)
+    assert messages == ["100"] * small_count + ["101"] * small_count
+    assert (gen_messages, ranges) == ([], [])
+    ratio = best_time(call_group * (small_count * growth)) / best_time(call_group * small_count)
+    assert ratio < max_time_ratio
+
+
 def test_main_passing(tmp_path: Path, fixtures_dir: Path) -> None:
     """main() exits cleanly when all referenced messages exist in dialog files."""
     dialog_dir = tmp_path / "dialog"
@@ -94,3 +172,135 @@ def test_main_missing_generic_msg(tmp_path: Path) -> None:
 
     # Should not raise — generic.msg absence is handled gracefully
     dialogs.main([str(dialog_dir), str(scripts_dir)])
+
+
+def test_extract_scripts_parallel_order(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """extract_scripts returns pool results in input order, matching the serial path."""
+    monkeypatch.setattr(parallel, "_MIN_PARALLEL_FILES", 1)
+    script_paths = []
+    for i in range(8):
+        script_path = tmp_path / f"script{i}.ssl"
+        # Vary sizes so the largest-first work order differs from the input order
+        script_path.write_text(f"   display_mstr({100 + i})\n" * (i % 3 + 1), encoding="utf-8")
+        script_paths.append(script_path)
+
+    serial = dialogs.extract_scripts(script_paths, jobs=1)
+    pooled = dialogs.extract_scripts(script_paths, jobs=2)
+    assert pooled == serial
+    assert [result.script for result in pooled] == [[str(100 + i)] for i in range(8)]
+
+
+def test_main_jobs(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """main() accepts --jobs and reports the same totals as a serial run."""
+    dialog_dir = tmp_path / "dialog"
+    dialog_dir.mkdir()
+    scripts_dir = tmp_path / "scripts"
+    scripts_dir.mkdir()
+    (scripts_dir / "vcdoctor.ssl").write_text("   display_mstr(100)\n", encoding="utf-8")
+    (dialog_dir / "vcdoctor.msg").write_bytes(b"{100}{}{Hello.}\n")
+
+    dialogs.main([str(dialog_dir), str(scripts_dir), "--jobs", "0"])
+    assert capsys.readouterr().out == "Messages checked: 1\nScripts without a .msg file: 0\n"
+
+
+def test_main_reports_malformed_msg(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """main() fails on duplicate IDs and malformed entries, and no longer takes text numbers for IDs."""
+    dialog_dir = tmp_path / "dialog"
+    dialog_dir.mkdir()
+    scripts_dir = tmp_path / "scripts"
+    scripts_dir.mkdir()
+    (scripts_dir / "vcdoctor.ssl").write_text("   display_mstr(100)\n   display_mstr(101)\n", encoding="utf-8")
+    msg_path = dialog_dir / "vcdoctor.msg"
+    msg_path.write_bytes(b"{100}{}{Hello.}\n{100}{}{Again.}\n{102}{}{See {101}}\n")
+
+    with pytest.raises(SystemExit):
+        dialogs.main([str(dialog_dir), str(scripts_dir)])
+    assert capsys.readouterr().out.splitlines()[:3] == [
+        f"Messages in {scripts_dir / 'vcdoctor.ssl'} missing from {msg_path}: 101",
+        f"{msg_path}, line 2: duplicate message ID 100, first defined on line 1",
+        f"{msg_path}, line 3: unbalanced braces",
+    ]
+
+
+def test_main_accepts_multiline_msg_entries(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """main() passes .msg entries whose text runs over several lines, as the engine reads them."""
+    dialog_dir = tmp_path / "dialog"
+    dialog_dir.mkdir()
+    scripts_dir = tmp_path / "scripts"
+    scripts_dir.mkdir()
+    (scripts_dir / "vcdoctor.ssl").write_text("   display_mstr(100)\n   display_mstr(101)\n", encoding="utf-8")
+    (dialog_dir / "vcdoctor.msg").write_bytes(b"{100}{}{Hello,\r\nstranger.}\n{101}{}{Bye.}\n")
+
+    dialogs.main([str(dialog_dir), str(scripts_dir)])
+    assert "line" not in capsys.readouterr().out
+
+
+def test_extract_script_non_utf8(tmp_path: Path) -> None:
+    """extract_script scans scripts containing stray cp1252 bytes instead of failing to decode them."""
+    script_path = tmp_path / "vcdoctor.ssl"
+    script_path.write_bytes(b'#define NAME SCRIPT_VCDOCTOR\n   display_msg("caf\xe9"); display_mstr(100)\n')
+    result, _ = dialogs.extract_script(script_path)
+    assert result == dialogs.ScriptMessages(["100"], [], "VCDOCTOR", [], [])
+
+
+def test_extract_scripts_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """extract_scripts rescans only scripts whose cache entries are stale."""
+    cache_dir = tmp_path / "cache"
+    unchanged = tmp_path / "unchanged.ssl"
+    changed = tmp_path / "changed.ssl"
+    unchanged.write_text("   display_mstr(100)\n", encoding="utf-8")
+    changed.write_text("   display_mstr(101)\n", encoding="utf-8")
+    cache = ScanCache(cache_dir, "dialogs")
+    dialogs.extract_scripts([unchanged, changed], cache=cache)
+    cache.save()
+
+    changed.write_text("   display_mstr(102)\n", encoding="utf-8")
+    scanned: list[Path] = []
+    extract_script = dialogs.extract_script
+
+    def counting_extract(script_path: Path) -> tuple[dialogs.ScriptMessages, str]:
+        scanned.append(script_path)
+        return extract_script(script_path)
+
+    monkeypatch.setattr(dialogs, "extract_script", counting_extract)
+    warm_cache = ScanCache(cache_dir, "dialogs")
+    results = dialogs.extract_scripts([unchanged, changed], cache=warm_cache)
+    assert scanned == [changed]
+    assert [result.script for result in results] == [["100"], ["102"]]
+    assert (warm_cache.hits, warm_cache.misses) == (1, 1)
+
+
+def test_main_mixed_case_msg(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """main() finds .msg files whose names differ in case and counts scripts without one."""
+    dialog_dir = tmp_path / "dialog"
+    dialog_dir.mkdir()
+    scripts_dir = tmp_path / "scripts"
+    scripts_dir.mkdir()
+    (scripts_dir / "acmybot.ssl").write_text("   display_mstr(100)\n   display_mstr(101)\n", encoding="utf-8")
+    (scripts_dir / "nomsg.ssl").write_text("   display_mstr(100)\n", encoding="utf-8")
+    (dialog_dir / "ACMYBOT.MSG").write_bytes(b"{100}{}{Hello.}\n")
+
+    with pytest.raises(SystemExit):
+        dialogs.main([str(dialog_dir), str(scripts_dir)])
+    output = capsys.readouterr().out
+    assert f"missing from {dialog_dir / 'ACMYBOT.MSG'}: 101" in output
+    assert "Scripts without a .msg file: 1" in output
+
+
+def test_main_reports_missing_ranges(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """main() reports the missing parts of message ranges compactly, without expanding them."""
+    dialog_dir = tmp_path / "dialog"
+    dialog_dir.mkdir()
+    scripts_dir = tmp_path / "scripts"
+    scripts_dir.mkdir()
+    (scripts_dir / "vcdoctor.ssl").write_text(
+        "   Reply(160)\n   Reply_Rand(100, 99999)\n   floater_rand(100, 101); floater_rand(150, 152)\n",
+        encoding="utf-8",
+    )
+    (dialog_dir / "vcdoctor.msg").write_bytes(b"{100}{}{A}\n{101}{}{B}\n{151}{}{C}\n")
+
+    with pytest.raises(SystemExit):
+        dialogs.main([str(dialog_dir), str(scripts_dir)])
+    output = capsys.readouterr().out
+    # Reply(160) falls inside a missing range and is not listed again
+    assert output.splitlines()[0].endswith(": 102\u2013150 152\u201399999")
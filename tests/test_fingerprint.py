@@ -0,0 +1,88 @@
+"""Tests for fingerprint.py — Merkle fingerprints of validator inputs."""
+
+from collections.abc import Callable
+from pathlib import Path
+
+import fingerprint
+
+
+def _write_src_tree(tmp_path: Path) -> fingerprint.Tree:
+    """Write a source tree of a script, a header and an unrelated file, and return it as a fingerprinted tree."""
+    (tmp_path / "src" / "headers").mkdir(parents=True)
+    (tmp_path / "src" / "a.ssl").write_text("a\n", encoding="utf-8")
+    (tmp_path / "src" / "headers" / "b.h").write_text("b\n", encoding="utf-8")
+    (tmp_path / "src" / "notes.txt").write_text("c\n", encoding="utf-8")
+    return fingerprint.Tree(tmp_path / "src", (".ssl", ".h"))
+
+
+def test_tree_hash(tmp_path: Path, touch: Callable[[Path, str], None]) -> None:
+    """A tree hashes the files with its suffixes by path and content, and no others."""
+    tree = _write_src_tree(tmp_path)
+    original = fingerprint.FingerprintStore(tmp_path / "cache").tree_hash(tree)
+
+    touch(tree.root / "notes.txt", "changed\n")
+    assert fingerprint.FingerprintStore(tmp_path / "cache").tree_hash(tree) == original
+
+    touch(tree.root / "headers" / "b.h", "changed\n")
+    changed = fingerprint.FingerprintStore(tmp_path / "cache").tree_hash(tree)
+    assert changed != original
+
+    (tree.root / "headers" / "b.h").rename(tree.root / "b.h")
+    assert fingerprint.FingerprintStore(tmp_path / "cache").tree_hash(tree) not in (original, changed)
+    assert fingerprint.FingerprintStore(tmp_path / "cache").tree_hash(tree._replace(root=tmp_path / "none")) != original
+
+
+def test_hashes_reused_between_runs(tmp_path: Path, touch: Callable[[Path, str], None]) -> None:
+    """Files with the size and mtime stored by an earlier run are not hashed again."""
+    tree = _write_src_tree(tmp_path)
+    inputs = fingerprint.Inputs(("lvars",), trees=(tree,))
+    store = fingerprint.FingerprintStore(tmp_path / "cache")
+    store.record("lvars", inputs, passed=True)
+    store.save()
+    assert store.hashed > 0
+
+    store = fingerprint.FingerprintStore(tmp_path / "cache")
+    assert store.unchanged("lvars", inputs)
+    assert store.hashed == 0
+
+    touch(tree.root / "a.ssl", "changed\n")
+    store = fingerprint.FingerprintStore(tmp_path / "cache")
+    assert not store.unchanged("lvars", inputs)
+    assert store.hashed == 1
+
+
+def test_unchanged(tmp_path: Path, touch: Callable[[Path, str], None]) -> None:
+    """Only passing runs on the same settings, files and extra files count as unchanged."""
+    tree = _write_src_tree(tmp_path)
+    header = tmp_path / "outside.h"
+    header.write_text("x\n", encoding="utf-8")
+    lst = tmp_path / "scripts.lst"
+    inputs = fingerprint.Inputs(("msgs",), files=(lst, None), trees=(tree,))
+    store = fingerprint.FingerprintStore(tmp_path / "cache")
+    assert not store.unchanged("msgs", inputs)
+    store.record("msgs", inputs, passed=True, extra_files=[str(header)])
+    store.record("lvars", inputs, passed=False)
+    store.save()
+
+    store = fingerprint.FingerprintStore(tmp_path / "cache")
+    assert store.unchanged("msgs", inputs)
+    assert not store.unchanged("msgs", inputs._replace(settings=("msgs", "other")))
+    assert not store.unchanged("lvars", inputs)
+
+    touch(header, "changed\n")
+    assert not fingerprint.FingerprintStore(tmp_path / "cache").unchanged("msgs", inputs)
+    touch(header, "x\n")
+    lst.write_text("", encoding="utf-8")
+    assert not fingerprint.FingerprintStore(tmp_path / "cache").unchanged("msgs", inputs)
+
+
+def test_store_version(tmp_path: Path) -> None:
+    """Stores written in another format are discarded."""
+    inputs = fingerprint.Inputs(("scripts",))
+    store = fingerprint.FingerprintStore(tmp_path)
+    store.record("scripts", inputs, passed=True)
+    store.save()
+    store.path.write_text(store.path.read_text(encoding="utf-8").replace('"version":1', '"version":0'))
+    assert not fingerprint.FingerprintStore(tmp_path).unchanged("scripts", inputs)
+    store.path.write_text("{oops", encoding="utf-8")
+    assert not fingerprint.FingerprintStore(tmp_path).unchanged("scripts", inputs)
@@ -0,0 +1,123 @@
+"""Tests for includes.py — include graph resolution with memoized header facts."""
+
+from pathlib import Path
+
+import dialogs
+from includes import Code, IncludeResolver, resolve_include, scan_file, scan_with_includes
+import lvars
+import pytest
+from scan_cache import MemoryCache
+
+
+def _line_count(code: Code) -> int:
+    return code.count(b"\n")
+
+
+def test_scan_with_includes() -> None:
+    """scan_with_includes collects quoted includes and ignores commented-out ones."""
+    lines = [
+        b'#include "../headers/define.h"\n',
+        b'// #include "old.h"\n',
+        b'/* #include "older.h"\n',
+        b'#include "oldest.h" */\n',
+        b'  #include "command.h" // note\n',
+        b'x := "#include"; #include "not_at_line_start.h"\n',
+    ]
+    facts, includes = scan_with_includes(b"".join(lines), _line_count)
+    assert facts == len(lines)
+    assert includes == ["../headers/define.h", "command.h"]
+
+
+def test_resolve_include(tmp_path: Path) -> None:
+    """resolve_include resolves relative to the including file, tolerating backslashes and case."""
+    (tmp_path / "headers").mkdir()
+    (tmp_path / "scripts").mkdir()
+    header = tmp_path / "headers" / "Define.h"
+    header.write_text("\n", encoding="utf-8")
+    script = tmp_path / "scripts" / "a.ssl"
+    assert resolve_include("../headers/Define.h", script) == header.resolve()
+    assert resolve_include("..\\HEADERS\\define.H", script) == header.resolve()
+    assert resolve_include("../headers/missing.h", script) is None
+
+
+def test_include_resolver_scans_headers_once(tmp_path: Path) -> None:
+    """IncludeResolver scans each header once and follows nested includes and cycles."""
+    (tmp_path / "a.h").write_text('#include "b.h"\nx\n', encoding="utf-8")
+    (tmp_path / "b.h").write_text('#include "a.h"\ny\nz\n', encoding="utf-8")
+    scanned: list[int] = []
+
+    def scan(code: Code) -> int:
+        count = _line_count(code)
+        scanned.append(count)
+        return count
+
+    resolver = IncludeResolver(scan)
+    includes = [str((tmp_path / "a.h").resolve())]
+    assert resolver.header_facts(includes) == [2, 3]
+    assert resolver.header_facts(includes) == [2, 3]
+    assert scanned == [2, 3]
+
+
+def test_include_resolver_cache(tmp_path: Path) -> None:
+    """IncludeResolver takes unchanged headers from its cache and stores newly scanned ones."""
+    header = tmp_path / "a.h"
+    header.write_text("x\n", encoding="utf-8")
+    includes = [str(header.resolve())]
+    cache = MemoryCache("headers", 10)
+    assert IncludeResolver(_line_count, cache).header_facts(includes) == [1]
+
+    def scan(code: Code) -> int:
+        raise AssertionError("cached header scanned again")
+
+    assert IncludeResolver(scan, cache).header_facts(includes) == [1]
+    header.write_text("x\ny\n", encoding="utf-8")
+    assert IncludeResolver(_line_count, cache).header_facts(includes) == [2]
+
+
+def test_scan_file_keeps_missing_includes(tmp_path: Path) -> None:
+    """scan_file keeps includes that cannot be resolved as the path they would have."""
+    (tmp_path / "a.ssl").write_text('#include "missing.h"\n#include "b.h"\n', encoding="utf-8")
+    (tmp_path / "b.h").write_text("\n", encoding="utf-8")
+    includes = scan_file(tmp_path / "a.ssl", _line_count).includes
+    assert includes == [str((tmp_path / "missing.h").resolve()), str((tmp_path / "b.h").resolve())]
+
+
+def test_include_resolver_finds_created_headers(tmp_path: Path) -> None:
+    """IncludeResolver finds headers created after their includer was scanned, also in other letter case."""
+    (tmp_path / "a.ssl").write_text('#include "a.h"\n#include "b.h"\n', encoding="utf-8")
+    includes = scan_file(tmp_path / "a.ssl", _line_count).includes
+    assert IncludeResolver(_line_count).header_facts(includes) == []
+
+    (tmp_path / "a.h").write_text("x\n", encoding="utf-8")
+    (tmp_path / "B.H").write_text("x\ny\n", encoding="utf-8")
+    resolver = IncludeResolver(_line_count)
+    assert resolver.header_facts(includes) == [1, 2]
+    assert resolver.headers(includes) == [*includes, str((tmp_path / "B.H").resolve())]
+
+
+def test_dialogs_name_from_header(tmp_path: Path) -> None:
+    """dialogs.main takes the NAME define and message calls from included headers."""
+    dialog_dir = tmp_path / "dialog"
+    dialog_dir.mkdir()
+    scripts_dir = tmp_path / "scripts"
+    scripts_dir.mkdir()
+    (scripts_dir / "name.h").write_text("#define NAME SCRIPT_VCDOCTOR\n   display_mstr(101)\n", encoding="utf-8")
+    (scripts_dir / "doctor.ssl").write_text('#include "name.h"\n   display_mstr(100)\n', encoding="utf-8")
+    (dialog_dir / "vcdoctor.msg").write_bytes(b"{100}{}{Hello.}\n")
+
+    with pytest.raises(SystemExit) as exc_info:
+        dialogs.main([str(dialog_dir), str(scripts_dir)])
+    assert exc_info.value.code == 1
+
+
+def test_lvars_from_header(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """lvars.main counts LVARs defined in included headers."""
+    (tmp_path / "lvars.h").write_text("#define LVAR_Extra (2)\n", encoding="utf-8")
+    (tmp_path / "vcdoctor.ssl").write_text('#include "lvars.h"\n#define LVAR_Status (0)\n', encoding="utf-8")
+    lst_file = tmp_path / "scripts.lst"
+    lst_file.write_text("vcdoctor.int    local_vars=2\n", encoding="utf-8")
+
+    with pytest.raises(SystemExit) as exc_info:
+        lvars.main([str(tmp_path), str(lst_file)])
+    assert exc_info.value.code == 1
+    assert "requires 3 variables" in capsys.readouterr().out
@@ -0,0 +1,113 @@
+"""Tests for incremental.py and the --changed-since mode of the validators."""
+
+from pathlib import Path
+import subprocess
+
+import dialogs
+import incremental
+import lvars
+import pytest
+import scripts_lst
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    """Return a git repository with scripts, dialogs and scripts.lst committed."""
+    (tmp_path / "scripts").mkdir()
+    (tmp_path / "dialog").mkdir()
+    (tmp_path / "scripts" / "alpha.ssl").write_text("   display_mstr(100)\n", encoding="utf-8")
+    (tmp_path / "scripts" / "beta.ssl").write_text("   display_mstr(200)\n", encoding="utf-8")
+    (tmp_path / "dialog" / "alpha.msg").write_text("{101}{}{Hi.}\n", encoding="utf-8")
+    (tmp_path / "dialog" / "beta.msg").write_text("{201}{}{Hi.}\n", encoding="utf-8")
+    (tmp_path / "scripts.lst").write_text("alpha.int local_vars=0\n", encoding="utf-8")
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "init")
+    return tmp_path
+
+
+def test_changed_files(repo: Path) -> None:
+    """changed_files reports modified and untracked files as resolved paths."""
+    (repo / "scripts" / "alpha.ssl").write_text("   display_mstr(101)\n", encoding="utf-8")
+    (repo / "new.txt").write_text("x\n", encoding="utf-8")
+    assert incremental.changed_files("HEAD", repo / "scripts") == {
+        (repo / "scripts" / "alpha.ssl").resolve(),
+        (repo / "new.txt").resolve(),
+    }
+
+
+def test_changed_since_bad_ref(repo: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """changed_since exits with code 1 when git cannot resolve the ref."""
+    with pytest.raises(SystemExit) as exc_info:
+        incremental.changed_since("no-such-ref", repo)
+    assert exc_info.value.code == 1
+    assert capsys.readouterr().out.startswith("Cannot list files changed since no-such-ref")
+
+
+def test_any_changed(tmp_path: Path) -> None:
+    """any_changed treats a full run as all changed and ignores None paths."""
+    path = tmp_path / "a.txt"
+    assert incremental.any_changed([path], None) is True
+    assert incremental.any_changed([None, path], {path.resolve()}) is True
+    assert incremental.any_changed([None, path], set()) is False
+
+
+def test_any_changed_under(tmp_path: Path) -> None:
+    """any_changed_under looks for changed files anywhere below a directory."""
+    changed = {(tmp_path / "proto" / "critters" / "critters.lst").resolve()}
+    assert incremental.any_changed_under(tmp_path / "proto", None) is True
+    assert incremental.any_changed_under(tmp_path / "proto", changed) is True
+    assert incremental.any_changed_under(tmp_path / "scripts", changed) is False
+    assert incremental.any_changed_under(None, changed) is False
+
+
+def test_dialogs_changed_ssl(repo: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """dialogs --changed-since checks only changed scripts."""
+    (repo / "scripts" / "alpha.ssl").write_text("   display_mstr(102)\n", encoding="utf-8")
+    with pytest.raises(SystemExit):
+        dialogs.main([str(repo / "dialog"), str(repo / "scripts"), "--changed-since", "HEAD"])
+    out = capsys.readouterr().out
+    assert "alpha.ssl" in out
+    assert "beta.ssl" not in out
+
+
+def test_dialogs_changed_msg(repo: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """dialogs --changed-since checks every script that uses a changed .msg file."""
+    (repo / "dialog" / "beta.msg").write_text("{202}{}{Hi.}\n", encoding="utf-8")
+    with pytest.raises(SystemExit):
+        dialogs.main([str(repo / "dialog"), str(repo / "scripts"), "--changed-since", "HEAD"])
+    out = capsys.readouterr().out
+    assert "beta.ssl" in out
+    assert "alpha.ssl" not in out
+
+
+def test_dialogs_nothing_changed(repo: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """dialogs --changed-since checks nothing when no inputs changed."""
+    dialogs.main([str(repo / "dialog"), str(repo / "scripts"), "--changed-since", "HEAD"])
+    assert capsys.readouterr().out == "Messages checked: 0\nScripts without a .msg file: 0\n"
+
+
+def test_lvars_changed_lst(repo: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """lvars --changed-since rechecks unchanged scripts when scripts.lst changed."""
+    (repo / "scripts" / "alpha.ssl").write_text("#define LVAR_A (0)\n", encoding="utf-8")
+    _git(repo, "commit", "-q", "-am", "lvar")
+    lvars.main([str(repo / "scripts"), str(repo / "scripts.lst"), "--changed-since", "HEAD"])
+
+    (repo / "scripts.lst").write_text("alpha.int local_vars=0\n\n", encoding="utf-8")
+    with pytest.raises(SystemExit):
+        lvars.main([str(repo / "scripts"), str(repo / "scripts.lst"), "--changed-since", "HEAD"])
+    assert "Script alpha" in capsys.readouterr().out
+
+
+def test_scripts_lst_unchanged(repo: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """scripts_lst --changed-since skips the check when neither input changed."""
+    scripts_lst.main([str(repo / "scripts.h"), str(repo / "scripts.lst"), "--changed-since", "HEAD"])
+    assert capsys.readouterr().out == "scripts.h and scripts.lst unchanged since HEAD, skipping.\n"
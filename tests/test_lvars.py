@@ -1,5 +1,6 @@
 """Tests for lvars.py — validates local variable allocations in Fallout scripts."""
 
+import json
 from pathlib import Path
 
 import lvars
@@ -27,6 +28,24 @@ def test_get_max_lvar_no_lvars(fixtures_dir: Path) -> None:
     assert result == 0
 
 
+def test_get_max_lvar_skips_comments(tmp_path: Path) -> None:
+    """get_max_lvar ignores LVAR defines inside block comments."""
+    ssl_file = tmp_path / "vcdoctor.ssl"
+    ssl_file.write_text(
+        "#define LVAR_Status   (0) // status\n/*\n#define LVAR_Old      (5)\n*/\n",
+        encoding="utf-8",
+    )
+    assert lvars.get_max_lvar(ssl_file) == 1
+
+
+def test_get_max_lvar_non_utf8(tmp_path: Path) -> None:
+    """get_max_lvar scans scripts containing non-UTF-8 bytes."""
+    ssl_file = tmp_path / "vcdoctor.ssl"
+    ssl_file.write_bytes(b"// \xc9tat\n#define LVAR_Status   (4)\n")
+    expected_var_count = 5  # max index (4) + 1
+    assert lvars.get_max_lvar(ssl_file) == expected_var_count
+
+
 def test_main_passing(tmp_path: Path) -> None:
     """main() exits cleanly when allocations are sufficient."""
     ssl_file = tmp_path / "vcdoctor.ssl"
@@ -55,3 +74,48 @@ def test_main_failing(tmp_path: Path) -> None:
     with pytest.raises(SystemExit) as exc_info:
         lvars.main([str(tmp_path), str(lst_file)])
     assert exc_info.value.code == 1
+
+
+def test_main_cache_dir(tmp_path: Path) -> None:
+    """main() with --cache-dir stores results and reports the same mismatches on a warm run."""
+    ssl_file = tmp_path / "vcdoctor.ssl"
+    ssl_file.write_text("#define LVAR_Status   (3)\n", encoding="utf-8")
+    lst_file = tmp_path / "scripts.lst"
+    lst_file.write_text("vcdoctor.int    local_vars=2\n", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    for _ in range(2):
+        with pytest.raises(SystemExit) as exc_info:
+            lvars.main([str(tmp_path), str(lst_file), "--cache-dir", str(cache_dir)])
+        assert exc_info.value.code == 1
+    assert (cache_dir / "lvars.json").is_file()
+
+
+def test_main_cache_dir_created_header(tmp_path: Path) -> None:
+    """main() with --cache-dir counts a header created after the script including it was cached."""
+    (tmp_path / "vcdoctor.ssl").write_text('#include "lvars.h"\n#define LVAR_Status   (0)\n', encoding="utf-8")
+    lst_file = tmp_path / "scripts.lst"
+    lst_file.write_text("vcdoctor.int    local_vars=2\n", encoding="utf-8")
+    args = [str(tmp_path), str(lst_file), "--cache-dir", str(tmp_path / "cache")]
+    lvars.main(args)
+
+    (tmp_path / "lvars.h").write_text("#define LVAR_Extra   (2)\n", encoding="utf-8")
+    with pytest.raises(SystemExit) as exc_info:
+        lvars.main(args)
+    assert exc_info.value.code == 1
+
+
+def test_main_metrics(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """main() with --metrics writes its phases, even when it finds problems."""
+    monkeypatch.delenv("GITHUB_STEP_SUMMARY", raising=False)
+    scripts_dir = tmp_path / "scripts"
+    scripts_dir.mkdir()
+    (scripts_dir / "vcdoctor.ssl").write_text("#define LVAR_Status   (3)\n", encoding="utf-8")
+    lst_file = tmp_path / "scripts.lst"
+    lst_file.write_text("vcdoctor.int    local_vars=2\n", encoding="utf-8")
+    metrics_path = tmp_path / "metrics.json"
+
+    with pytest.raises(SystemExit):
+        lvars.main([str(scripts_dir), str(lst_file), "--metrics", str(metrics_path)])
+    rows = json.loads(metrics_path.read_text(encoding="utf-8"))
+    assert [(row["phase"], row["files"]) for row in rows] == [("walk", 1), ("parse", 1), ("extract", 1), ("check", 1)]
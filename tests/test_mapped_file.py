@@ -0,0 +1,34 @@
+"""Tests for mapped_file.py — memory-mapped file access."""
+
+from pathlib import Path
+
+import mapped_file
+import pytest
+
+
+def test_open_mapped(tmp_path: Path) -> None:
+    """open_mapped exposes the raw file bytes."""
+    file_path = tmp_path / "data.bin"
+    file_path.write_bytes(b"abc\xe9\n")
+    with mapped_file.open_mapped(file_path) as buffer:
+        assert buffer[:] == b"abc\xe9\n"
+
+
+def test_open_mapped_empty(tmp_path: Path) -> None:
+    """open_mapped yields an empty buffer for empty files, which cannot be mapped."""
+    file_path = tmp_path / "empty.bin"
+    file_path.write_bytes(b"")
+    with mapped_file.open_mapped(file_path) as buffer:
+        assert len(buffer) == 0
+
+
+def test_open_mapped_missing(tmp_path: Path) -> None:
+    """open_mapped raises OSError for a missing file."""
+    with pytest.raises(OSError), mapped_file.open_mapped(tmp_path / "missing.bin"):
+        pass
+
+
+def test_iter_lines() -> None:
+    """iter_lines keeps line endings and yields a final unterminated line."""
+    assert list(mapped_file.iter_lines(b"a\r\nb\n\nc")) == [b"a\r\n", b"b\n", b"\n", b"c"]
+    assert list(mapped_file.iter_lines(b"")) == []
@@ -0,0 +1,71 @@
+"""Tests for metrics.py — per-phase performance metrics."""
+
+import json
+from pathlib import Path
+import subprocess
+import sys
+
+import metrics
+import pytest
+from scan_cache import ScanCache
+
+
+def test_phase_accumulates(tmp_path: Path) -> None:
+    """A phase entered several times adds up its times, files and bytes."""
+    script = tmp_path / "a.ssl"
+    script.write_bytes(b"procedure start;\n")
+    collector = metrics.Metrics()
+    for _ in range(2):
+        with collector.phase("lvars", "extract") as stats:
+            stats.add_files([script, tmp_path / "missing.ssl"])
+    with collector.phase("lvars", "check"):
+        pass
+    cache = ScanCache(tmp_path / "cache", "lvars")
+    cache.get(script)
+    collector.stats("lvars", "extract").add_cache(cache)
+
+    extract, check = collector.as_list()
+    assert (extract["validator"], extract["phase"], check["phase"]) == ("lvars", "extract", "check")
+    expected_files = 4  # Two files each time the phase was entered
+    assert extract["files"] == expected_files
+    assert extract["bytes"] == 2 * script.stat().st_size
+    assert (extract["cache_hits"], extract["cache_misses"]) == (0, 1)
+    assert extract["wall_time"] > 0
+    assert extract["files_per_sec"] > 0
+    assert extract["peak_memory"] >= 0
+
+
+def test_worker_cpu_time_recorded_once() -> None:
+    """CPU time of worker processes goes to a single run-wide row, not to the phases they ran in."""
+    collector = metrics.Metrics()
+    for name in ("extract", "check"):
+        with collector.phase("msgs", name):
+            subprocess.run([sys.executable, "-c", "sum(range(10**7))"], check=True)
+    extract, check, workers = collector.as_list()
+    assert (workers["validator"], workers["phase"]) == ("all", "workers")
+    assert workers["cpu_time"] > extract["cpu_time"] + check["cpu_time"]
+
+
+def test_write(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """write() stores JSON and appends a Markdown table to the GitHub job summary."""
+    summary = tmp_path / "summary.md"
+    summary.write_text("earlier step\n", encoding="utf-8")
+    monkeypatch.setenv("GITHUB_STEP_SUMMARY", str(summary))
+    collector = metrics.Metrics()
+    with collector.phase("msgs", "walk") as stats:
+        stats.files += 3
+    collector.write(tmp_path / "metrics.json")
+
+    (row,) = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert (row["validator"], row["phase"], row["files"]) == ("msgs", "walk", 3)
+    lines = summary.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "earlier step"
+    assert lines[3].startswith("| Validator | Phase | Wall, s | CPU, s | Files | Bytes |")
+    assert lines[5].startswith("| msgs | walk | ")
+
+
+def test_write_without_summary(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """write() only writes JSON outside GitHub Actions."""
+    monkeypatch.delenv("GITHUB_STEP_SUMMARY", raising=False)
+    metrics.Metrics().write(tmp_path / "metrics.json")
+    assert json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8")) == []
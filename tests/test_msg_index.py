@@ -0,0 +1,104 @@
+"""Tests for msg_index.py — parse-once index of .msg message IDs."""
+
+from pathlib import Path
+from typing import IO, Any
+
+import msg_index
+from msg_lexer import MsgProblem
+import pytest
+from scan_cache import ScanCache
+
+
+def test_read_msg_ids(fixtures_dir: Path) -> None:
+    """read_msg_ids returns message IDs in file order."""
+    assert msg_index.read_msg_ids(fixtures_dir / "sample.msg") == ["100", "101"]
+
+
+def test_read_msg_ids_missing(tmp_path: Path) -> None:
+    """read_msg_ids returns None when the file does not exist."""
+    assert msg_index.read_msg_ids(tmp_path / "nonexistent.msg") is None
+
+
+def test_msg_index_ids(fixtures_dir: Path) -> None:
+    """MsgIndex.ids returns the defined IDs as integers."""
+    index = msg_index.MsgIndex()
+    assert index.ids(fixtures_dir / "sample.msg") == frozenset({100, 101})
+    assert index.ids(fixtures_dir / "nonexistent.msg") is None
+
+
+def test_msg_index_missing(fixtures_dir: Path) -> None:
+    """MsgIndex.missing returns undefined IDs in input order, or None for a missing file."""
+    index = msg_index.MsgIndex()
+    assert index.missing(fixtures_dir / "sample.msg", ["102", "100", "999"]) == ["102", "999"]
+    assert index.missing(fixtures_dir / "nonexistent.msg", ["100"]) is None
+
+
+def test_msg_index_parses_once(fixtures_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """MsgIndex parses each .msg file at most once, including missing files."""
+    calls: list[Path] = []
+
+    def counting_open(msg_path: Path, mode: str = "r") -> IO[Any]:
+        calls.append(msg_path)
+        return open(msg_path, mode)  # noqa: SIM115
+
+    monkeypatch.setattr(msg_index, "open", counting_open, raising=False)
+    index = msg_index.MsgIndex()
+    for _ in range(3):
+        index.missing(fixtures_dir / "sample.msg", ["100"])
+        index.missing(fixtures_dir / "nonexistent.msg", ["100"])
+    assert calls == [fixtures_dir / "sample.msg", fixtures_dir / "nonexistent.msg"]
+
+
+def test_msg_dir_find(tmp_path: Path) -> None:
+    """MsgDir looks up .msg files ignoring case, preferring lowercase names."""
+    (tmp_path / "ACMYBOT.MSG").write_bytes(b"")
+    (tmp_path / "Generic.msg").write_bytes(b"")
+    (tmp_path / "generic.msg").write_bytes(b"")
+    (tmp_path / "notes.txt").write_bytes(b"")
+    msg_dir = msg_index.MsgDir(tmp_path)
+    assert msg_dir.find("acmybot.msg") == tmp_path / "ACMYBOT.MSG"
+    assert msg_dir.find("generic.msg") == tmp_path / "generic.msg"
+    assert msg_dir.find("notes.txt") is None
+    assert msg_dir.find("missing.msg") is None
+
+
+def test_msg_dir_missing_directory(tmp_path: Path) -> None:
+    """MsgDir of a missing directory finds nothing."""
+    assert msg_index.MsgDir(tmp_path / "missing").find("generic.msg") is None
+
+
+def test_missing_ranges(tmp_path: Path) -> None:
+    """missing_ranges returns the maximal sub-ranges a .msg file does not define."""
+    msg_path = tmp_path / "vcdoctor.msg"
+    msg_path.write_bytes(b"{100}{}{A}\n{101}{}{B}\n{105}{}{C}\n{200}{}{D}\n")
+    index = msg_index.MsgIndex()
+    assert index.missing_ranges(msg_path, [(150, 99999), (100, 101), (99, 107), (5, 3)]) == [
+        (99, 99),
+        (102, 104),
+        (106, 107),
+        (150, 199),
+        (201, 99999),
+    ]
+    assert index.missing_ranges(tmp_path / "missing.msg", [(100, 101)]) is None
+
+
+def test_merge_ranges() -> None:
+    """merge_ranges joins overlapping and adjacent ranges and drops reversed ones."""
+    assert msg_index.merge_ranges([(200, 210), (100, 105), (106, 110), (103, 104), (9, 1)]) == [(100, 110), (200, 210)]
+
+
+def test_msg_index_problems(tmp_path: Path) -> None:
+    """MsgIndex returns the problems of a .msg file, also from the cache."""
+    msg_path = tmp_path / "vcdoctor.msg"
+    msg_path.write_bytes(b"{100}{}{A}\n{100}{}{B}\n")
+    cache = ScanCache(tmp_path / "cache", "msg")
+    index = msg_index.MsgIndex(cache)
+    problem = MsgProblem(2, "duplicate message ID 100, first defined on line 1")
+    assert index.problems(msg_path) == [problem]
+    cache.save()
+
+    cached = msg_index.MsgIndex(ScanCache(tmp_path / "cache", "msg"))
+    assert cached.problems(msg_path) == [problem]
+    assert cached.ids(msg_path) == frozenset({100})
+    assert cached.cache.hits == 1
+    assert cached.problems(tmp_path / "missing.msg") == []
@@ -0,0 +1,88 @@
+"""Tests for msg_lexer.py — single-pass lexing of .msg entries."""
+
+from pathlib import Path
+
+import msg_lexer
+from msg_lexer import MsgProblem
+
+
+def test_tokenize() -> None:
+    """Entries are indexed by ID with their offsets and lines; comments and blank lines are skipped."""
+    data = b"# Doctor\n\n{100}{}{Hello.}\r\n{101}{snd}{Bye.}\n{99}  {}\t{Hi.}\n"
+    entries = msg_lexer.tokenize(data)
+    assert entries.ids.tolist() == [99, 100, 101]
+    assert entries.lines.tolist() == [5, 3, 4]
+    assert entries.offsets.tolist() == [data.index(b"{99}"), data.index(b"{100}"), data.index(b"{101}")]
+    assert entries.offset(101) == data.index(b"{101}")
+    assert entries.offset(102) is None
+    assert entries.problems == []
+
+
+def test_numbers_in_fields_are_not_ids() -> None:
+    """Numbers in braces inside the sound or text fields are not read as message IDs."""
+    entries = msg_lexer.tokenize(b"{100}{}{Say {200} twice}\n{101}{}{Fine.}\n")
+    assert entries.ids.tolist() == [101]
+    assert entries.problems == [MsgProblem(1, "unbalanced braces")]
+
+
+def test_duplicates() -> None:
+    """Repeated IDs are reported; the first entry counts."""
+    entries = msg_lexer.tokenize(b"{100}{}{A}\n{101}{}{B}\n{100}{}{C}\n")
+    assert entries.ids.tolist() == [100, 101]
+    assert entries.offset(100) == 0
+    assert entries.problems == [MsgProblem(3, "duplicate message ID 100, first defined on line 1")]
+
+
+def test_malformed_entries() -> None:
+    """Malformed entries are reported once each, and lexing resumes with the next entry."""
+    data = b"{100}{}{Two\nlines}\n{101}{}{Unclosed\n{102}{}\n# text\n{abc}{}{Not a number}\nstray } brace\n{103}{}{Last"
+    entries = msg_lexer.tokenize(data)
+    assert entries.ids.tolist() == [100]
+    assert entries.problems == [
+        MsgProblem(3, "unbalanced braces"),
+        MsgProblem(4, "expected {id}{sound}{text}, found 2 field(s)"),
+        MsgProblem(6, "message ID 'abc' is not a number"),
+        MsgProblem(7, "unmatched }"),
+        MsgProblem(8, "unbalanced braces"),
+    ]
+
+
+def test_multiline_fields() -> None:
+    """Fields running over several lines are valid, as the engine skips the newlines in them."""
+    data = b"{100}{}{First line\r\nsecond line}\n{101}{snd\n}{B}\n{102}{}{C}\n"
+    entries = msg_lexer.tokenize(data)
+    assert entries.ids.tolist() == [100, 101, 102]
+    assert entries.lines.tolist() == [1, 3, 5]
+    assert entries.problems == []
+    assert msg_lexer.scan_ids(data) == (frozenset([100, 101, 102]), [])
+
+
+def test_read_text(tmp_path: Path) -> None:
+    """Text is read back by offset and decoded from cp1252."""
+    msg_path = tmp_path / "vcdoctor.msg"
+    msg_path.write_bytes(b"{100}{}{Hello.}\n{101}{snd}{Caf\xe9}\n")
+    entries = msg_lexer.read_entries(msg_path)
+    assert entries is not None
+    assert msg_lexer.read_text(msg_path, entries.offset(101) or 0) == "Café"
+    assert msg_lexer.read_text(msg_path, 1) is None
+    assert msg_lexer.read_entries(tmp_path / "missing.msg") is None
+    assert msg_lexer.read_text(tmp_path / "missing.msg", 0) is None
+
+
+def test_scan_ids_matches_tokenize() -> None:
+    """scan_ids finds the same IDs and problems as tokenize, whether or not the file is well-formed."""
+    samples = [
+        b"",
+        b"# Doctor\n{100}{}{Hello.}\r\n{101}{snd}{Bye.}\n",
+        b"{100} {} {Spaced fields}\n",
+        b"{100}{}{Say {200} twice}\n{101}{}{Fine.}\n",
+        b"{100}{}{A}\n{100}{}{B}\n",
+        b"{100}{}{Two\nlines}\n{101}{}{B}\n",
+        b"{100}{}{Two\nlines}\n{100}{}{B}\n",
+        b"{100}{}{Two\nlines\n{101}{}{B}\n",
+        b"{100}{}{A}}\n",
+        b"{100}{}\n{101}{}{B}\n",
+    ]
+    for data in samples:
+        entries = msg_lexer.tokenize(data)
+        assert msg_lexer.scan_ids(data) == (frozenset(entries.ids), entries.problems)
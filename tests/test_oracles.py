@@ -0,0 +1,250 @@
+"""Differential tests of the validators' parsing against the frozen references in oracles.py.
+
+Inputs are generated from seeded random sources and lean on what parsers get wrong: long lines,
+nested and unbalanced comments, tabs and stray whitespace, CRLF and missing final newlines, and
+message IDs at the edges of the 3 to 5 digit range. Each test generates cases until its time
+budget, FALLOUT_ORACLE_SECONDS (default 1), runs out. A failure names the seed that reproduces it.
+"""
+
+from collections.abc import Callable, Iterator
+from contextlib import nullcontext
+import os
+from pathlib import Path
+import random
+import time
+
+import dialogs
+import lvars
+import oracles
+import pytest
+import scripts_lst
+import worldmap
+
+_BUDGET = float(os.environ.get("FALLOUT_ORACLE_SECONDS", "1"))
+# Cases each test runs however slow the machine
+_MIN_CASES = 20
+
+_MSG_FUNCS = (
+    "display_mstr",
+    "floater",
+    "dude_floater",
+    "Reply",
+    "GOption",
+    "GLowOption",
+    "NOption",
+    "NLowOption",
+    "BOption",
+    "BLowOption",
+    "GMessage",
+    "NMessage",
+    "BMessage",
+    "mstr",
+    "g_mstr",
+)
+_RANGE_FUNCS = ("floater_rand", "Reply_Rand")
+# Near misses: longer identifiers ending or starting like message functions
+_DECOY_FUNCS = ("my_floater", "dude_floater_rand", "xmstr", "Replyx", "NOption_", "display_msg", "Reply_rand")
+_IDS = ("0", "7", "99", "100", "0100", "999", "1000", "9999", "10000", "99999", "100000", "123456")
+_SPACES = ("", "", " ", "  ", "\t")
+_JOINERS = ("", " ", "; ", "_", "x")
+_COMMENTS = ("/*", "*/", "//", "/* /* */ */", "/**/", "/*/", "*/*", "/* display_mstr(100) */")
+_STRINGS = ('"', '"display_mstr(101)"', '""', "'", '"É"')
+_FILLER = ("if (x) then begin", "end", "   ", "ü", "(", ")", ",", "#define", "NAME", "SCRIPT_")
+
+# Chances of the generated variations
+_SECOND_ARG_CHANCE = 0.1  # A second message ID passed to a function that takes one
+_NAME_DEFINE_CHANCE = 0.3  # A NAME define rather than an LVAR one
+_CALL_CHANCE = 0.5  # A script line fragment that is a call; the rest are comments, strings or filler
+_COMMENT_CHANCE = 0.15
+_STRING_CHANCE = 0.1
+_DEFINE_LINE_CHANCE = 0.2
+_LONG_LINE_CHANCE = 0.05  # Hundreds of fragments on one line
+_NO_FINAL_NEWLINE_CHANCE = 0.2
+_BLANK_LST_LINE_CHANCE = 0.1  # A scripts.lst line without a script, e.g. a comment
+_WORLDMAP_COMMENT_CHANCE = 0.1  # A comment or blank line after an encounter entry
+_ALLOWED_SET_CHANCE = 0.3  # An allowed script set close to an encounter's scripts
+
+
+def _cases(seed_base: int) -> Iterator[tuple[int, random.Random]]:
+    """Yield seeds and random sources seeded with them until the time budget is spent."""
+    deadline = time.perf_counter() + _BUDGET
+    seed = seed_base
+    while seed - seed_base < _MIN_CASES or time.perf_counter() < deadline:
+        yield seed, random.Random(seed)
+        seed += 1
+
+
+def _call(rng: random.Random) -> str:
+    """Return a message function call, well formed or nearly so."""
+    func = rng.choice(_MSG_FUNCS + _RANGE_FUNCS + _DECOY_FUNCS)
+    args = rng.choice(_IDS)
+    if func in _RANGE_FUNCS or rng.random() < _SECOND_ARG_CHANCE:
+        args += f"{rng.choice(_SPACES)},{rng.choice(_SPACES)}{rng.choice(_IDS)}"
+    closer = rng.choice((")", ")", ",", " )", "", ";"))
+    return f"{func}{rng.choice(_SPACES)}({rng.choice(_SPACES)}{args}{rng.choice(_SPACES)}{closer}"
+
+
+def _define(rng: random.Random) -> str:
+    """Return an LVAR or NAME define, well formed or nearly so."""
+    space = rng.choice((" ", "\t", "  ", ""))
+    if rng.random() < _NAME_DEFINE_CHANCE:
+        return f"#define{space}NAME{rng.choice(_SPACES)}SCRIPT_{rng.choice(('ABC', 'X1_Y', 'lower', 'É'))}"
+    index = rng.choice(("0", "1", "9", "10", "099", "12345", "x"))
+    tail = rng.choice(("", " ", "  // c", "/* c */", "\t", " x", "//"))
+    return f"#define{space}LVAR_{rng.choice(('A', 'Var_1', ''))}{rng.choice(_SPACES)}({index}){tail}"
+
+
+def _fragment(rng: random.Random) -> str:
+    """Return a piece of script line."""
+    kind = rng.random()
+    if kind < _CALL_CHANCE:
+        return _call(rng)
+    if kind < _CALL_CHANCE + _COMMENT_CHANCE:
+        return rng.choice(_COMMENTS)
+    if kind < _CALL_CHANCE + _COMMENT_CHANCE + _STRING_CHANCE:
+        return rng.choice(_STRINGS)
+    return rng.choice(_FILLER)
+
+
+def _script(rng: random.Random) -> str:
+    """Return script text: ordinary, define and very long lines, with mixed line endings."""
+    lines: list[str] = []
+    for _ in range(rng.randint(0, 30)):
+        if rng.random() < _DEFINE_LINE_CHANCE:
+            line = _define(rng)
+        else:
+            count = rng.randint(200, 400) if rng.random() < _LONG_LINE_CHANCE else rng.randint(1, 8)
+            line = rng.choice(_SPACES) + "".join(_fragment(rng) + rng.choice(_JOINERS) for _ in range(count))
+        lines.append(line + rng.choice(("\n", "\n", "\n", "\r\n", " \n", "\r")))
+    text = "".join(lines)
+    return text.rstrip("\r\n") if rng.random() < _NO_FINAL_NEWLINE_CHANCE else text
+
+
+def _lst(rng: random.Random) -> str:
+    """Return scripts.lst text with comments, blank lines, odd casing and duplicate names."""
+    names = [rng.choice(("Test0", "test0", "ACKLINT", "zs00001", "a.b", "")) for _ in range(5)]
+    lines: list[str] = []
+    for _ in range(rng.randint(0, 40)):
+        kind = rng.random()
+        if kind < _BLANK_LST_LINE_CHANCE:
+            line = rng.choice(("", "   ", "# reserved", "; nothing", "\t"))
+        else:
+            space = rng.choice(_SPACES)
+            ext = rng.choice((".int", ".int", ".INT", ".ssl", "", ".int.int"))
+            lvar = rng.choice(("local_vars=3", "local_vars=0", "local_vars= 3", "local_vars=10", "", "lvars=2"))
+            line = f"{space}{rng.choice(names)}{ext}{space}; Description {rng.choice(_IDS)}{space}# {lvar}"
+        lines.append(line + rng.choice(("\n", "\r\n")))
+    return "".join(lines)
+
+
+def _scripts_h(rng: random.Random) -> str:
+    """Return scripts.h text with near-miss defines and duplicate names and numbers."""
+    lines: list[str] = []
+    for _ in range(rng.randint(0, 40)):
+        space = rng.choice((" ", "\t", "  ", ""))
+        name = rng.choice(("ACKLINT", "Test_0", "ZS1", ""))
+        tail = rng.choice(("    // acklint.int ; Desc", "", " ", "\t//"))
+        lines.append(f"#define{space}SCRIPT_{name}{space}({rng.choice(_IDS)}){tail}" + rng.choice(("\n", "\r\n")))
+    return "".join(lines)
+
+
+def _worldmap(rng: random.Random) -> tuple[str, list[list[int]]]:
+    """Return worldmap.txt text with repeated keys, and allowed script sets, some matching its encounters."""
+    allowed: list[list[int]] = []
+    lines = ["; Synthetic worldmap", ""]
+    for section in range(rng.randint(0, 15)):
+        prefix = rng.choice(("Encounter: ", "Encounter: ", "Encounter:", "Data ", "encounter: "))
+        lines.append(f"[{prefix}E{section}]")
+        scripts: set[int] = set()
+        for critter in range(rng.randint(0, 6)):
+            script = rng.randint(1, 6)
+            dead = rng.choice(("", "", "Dead, ", "Dead,", " Dead, ", "Dead "))
+            script_text = rng.choice((f"Script:{script}", f"Script:{script}", f"Script: {script}", f"script:{script}"))
+            space = rng.choice(_SPACES)
+            key = rng.choice((f"type_{critter:02d}", f"type_{critter:02d}", "type_00", "TYPE_00"))
+            lines.append(f"{key}{space}={space}{dead}Ratio:50%, pid:16777216, {script_text}")
+            if rng.random() < _WORLDMAP_COMMENT_CHANCE:
+                lines.append(rng.choice(("; comment", "# comment", "")))
+            scripts.add(script)
+        if scripts and rng.random() < _ALLOWED_SET_CHANCE:
+            # The encounter's scripts, one more or one fewer
+            variant = rng.choice(("same", "more", "fewer"))
+            if variant == "more":
+                scripts.add(rng.randint(1, 9))
+            elif variant == "fewer":
+                scripts.pop()
+            if scripts:
+                allowed.append(sorted(scripts))
+    text = rng.choice(("\n", "\r\n")).join(lines) + rng.choice(("\n", ""))
+    return text, allowed
+
+
+def _check[T](seed: int, expected: T, actual: T) -> None:
+    """Assert a case's results match, naming the seed that reproduces it."""
+    assert actual == expected, f"differs from the reference for seed {seed}"
+
+
+@pytest.mark.parametrize(
+    "line_func",
+    [dialogs.get_script_messages, dialogs.get_gen_messages],
+    ids=["script", "gen"],
+)
+def test_scan_line(line_func: Callable[[str], list[str]]) -> None:
+    """Messages found in a line of code match the reference patterns."""
+    for seed, rng in _cases(0):
+        line = "".join(_fragment(rng) + rng.choice(_JOINERS) for _ in range(rng.randint(1, 12)))
+        messages, gen_messages, ranges = oracles.line_messages(line)
+        if line_func is dialogs.get_gen_messages:
+            _check(seed, gen_messages, line_func(line))
+        else:
+            expected = messages + dialogs.expand_ranges(ranges)
+            _check(seed, expected, line_func(line))
+
+
+def test_scan_script() -> None:
+    """Messages, NAME and ranges found in a whole script match the references."""
+    for seed, rng in _cases(100_000):
+        text = _script(rng)
+        actual = dialogs.scan_script(text.encode("utf-8"))
+        _check(seed, oracles.script_messages(text), actual)
+
+
+def test_get_max_lvar(tmp_path: Path) -> None:
+    """LVARs counted in a script file match the reference."""
+    script_path = tmp_path / "test.ssl"
+    for seed, rng in _cases(200_000):
+        text = _script(rng)
+        script_path.write_bytes(text.encode("utf-8"))
+        _check(seed, oracles.max_lvar(text), lvars.get_max_lvar(script_path))
+
+
+def test_scripts_lst(tmp_path: Path) -> None:
+    """Script names and LVAR allocations read from scripts.lst match the references."""
+    lst_path = tmp_path / "scripts.lst"
+    for seed, rng in _cases(300_000):
+        lst_path.write_bytes(_lst(rng).encode("utf-8"))
+        _check(seed, oracles.parse_lst(lst_path), scripts_lst.parse_lst(lst_path))
+        _check(seed, oracles.lvars_map(lst_path), lvars.get_lvars_map(lst_path))
+
+
+def test_scripts_h(tmp_path: Path) -> None:
+    """Script defines read from scripts.h match the reference."""
+    h_path = tmp_path / "scripts.h"
+    for seed, rng in _cases(400_000):
+        h_path.write_bytes(_scripts_h(rng).encode("utf-8"))
+        _check(seed, oracles.parse_h(h_path), scripts_lst.parse_h(h_path))
+
+
+def test_worldmap(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Encounters reported for worldmap.txt match the reference walk."""
+    worldmap_path = tmp_path / "worldmap.txt"
+    for seed, rng in _cases(500_000):
+        text, allowed = _worldmap(rng)
+        worldmap_path.write_bytes(text.encode("utf-8"))
+        argv = [str(worldmap_path)]
+        if allowed:
+            argv += ["-s", *(",".join(map(str, script_set)) for script_set in allowed)]
+        expected = oracles.worldmap_report(worldmap_path, allowed)
+        with pytest.raises(SystemExit) if expected else nullcontext():
+            worldmap.main(argv)
+        _check(seed, expected, capsys.readouterr().out)
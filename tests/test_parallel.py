@@ -0,0 +1,37 @@
+"""Tests for parallel.py — cached, optionally parallel per-file extraction."""
+
+import os
+from pathlib import Path
+from threading import Thread
+
+from parallel import extract_paths, map_paths
+from scan_cache import MemoryCache, content_hash
+
+
+def _size_or_none(path: Path) -> tuple[int | None, str]:
+    data = path.read_bytes()
+    return len(data) or None, content_hash(data)
+
+
+def test_extract_paths_keeps_every_result(tmp_path: Path) -> None:
+    """extract_paths returns one result per file in input order, None results included."""
+    paths = [tmp_path / "a.ssl", tmp_path / "empty.ssl", tmp_path / "b.ssl"]
+    for path, text in zip(paths, ("aa", "", "b"), strict=True):
+        path.write_text(text, encoding="utf-8")
+    assert extract_paths(_size_or_none, paths) == [2, None, 1]
+    cache = MemoryCache("test", 10)
+    assert extract_paths(_size_or_none, paths, cache=cache) == [2, None, 1]
+    assert extract_paths(_size_or_none, paths, cache=cache) == [2, None, 1]
+
+
+def test_map_paths_pool_beside_threads(tmp_path: Path) -> None:
+    """map_paths starts its pool safely while other threads run, keeping the input order."""
+    paths = [tmp_path / f"{i}.ssl" for i in range(100)]
+    for i, path in enumerate(paths):
+        path.write_bytes(b"x" * i)
+    busy = Thread(target=sum, args=(range(10**7),))
+    busy.start()
+    try:
+        assert map_paths(os.path.getsize, paths, jobs=2) == list(range(100))
+    finally:
+        busy.join()
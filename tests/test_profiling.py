@@ -0,0 +1,54 @@
+"""Tests for profiling.py — cProfile output as pstats and collapsed stacks."""
+
+import cProfile
+from pathlib import Path
+import pstats
+
+import profiling
+
+
+def _leaf(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+def _branch(n: int) -> int:
+    return _leaf(n) + _leaf(n // 2)
+
+
+def _recursive(depth: int) -> int:
+    return _leaf(1000) if depth == 0 else _recursive(depth - 1)
+
+
+def test_collapse_stats() -> None:
+    """Collapsed stacks follow the call graph from the roots and cut recursion."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    _branch(20000)
+    _recursive(3)
+    profiler.disable()
+    collapsed = profiling.collapse_stats(pstats.Stats(profiler))
+
+    names = [[frame.split(" (")[0] for frame in stack.split(";")] for stack in collapsed]
+    assert ["_branch", "_leaf", "<built-in method builtins.sum>", "<genexpr>"] in names
+    # The recursion has no recorded outside caller, yet makes a root, and is cut at its repeat
+    assert ["_recursive", "_leaf"] in names
+    assert not any(stack.count("_recursive") > 1 for stack in names)
+    assert all(microseconds > 0 for microseconds in collapsed.values())
+
+
+def test_frame_label() -> None:
+    """Frames name the function and its file's base name; built-ins keep their own name."""
+    assert profiling.frame_label(("/src/scripts/includes.py", 86, "scan_file")) == "scan_file (includes.py:86)"
+    assert profiling.frame_label(("~", 0, "<built-in method builtins.sum>")) == "<built-in method builtins.sum>"
+
+
+def test_profiled(tmp_path: Path) -> None:
+    """profiled() writes both files with a directory and nothing without one."""
+    with profiling.profiled(None, "lvars"):
+        _leaf(100)
+    with profiling.profiled(tmp_path / "profile", "lvars"):
+        _branch(5000)
+    assert sorted(path.name for path in (tmp_path / "profile").iterdir()) == ["lvars.collapsed", "lvars.pstats"]
+    assert pstats.Stats(str(tmp_path / "profile" / "lvars.pstats")).total_calls > 0  # type: ignore[attr-defined]
+    line = (tmp_path / "profile" / "lvars.collapsed").read_text(encoding="utf-8").splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit()
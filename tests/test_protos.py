@@ -0,0 +1,69 @@
+"""Tests for protos.py — the Pid index of proto lists and .pro headers."""
+
+from pathlib import Path
+import struct
+
+from protos import ProtoIndex, make_pid, read_pro_pid, read_proto_list
+from scan_cache import ScanCache
+
+
+def _write_protos(proto_dir: Path) -> None:
+    """Write two critter protos, one with a wrong header, and a truncated item proto."""
+    critters = proto_dir / "critters"
+    critters.mkdir(parents=True)
+    (critters / "critters.lst").write_bytes(b"00000001.pro\r\n\r\n00000003.PRO ; guard\r\n")
+    (critters / "00000001.pro").write_bytes(struct.pack(">iii", make_pid(1, 1), 100, 0))
+    (critters / "00000003.pro").write_bytes(struct.pack(">iii", make_pid(1, 2), 300, 0))
+    items = proto_dir / "items"
+    items.mkdir()
+    (items / "items.lst").write_bytes(b"00000001.pro\n")
+    (items / "00000001.pro").write_bytes(b"\x00\x00")
+
+
+def test_read_proto_list(tmp_path: Path) -> None:
+    """read_proto_list() returns lower-case .pro names by line, with blank lines kept as ""."""
+    _write_protos(tmp_path)
+    assert read_proto_list(tmp_path / "critters" / "critters.lst") == ["00000001.pro", "", "00000003.pro"]
+
+
+def test_read_pro_pid(tmp_path: Path) -> None:
+    """read_pro_pid() reads the big-endian Pid at the start of a .pro file, or None if it is too short."""
+    _write_protos(tmp_path)
+    expected_pid = 16777217  # Critter 1: type 1 in the top byte, line 1 below it
+    assert read_pro_pid(tmp_path / "critters" / "00000001.pro") == expected_pid
+    assert read_pro_pid(tmp_path / "items" / "00000001.pro") is None
+
+
+def test_problem(tmp_path: Path) -> None:
+    """ProtoIndex reports unlisted Pids and mismatched or truncated headers, and skips types without a list."""
+    _write_protos(tmp_path)
+    index = ProtoIndex.load(tmp_path)
+    expected_listed = 3  # Two critters, as the blank line of critters.lst lists none, and the item
+    assert len(index) == expected_listed
+    assert index.problem(make_pid(1, 1)) is None
+    assert index.problem(make_pid(1, 2)) == "is not in critters.lst (line 2)"
+    assert index.problem(make_pid(1, 3)) == "has proto file critters/00000003.pro with Pid 16777218 in its header"
+    assert index.problem(make_pid(0, 1)) == "has a truncated proto file items/00000001.pro"
+    assert index.problem(make_pid(2, 1)) is None
+
+
+def test_missing_pro_file(tmp_path: Path) -> None:
+    """A listed proto whose .pro file the mod does not ship is fine."""
+    _write_protos(tmp_path)
+    (tmp_path / "critters" / "00000001.pro").unlink()
+    assert ProtoIndex.load(tmp_path).problem(make_pid(1, 1)) is None
+
+
+def test_cache(tmp_path: Path) -> None:
+    """A second load reads lists and headers from the cache, with the same result."""
+    proto_dir = tmp_path / "proto"
+    _write_protos(proto_dir)
+    first_cache = ScanCache(tmp_path / "cache", "protos")
+    first = ProtoIndex.load(proto_dir, first_cache)
+    first_cache.save()
+    cache = ScanCache(tmp_path / "cache", "protos")
+    second = ProtoIndex.load(proto_dir, cache)
+    assert (cache.hits, cache.misses) == (5, 0)
+    assert [second.problem(make_pid(1, line)) for line in (1, 2, 3)] == [
+        first.problem(make_pid(1, line)) for line in (1, 2, 3)
+    ]
@@ -0,0 +1,120 @@
+"""Tests for scan_cache.py — persistent per-file extraction cache."""
+
+import json
+import os
+from pathlib import Path
+
+from scan_cache import CACHE_VERSION, MemoryCache, ScanCache, content_hash, file_hash
+
+
+def test_cache_roundtrip(tmp_path: Path) -> None:
+    """Facts stored and saved by one cache are returned by the next."""
+    source = tmp_path / "a.ssl"
+    source.write_text("x\n", encoding="utf-8")
+    cache = ScanCache(tmp_path / "cache", "lvars")
+    assert cache.get(source) is None
+    cache.put(source, ["100", "101"])
+    cache.save()
+
+    warm = ScanCache(tmp_path / "cache", "lvars")
+    assert warm.get(source) == ["100", "101"]
+    assert (warm.hits, warm.misses) == (1, 0)
+
+
+def test_cache_content_hash_fallback(tmp_path: Path) -> None:
+    """An entry stays fresh when only the mtime changed, and goes stale when the content changed."""
+    source = tmp_path / "a.ssl"
+    source.write_text("abc\n", encoding="utf-8")
+    cache = ScanCache(tmp_path / "cache", "lvars")
+    cache.put(source, 1)
+    cache.save()
+
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert ScanCache(tmp_path / "cache", "lvars").get(source) == 1
+
+    source.write_text("abd\n", encoding="utf-8")
+    assert ScanCache(tmp_path / "cache", "lvars").get(source) is None
+
+
+def test_cache_put_digest(tmp_path: Path) -> None:
+    """put() stores the digest of contents already read, and entries stay fresh by it."""
+    source = tmp_path / "a.ssl"
+    source.write_text("abc\n", encoding="utf-8")
+    cache = ScanCache(tmp_path / "cache", "lvars")
+    cache.put(source, 1, digest=content_hash(b"abc\n"))
+    cache.save()
+
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert content_hash(b"abc\n") == file_hash(source)
+    assert ScanCache(tmp_path / "cache", "lvars").get(source) == 1
+
+
+def test_cache_evicts_unused(tmp_path: Path) -> None:
+    """Entries that are not looked up during a run are dropped when the cache is saved."""
+    kept = tmp_path / "kept.ssl"
+    gone = tmp_path / "gone.ssl"
+    kept.write_text("a\n", encoding="utf-8")
+    gone.write_text("b\n", encoding="utf-8")
+    cache = ScanCache(tmp_path / "cache", "lvars")
+    cache.put(kept, 1)
+    cache.put(gone, 2)
+    cache.save()
+
+    gone.unlink()
+    cache = ScanCache(tmp_path / "cache", "lvars")
+    assert cache.get(kept) == 1
+    assert cache.get(gone) is None
+    cache.save()
+    data = json.loads((tmp_path / "cache" / "lvars.json").read_text(encoding="utf-8"))
+    assert list(data["entries"]) == [str(kept)]
+
+
+def test_cache_version_mismatch(tmp_path: Path) -> None:
+    """A namespace file from another cache version is discarded."""
+    source = tmp_path / "a.ssl"
+    source.write_text("x\n", encoding="utf-8")
+    cache = ScanCache(tmp_path / "cache", "lvars")
+    cache.put(source, 3)
+    cache.save()
+    cache_file = tmp_path / "cache" / "lvars.json"
+    data = json.loads(cache_file.read_text(encoding="utf-8"))
+    data["version"] = CACHE_VERSION + 1
+    cache_file.write_text(json.dumps(data), encoding="utf-8")
+
+    assert ScanCache(tmp_path / "cache", "lvars").get(source) is None
+
+
+def test_cache_disabled(tmp_path: Path) -> None:
+    """A cache without a directory never hits and writes nothing."""
+    source = tmp_path / "a.ssl"
+    source.write_text("x\n", encoding="utf-8")
+    cache = ScanCache(None, "lvars")
+    cache.put(source, 3)
+    cache.save()
+    assert cache.get(source) is None
+    assert list(tmp_path.iterdir()) == [source]
+
+
+def test_memory_cache_lru(tmp_path: Path) -> None:
+    """A memory cache drops the least recently used entry beyond its size and stale entries."""
+    paths = [tmp_path / f"{name}.ssl" for name in "abc"]
+    for path in paths:
+        path.write_text("x\n", encoding="utf-8")
+    max_entries = 2
+    cache = MemoryCache("engine", max_entries)
+    cache.put(paths[0], (1,))
+    cache.put(paths[1], (2,))
+    assert cache.get(paths[0]) == (1,)
+    cache.put(paths[2], (3,))
+    assert cache.size == max_entries
+    assert cache.get(paths[1]) is None
+    assert cache.get(paths[2]) == (3,)
+
+    paths[0].write_text("longer\n", encoding="utf-8")
+    assert cache.get(paths[0]) is None
+    paths[2].unlink()
+    assert cache.get(paths[2]) is None
+    cache.save()
+    assert not list(tmp_path.glob("*.json"))
@@ -0,0 +1,213 @@
+"""Tests for scan_engine.py — single-pass runs of all enabled validators."""
+
+from collections import Counter
+import json
+from pathlib import Path
+from typing import IO, Any
+
+import dialogs
+import includes
+import lvars
+import pytest
+import scan_cache
+import scan_engine
+import worldmap
+
+
+def test_scan_code_runs_each_validator() -> None:
+    """scan_code extracts the facts of every requested validator from the same code."""
+    code = b"#define LVAR_Status   (2) \n   display_mstr(100)\n"
+    facts = scan_engine.scan_code(code, ("dialogs", "lvars"))
+    assert facts == {"dialogs": dialogs.scan_code(code), "lvars": lvars.get_lvar_index(code)}
+
+
+def test_run_matches_validators(capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig) -> None:
+    """run() reports the same problems as running the validators one after another."""
+    config = mod_tree
+    with pytest.raises(SystemExit):
+        lvars.main([str(config.scripts_dir), str(config.scripts_lst)])
+    with pytest.raises(SystemExit):
+        dialogs.main([str(config.dialog_dir), str(config.scripts_dir)])
+    expected = capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        scan_engine.run(config._replace(check_scripts=False, check_lvars=False))
+    with pytest.raises(SystemExit):
+        scan_engine.run(config._replace(check_scripts=False, check_msgs=False))
+    engine_output = capsys.readouterr().out
+    engine_lines = [line for line in engine_output.splitlines() if not line.startswith("Failed checks:")]
+    assert sorted(engine_lines) == sorted(expected.splitlines())
+    assert "vcdoctor max LVAR index is 3" in engine_output
+    assert "missing from" in engine_output
+
+
+def test_run_reads_each_file_once(monkeypatch: pytest.MonkeyPatch, mod_tree: scan_engine.ScanConfig) -> None:
+    """run() reads every script and header once, however many validators use them."""
+    config = mod_tree
+    (config.dialog_dir / "vcdoctor.msg").write_bytes(b"{100}{}{Hello.}\n{101}{}{Bye.}\n{150}{}{Hi.}\n")
+    (config.dialog_dir / "vcmerch.msg").write_bytes(b"{100}{}{Wares.}\n{150}{}{Hi.}\n")
+    config.scripts_lst.write_text("vcdoctor.int ; local_vars=4\nvcmerch.int ; local_vars=4\n", encoding="utf-8")
+    reads: Counter[str] = Counter()
+
+    def counting_open(file_path: str | Path, mode: str = "r") -> IO[Any]:
+        reads[Path(file_path).name] += 1
+        return open(file_path, mode)  # noqa: SIM115
+
+    monkeypatch.setattr(includes, "open", counting_open, raising=False)
+    scan_engine.run(config._replace(check_scripts=False))
+    assert reads == {"vcdoctor.ssl": 1, "vcmerch.ssl": 1, "common.h": 1}
+
+
+def test_run_cache_dir_reads_each_file_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mod_tree: scan_engine.ScanConfig
+) -> None:
+    """run() with a cache directory caches what it extracted without reading the scripts again."""
+    config = mod_tree._replace(check_scripts=False, check_msgs=False, cache_dir=str(tmp_path / "cache"))
+    config.scripts_lst.write_text("vcdoctor.int ; local_vars=4\nvcmerch.int ; local_vars=4\n", encoding="utf-8")
+    hashed: list[str] = []
+    file_hash = scan_cache.file_hash
+
+    def counting_hash(file_path: str | Path) -> str:
+        hashed.append(Path(file_path).name)
+        return file_hash(file_path)
+
+    monkeypatch.setattr(scan_cache, "file_hash", counting_hash)
+    scan_engine.run(config)
+    assert hashed == []
+
+
+def test_run_reports_all_failed_validators(
+    capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig
+) -> None:
+    """run() runs every check despite earlier failures and reports them in validator order."""
+    config = mod_tree
+    config.scripts_lst.write_text("vcdoctor.int\nvcdoctor.int\n", encoding="utf-8")
+    with pytest.raises(SystemExit) as exc_info:
+        scan_engine.run(config)
+    assert exc_info.value.code == 1
+    output = capsys.readouterr().out
+    dupe = output.index("Dupe: VCDOCTOR is defined on lines 1, 2 in scripts.lst")
+    assert dupe < output.index("missing from") < output.index("Messages checked")
+    assert output.endswith("Failed checks: scripts, msgs\n")
+
+
+def test_run_missing_scripts_lst(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig
+) -> None:
+    """run() exits with an error when a required input does not exist."""
+    config = mod_tree._replace(scripts_lst=tmp_path / "missing.lst")
+    with pytest.raises(SystemExit):
+        scan_engine.run(config)
+    assert "missing.lst does not exist." in capsys.readouterr().out
+
+
+def test_run_worldmap(tmp_path: Path, capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig) -> None:
+    """run() checks worldmap encounters with names and descriptions from the shared inputs."""
+    config = mod_tree
+    wmap = tmp_path / "worldmap.txt"
+    wmap.write_text("[Encounter: E01]\ntype_00=Script:1\ntype_01=Script:2\n", encoding="utf-8")
+    config = config._replace(check_scripts=False, check_lvars=False, check_msgs=False, worldmap_path=wmap)
+    with pytest.raises(SystemExit):
+        scan_engine.run(config)
+    output = capsys.readouterr().out
+    assert '2 = SCRIPT_VCMERCH = "vc merchant"' in output
+
+    scan_engine.run(config._replace(allowed_sets=worldmap.get_allowed_script_sets([["1,2"]])))
+
+
+def test_run_worldmap_protos(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig
+) -> None:
+    """run() checks encounter Pids against the proto lists when proto_dir is set."""
+    config = mod_tree
+    critters = tmp_path / "proto" / "critters"
+    critters.mkdir(parents=True)
+    (critters / "critters.lst").write_text("00000001.pro\n", encoding="utf-8")
+    wmap = tmp_path / "worldmap.txt"
+    wmap.write_text("[Encounter: E01]\ntype_00=Pid:16777217, Script:1\ntype_01=Pid:16777219\n", encoding="utf-8")
+    config = config._replace(
+        check_scripts=False, check_lvars=False, check_msgs=False, worldmap_path=wmap, proto_dir=tmp_path / "proto"
+    )
+    with pytest.raises(SystemExit):
+        scan_engine.run(config)
+    assert "type_01: Pid 16777219 is not in critters.lst (line 3)" in capsys.readouterr().out
+
+
+def test_run_metrics(tmp_path: Path, mod_tree: scan_engine.ScanConfig) -> None:
+    """run() writes the phases of the shared pass and of every check as JSON."""
+    config = mod_tree
+    (config.dialog_dir / "vcdoctor.msg").write_bytes(b"{100}{}{Hello.}\n{101}{}{Bye.}\n{150}{}{Hi.}\n")
+    (config.dialog_dir / "vcmerch.msg").write_bytes(b"{100}{}{Wares.}\n{150}{}{Hi.}\n")
+    config.scripts_lst.write_text("vcdoctor.int ; local_vars=4\nvcmerch.int ; local_vars=4\n", encoding="utf-8")
+    metrics_path = tmp_path / "metrics.json"
+    scan_engine.run(config._replace(metrics_path=str(metrics_path)))
+    rows = {(row["validator"], row["phase"]): row for row in json.loads(metrics_path.read_text(encoding="utf-8"))}
+    assert set(rows) == {
+        ("engine", "extract"),
+        ("engine", "walk"),
+        ("scripts", "check"),
+        ("lvars", "check"),
+        ("msgs", "check"),
+    }
+    script_count = 2
+    extracted_count = 4  # The scripts, scripts.h and scripts.lst
+    assert rows["engine", "walk"]["files"] == script_count
+    assert rows["engine", "extract"]["files"] == extracted_count
+
+
+def test_run_profile(tmp_path: Path, capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig) -> None:
+    """run() writes a profile of the extraction and of each check, with the same output as unprofiled."""
+    config = mod_tree
+    with pytest.raises(SystemExit):
+        scan_engine.run(config)
+    expected = capsys.readouterr().out
+
+    profile_dir = tmp_path / "profile"
+    with pytest.raises(SystemExit):
+        scan_engine.run(config._replace(profile_dir=str(profile_dir)))
+    assert capsys.readouterr().out == expected
+    assert sorted(path.stem for path in profile_dir.glob("*.pstats")) == ["engine", "lvars", "msgs", "scripts"]
+    assert sorted(path.stem for path in profile_dir.glob("*.collapsed")) == ["engine", "lvars", "msgs", "scripts"]
+
+
+def test_run_skips_unchanged(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig
+) -> None:
+    """With a cache directory, checks that passed on the same inputs before are skipped."""
+    config = mod_tree
+    (config.dialog_dir / "vcdoctor.msg").write_bytes(b"{100}{}{Hello.}\n{101}{}{Bye.}\n{150}{}{Hi.}\n")
+    (config.dialog_dir / "vcmerch.msg").write_bytes(b"{100}{}{Wares.}\n{150}{}{Hi.}\n")
+    config.scripts_lst.write_text("vcdoctor.int ; local_vars=4\nvcmerch.int ; local_vars=4\n", encoding="utf-8")
+    config = config._replace(cache_dir=str(tmp_path / "cache"))
+    scan_engine.run(config)
+    assert "skipped" not in capsys.readouterr().out
+
+    scan_engine.run(config)
+    output = capsys.readouterr().out.splitlines()
+    assert output == [f"{name}: skipped, inputs unchanged" for name in ("scripts", "lvars", "msgs")]
+
+    (config.scripts_dir / "headers" / "common.h").write_text("#define LVAR_Shared   (4)\n", encoding="utf-8")
+    with pytest.raises(SystemExit):
+        scan_engine.run(config)
+    output = capsys.readouterr().out
+    assert output.startswith("scripts: skipped, inputs unchanged\n")
+    assert "vcmerch max LVAR index is 4" in output
+    assert "msgs: skipped" not in output
+
+
+def test_run_sees_created_headers(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig
+) -> None:
+    """A check skipped for unchanged inputs runs again once a header it includes but lacked is created."""
+    config = mod_tree._replace(check_scripts=False, check_msgs=False, cache_dir=str(tmp_path / "cache"))
+    config.scripts_lst.write_text("vcdoctor.int ; local_vars=4\nvcmerch.int ; local_vars=4\n", encoding="utf-8")
+    (config.scripts_dir / "vcmerch.ssl").write_text('#include "../lib/extra.h"\n', encoding="utf-8")
+    scan_engine.run(config)
+    scan_engine.run(config)
+    assert capsys.readouterr().out.endswith("lvars: skipped, inputs unchanged\n")
+
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "extra.h").write_text("#define LVAR_Extra   (4)\n", encoding="utf-8")
+    with pytest.raises(SystemExit):
+        scan_engine.run(config)
+    assert "vcmerch max LVAR index is 4" in capsys.readouterr().out
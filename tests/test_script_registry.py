@@ -0,0 +1,55 @@
+"""Tests for script_registry.py — parse-once model of scripts.h and scripts.lst."""
+
+from pathlib import Path
+
+import pytest
+from script_registry import ScriptRegistry
+
+_SCRIPTS_H = [
+    "#define SCRIPT_VCDOCTOR    (1)    // doctor\n",
+    "#define SCRIPT_VCMERCH     (2)    // merchant\n",
+    "#define OTHER_SYMBOL       (7)\n",
+    "   #define SCRIPT_INDENTED  (3)\n",
+]
+_SCRIPTS_LST = [
+    "vcdoctor.int    ; vc doctor          # local_vars=3\n",
+    "vcmerch.int     ; vc merchant\n",
+    "RESERVED\n",
+    "VCDoctor.int    ; again              # local_vars=9\n",
+    "\n",
+]
+
+
+def test_scripts_h_views() -> None:
+    """scripts.h views keep strict SCRIPT_ defines for scripts.lst checks and every define for names."""
+    registry = ScriptRegistry(_SCRIPTS_H, [])
+    assert registry.h_by_num() == {1: "VCDOCTOR", 2: "VCMERCH"}
+    assert registry.h_by_name() == {"VCDOCTOR": 1, "VCMERCH": 2}
+    assert registry.symbols() == {1: "SCRIPT_VCDOCTOR", 2: "SCRIPT_VCMERCH", 7: "OTHER_SYMBOL", 3: "SCRIPT_INDENTED"}
+
+
+def test_scripts_lst_views() -> None:
+    """scripts.lst views hold names, local_vars and descriptions by line."""
+    registry = ScriptRegistry([], _SCRIPTS_LST)
+    assert registry.lst_by_num() == {1: "VCDOCTOR", 2: "VCMERCH", 3: "RESERVED", 4: "VCDOCTOR", 5: ""}
+    assert registry.lvars_by_name() == {"vcdoctor": 3}
+    assert registry.descriptions_by_num() == {1: "vc doctor", 2: "vc merchant", 4: "again"}
+
+
+def test_inverted_index() -> None:
+    """The name to lines index serves lookups and duplicates without rescanning."""
+    registry = ScriptRegistry([], _SCRIPTS_LST)
+    assert registry.lines_of("VCDOCTOR") == [1, 4]
+    assert registry.lines_of("MISSING") == []
+    assert registry.duplicates() == {"VCDOCTOR": [1, 4]}
+
+
+def test_load(tmp_path: Path) -> None:
+    """load() reads the given files and leaves out the ones passed as None."""
+    scripts_lst = tmp_path / "scripts.lst"
+    scripts_lst.write_bytes(b"vcdoctor.int ; caf\xe9\n")
+    registry = ScriptRegistry.load(None, scripts_lst)
+    assert registry.h_by_num() == {}
+    assert registry.descriptions_by_num() == {1: "caf�"}
+    with pytest.raises(OSError):
+        ScriptRegistry.load(tmp_path / "missing.h", None)
@@ -0,0 +1,46 @@
+"""Tests for script_sets.py — allowed worldmap script combinations and their index."""
+
+from pathlib import Path
+
+import pytest
+from script_sets import ScriptSetIndex, parse_script_set, read_script_sets
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("101,100", [100, 101]),
+        (" 200 201\t202 ", [200, 201, 202]),
+        ("300, 301 # caravan", [300, 301]),
+        ("; reserved", None),
+        ("", None),
+    ],
+)
+def test_parse_script_set(text: str, expected: list[int] | None) -> None:
+    """parse_script_set() accepts commas and whitespace, and skips comments and blank text."""
+    assert parse_script_set(text) == expected
+
+
+def test_read_script_sets(tmp_path: Path) -> None:
+    """read_script_sets() reads one set per line, skipping comment lines."""
+    sets_file = tmp_path / "script_sets.txt"
+    sets_file.write_text("# Allowed together\n100,101\n\n202 200 201 ; caravan\n", encoding="utf-8")
+    assert read_script_sets(sets_file) == [[100, 101], [200, 201, 202]]
+
+
+def test_index_subsets() -> None:
+    """ScriptSetIndex allows exact sets and their subsets, and nothing spanning two sets."""
+    index = ScriptSetIndex([[100, 101], [200, 201, 202], [100, 101]])
+    expected_set_count = 2  # The repeated set counts once
+    assert len(index) == expected_set_count
+    assert index.allows([101, 100])
+    assert index.allows([200, 202])
+    assert index.allows([201])
+    assert not index.allows([100, 200])
+    assert not index.allows([200, 201, 202, 203])
+    assert not index.allows([999])
+
+
+def test_index_empty() -> None:
+    """An empty ScriptSetIndex allows no combination."""
+    assert not ScriptSetIndex([]).allows([100, 101])
@@ -3,6 +3,7 @@
 from pathlib import Path
 
 import pytest
+from script_registry import ScriptRegistry
 import scripts_lst
 
 
@@ -21,24 +22,24 @@ def test_parse_lst(fixtures_dir: Path) -> None:
 
 def test_check_lst_dupes_no_dupes(fixtures_dir: Path) -> None:
     """check_lst_dupes returns False when no duplicates are present."""
-    lst_by_num = scripts_lst.parse_lst(fixtures_dir / "scripts.lst")
-    assert scripts_lst.check_lst_dupes(lst_by_num) is False
+    registry = ScriptRegistry.load(None, fixtures_dir / "scripts.lst")
+    assert scripts_lst.check_lst_dupes(registry) is False
 
 
 def test_check_lst_dupes(tmp_path: Path) -> None:
     """check_lst_dupes detects duplicate script names."""
     lst_file = tmp_path / "scripts.lst"
     lst_file.write_text("vcdoctor.int\nvcmerch.int\nvcdoctor.int\n", encoding="utf-8")
-    lst_by_num = scripts_lst.parse_lst(lst_file)
-    assert scripts_lst.check_lst_dupes(lst_by_num) is True
+    registry = ScriptRegistry.load(None, lst_file)
+    assert scripts_lst.check_lst_dupes(registry) is True
 
 
 def test_check_lst_dupes_reserved(tmp_path: Path) -> None:
     """RESERVED entries are not flagged as duplicates even when repeated."""
     lst_file = tmp_path / "scripts.lst"
     lst_file.write_text("RESERVED\nvcmerch.int\nRESERVED\n", encoding="utf-8")
-    lst_by_num = scripts_lst.parse_lst(lst_file)
-    assert scripts_lst.check_lst_dupes(lst_by_num) is False
+    registry = ScriptRegistry.load(None, lst_file)
+    assert scripts_lst.check_lst_dupes(registry) is False
 
 
 def test_last_line_checked(tmp_path: Path) -> None:
@@ -0,0 +1,29 @@
+"""Tests for ssl_lexer.py — comment- and string-aware .ssl lexer."""
+
+import ssl_lexer
+
+
+def test_strip_code() -> None:
+    """strip_code blanks comments and empties string literals, keeping every line ending."""
+    text = b'a /* x */ b\n// gone\r\nc("text") /* open\n\nstill open */ d\ne("unterminated\r\n'
+    stripped = ssl_lexer.strip_code(text)
+    assert stripped.code == b'a   b\n \r\nc("")  \n\n  d\ne(""\r\n'
+    assert stripped.strings == [(11, b'"text"'), (24, b'"unterminated')]
+    assert stripped.code[11:13] == stripped.code[24:26] == b'""'
+
+
+def test_strip_code_without_comments_or_strings() -> None:
+    """Code with no comments or strings is returned as is."""
+    assert ssl_lexer.strip_code(b"a := b * c / 2;\n") == (b"a := b * c / 2;\n", [])
+
+
+def test_strip_code_comment_markers_in_string() -> None:
+    """Comment markers inside string literals start no comment, and quotes inside comments start no string."""
+    stripped = ssl_lexer.strip_code(b'"/*" x "*/" // "y"\n/* " */ z\n')
+    assert stripped.code == b'"" x ""  \n  z\n'
+    assert [text for _, text in stripped.strings] == [b'"/*"', b'"*/"']
+
+
+def test_strip_code_unclosed_block_comment() -> None:
+    """A block comment left open runs to the end of the file."""
+    assert ssl_lexer.strip_code(b"a /* b\nc\n").code == b"a  \n \n"
@@ -0,0 +1,77 @@
+"""Tests for tree_walker.py — scandir-based file discovery with exclude globs and .gitignore."""
+
+from pathlib import Path
+
+import pytest
+import tree_walker
+
+
+def _touch(root: Path, *rel_paths: str) -> None:
+    """Create empty files under root, with their parent directories."""
+    for rel_path in rel_paths:
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+
+def _found(root: Path, **kwargs: object) -> list[str]:
+    """Return the POSIX paths, relative to root, of the .ssl files the walker finds."""
+    return [entry.path.relative_to(root).as_posix() for entry in tree_walker.walk_files(root, ".ssl", **kwargs)]
+
+
+def test_walk_files_matches_rglob(tmp_path: Path) -> None:
+    """walk_files finds the same files as rglob, files before subdirectories in name order."""
+    _touch(tmp_path, "b.ssl", "a.ssl", "notes.txt", "sub/c.ssl", "sub/deep/d.ssl", "upper.SSL")
+    assert _found(tmp_path) == ["a.ssl", "b.ssl", "sub/c.ssl", "sub/deep/d.ssl"]
+    assert sorted(_found(tmp_path)) == sorted(p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.ssl"))
+
+
+def test_walk_files_attaches_stat(tmp_path: Path) -> None:
+    """walk_files returns the stat info of each file."""
+    (tmp_path / "a.ssl").write_bytes(b"procedure start;\n")
+    (entry,) = tree_walker.walk_files(tmp_path, ".ssl")
+    assert entry.stat.st_size == (tmp_path / "a.ssl").stat().st_size
+
+
+def test_walk_files_exclude(tmp_path: Path) -> None:
+    """Exclude globs match bare names anywhere and paths relative to the root."""
+    _touch(tmp_path, "a.ssl", "build/b.ssl", "src/build/c.ssl", "vendor/lib/d.ssl", "src/e.ssl", "src/old.bak.ssl")
+    assert _found(tmp_path, exclude=("build", "vendor/*", "*.bak.ssl")) == ["a.ssl", "src/e.ssl"]
+
+
+def test_walk_files_prunes_excluded_dirs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Excluded directories are never listed."""
+    _touch(tmp_path, "a.ssl", "assets/art/b.ssl", ".git/c.ssl")
+    scanned: list[str] = []
+    real_scandir = tree_walker.os.scandir
+
+    def recording_scandir(path: Path) -> object:
+        scanned.append(Path(path).name)
+        return real_scandir(path)
+
+    monkeypatch.setattr(tree_walker.os, "scandir", recording_scandir)
+    assert _found(tmp_path, exclude=("assets",)) == ["a.ssl"]
+    assert scanned == [tmp_path.name]
+
+
+def test_walk_files_gitignore(tmp_path: Path) -> None:
+    """.gitignore rules of the enclosing work tree, above and below the root, are honored."""
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text("generated/\n/scripts_src/tmp.ssl\n", encoding="utf-8")
+    root = tmp_path / "scripts_src"
+    _touch(root, "a.ssl", "tmp.ssl", "generated/b.ssl", "sub/c.ssl", "sub/skip.ssl", "sub/keep.ssl")
+    (root / "sub" / ".gitignore").write_text("# comment\n*.ssl\n!keep.ssl\n", encoding="utf-8")
+    assert _found(root) == ["a.ssl", "sub/keep.ssl"]
+    assert {"tmp.ssl", "generated/b.ssl", "sub/skip.ssl"} <= set(_found(root, use_gitignore=False))
+
+
+def test_parse_gitignore() -> None:
+    """parse_gitignore handles negation, directory-only and anchored patterns."""
+    rules = tree_walker.parse_gitignore("\n# c\n!keep\nbuild/\n/top.ssl\nsub/x\n**/any\n", "base")
+    assert rules == [
+        tree_walker.IgnoreRule("keep", "base", negate=True, dir_only=False, anchored=False),
+        tree_walker.IgnoreRule("build", "base", negate=False, dir_only=True, anchored=False),
+        tree_walker.IgnoreRule("top.ssl", "base", negate=False, dir_only=False, anchored=True),
+        tree_walker.IgnoreRule("sub/x", "base", negate=False, dir_only=False, anchored=True),
+        tree_walker.IgnoreRule("any", "base", negate=False, dir_only=False, anchored=False),
+    ]
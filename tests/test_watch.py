@@ -0,0 +1,118 @@
+"""Tests for watch.py — batched revalidation of changed files."""
+
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+import scan_engine
+import watch
+
+
+class _FakeTime:
+    """Clock advanced by sleeping, running scheduled file edits as their time comes."""
+
+    def __init__(self, edits: dict[float, Callable[[], None]]) -> None:
+        self.now = 0.0
+        self.edits = edits
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+        for at in sorted(self.edits):
+            if at <= self.now:
+                self.edits.pop(at)()
+
+    def clock(self) -> float:
+        return self.now
+
+
+def test_changed_files() -> None:
+    """Added, removed and modified files count as changed."""
+    old = {Path("a"): (1, 1), Path("b"): (1, 1), Path("c"): (1, 1)}
+    new = {Path("a"): (1, 1), Path("b"): (1, 2), Path("d"): (1, 1)}
+    assert watch.changed_files(old, new) == {Path("b"), Path("c"), Path("d")}
+
+
+def test_affected_checks(tmp_path: Path, mod_tree: scan_engine.ScanConfig) -> None:
+    """Each kind of input selects the checks that read it."""
+    config = mod_tree._replace(worldmap_path=tmp_path / "worldmap.txt", proto_dir=tmp_path / "proto")
+    assert watch.affected_checks(config, [config.scripts_dir / "a.SSL"]) == ["lvars", "msgs"]
+    assert watch.affected_checks(config, [config.dialog_dir / "a.msg"]) == ["msgs"]
+    assert watch.affected_checks(config, [tmp_path / "proto" / "critters" / "a.pro"]) == ["worldmap"]
+    assert watch.affected_checks(config, [config.scripts_lst]) == ["scripts", "lvars", "worldmap"]
+    assert watch.affected_checks(config, [tmp_path / "readme.md"]) == []
+
+
+def test_diff_findings() -> None:
+    """Findings only in the new run are new, those only in the old run resolved."""
+    assert watch.diff_findings(["a", "b"], ["b", "c"]) == (["c"], ["a"])
+
+
+def test_take_snapshot(mod_tree: scan_engine.ScanConfig) -> None:
+    """Snapshots hold scripts, headers, .msg files and the configured files, not unrelated ones."""
+    config = mod_tree
+    (config.scripts_dir / "notes.txt").write_text("\n", encoding="utf-8")
+    (config.dialog_dir / "notes.txt").write_text("\n", encoding="utf-8")
+    snapshot = watch.take_snapshot(config)
+    assert {path.name for path in snapshot} == {
+        "vcdoctor.ssl",
+        "vcmerch.ssl",
+        "common.h",
+        "vcdoctor.msg",
+        "vcmerch.msg",
+        "generic.msg",
+        "scripts.h",
+        "scripts.lst",
+    }
+
+
+def test_wait_batches_changes(mod_tree: scan_engine.ScanConfig, touch: Callable[[Path, str], None]) -> None:
+    """Changes are collected until none shows up for the debounce period."""
+    config = mod_tree
+    doctor = config.scripts_dir / "vcdoctor.ssl"
+    fake = _FakeTime(
+        {
+            1.0: lambda: touch(doctor, "x\n"),
+            1.5: lambda: touch(config.dialog_dir / "vcdoctor.msg", "x\n"),
+            5.0: lambda: touch(config.scripts_dir / "later.ssl", "x\n"),
+        }
+    )
+    watcher = watch.Watcher(config, poll_interval=0.5, debounce=2.0, sleep=fake.sleep, clock=fake.clock)
+    watcher.snapshot = watch.take_snapshot(watcher.config)
+    batch = watcher.wait()
+    assert {path.name for path in batch} == {"vcdoctor.ssl", "vcdoctor.msg"}
+    settled_at = 3.5  # The last change in the batch, at 1.5, plus the debounce time
+    assert fake.now == settled_at
+    assert {path.name for path in watcher.wait()} == {"later.ssl"}
+
+
+def test_revalidate_prints_diff(
+    capsys: pytest.CaptureFixture[str], mod_tree: scan_engine.ScanConfig, touch: Callable[[Path, str], None]
+) -> None:
+    """Only the affected checks rerun, and only new and resolved findings are printed."""
+    config = mod_tree
+    watcher = watch.Watcher(config)
+    assert watcher.start()
+    output = capsys.readouterr().out
+    assert "missing from" in output
+    assert "Failed checks: lvars, msgs" in output
+
+    msg_path = watcher.config.dialog_dir / "vcdoctor.msg"
+    touch(msg_path, "{100}{}{Hello.}\n{101}{}{Again.}\n{150}{}{Hi.}\n")
+    watcher.revalidate({msg_path})
+    output = capsys.readouterr().out.splitlines()
+    assert output[0] == "1 changed file(s), rerunning: msgs"
+    assert output[1].startswith("- msgs: Messages in ")
+    expected_line_count = 2  # The rerun notice and the msgs result
+    assert len(output) == expected_line_count
+
+    lst_path = watcher.config.scripts_lst
+    touch(lst_path, "vcdoctor.int ; doctor # local_vars=2\nvcmerch.int ; merchant # local_vars=4\n")
+    watcher.revalidate({lst_path})
+    assert capsys.readouterr().out.splitlines()[1:] == ["No new or resolved findings."]
+
+    doctor = watcher.config.scripts_dir / "vcdoctor.ssl"
+    touch(doctor, '#include "headers/common.h"\n#define LVAR_Flags   (5)\n   display_mstr(100)\n')
+    watcher.revalidate({doctor})
+    output = capsys.readouterr().out.splitlines()
+    assert output[1].startswith("+ lvars: Script vcdoctor max LVAR index is 5")
+    assert output[2].startswith("- lvars: Script vcdoctor max LVAR index is 3")
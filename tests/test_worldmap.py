@@ -1,6 +1,7 @@
 """Tests for worldmap.py — validates worldmap encounter script combinations."""
 
 from pathlib import Path
+import struct
 
 import pytest
 import worldmap
@@ -30,6 +31,43 @@ def test_get_allowed_script_sets_inline_comments() -> None:
     assert result == [[100, 101], [200, 201]]
 
 
+def test_iter_encounters_records() -> None:
+    """iter_encounters() parses each entry once into a record with its line number."""
+    lines = [
+        "[Data]\n",
+        "type_00=Script:1\n",
+        "[Encounter: E01]  ; the first one\n",
+        "Type_00 = Ratio:50%, pid:16777225, Script:100\n",
+        "type_01=Dead, Pid:16777226, Script:200 ; killed\n",
+    ]
+    (encounter,) = worldmap.iter_encounters(lines)
+    assert encounter.section == "Encounter: E01"
+    expected_line = 3  # Of the [Encounter: E01] header
+    assert encounter.line == expected_line
+    assert encounter.entries == {
+        "type_00": worldmap.EncounterEntry("type_00", 4, 50, 16777225, 100, dead=False),
+        "type_01": worldmap.EncounterEntry("type_01", 5, None, 16777226, 200, dead=True),
+    }
+    assert encounter.scripts() == [100]
+
+
+def test_read_encounters_duplicates(tmp_path: Path) -> None:
+    """read_encounters() lets repeated keys replace earlier ones and merges repeated sections."""
+    wmap = tmp_path / "worldmap.txt"
+    wmap.write_text(
+        "[Encounter: E01]\ntype_00=Script:100\ntype_00=Script:101\n"
+        "[Encounter: E02]\ntype_00=Script:300\n"
+        "[Encounter: E01]\ntype_01=Script:200\n",
+        encoding="utf-8",
+    )
+    encounters = worldmap.read_encounters(wmap)
+    assert [(encounter.section, encounter.line) for encounter in encounters] == [
+        ("Encounter: E01", 1),
+        ("Encounter: E02", 4),
+    ]
+    assert encounters[0].scripts() == [101, 200]
+
+
 def test_main_valid(fixtures_dir: Path) -> None:
     """main() exits cleanly for an encounter where all scripts match (same ID)."""
     # E01 has Script:100 and Script:100 — only one unique script, no combination to check
@@ -58,6 +96,48 @@ def test_main_invalid_allowed(tmp_path: Path) -> None:
     worldmap.main([str(wmap), "-s", "100,200"])
 
 
+def test_main_allowed_subset_from_file(tmp_path: Path) -> None:
+    """main() allows subsets of the script sets read from --script-sets-file."""
+    wmap = tmp_path / "worldmap.txt"
+    wmap.write_text(
+        "[Encounter: E01]\ntype_00=Pid:16777225, Script:100\ntype_01=Pid:16777226, Script:200\n",
+        encoding="utf-8",
+    )
+    sets_file = tmp_path / "script_sets.txt"
+    sets_file.write_text("100 200 300 # caravan\n", encoding="utf-8")
+    worldmap.main([str(wmap), "--script-sets-file", str(sets_file)])
+
+
+def test_main_missing_script_sets_file(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """main() exits with code 1 when --script-sets-file does not exist."""
+    wmap = tmp_path / "worldmap.txt"
+    wmap.write_text("[Encounter: E01]\ntype_00=Script:100\n", encoding="utf-8")
+    sets_file = tmp_path / "script_sets.txt"
+    with pytest.raises(SystemExit) as exc_info:
+        worldmap.main([str(wmap), "--script-sets-file", str(sets_file)])
+    assert exc_info.value.code == 1
+    assert capsys.readouterr().out == f"{sets_file} does not exist.\n"
+
+
+def test_main_proto_dir(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """main() with --proto-dir reports encounter Pids that are not in the proto lists."""
+    critters = tmp_path / "proto" / "critters"
+    critters.mkdir(parents=True)
+    (critters / "critters.lst").write_text("00000001.pro\n", encoding="utf-8")
+    (critters / "00000001.pro").write_bytes(struct.pack(">i", 16777217))
+    wmap = tmp_path / "worldmap.txt"
+    wmap.write_text(
+        "[Encounter: E01]\ntype_00=Pid:16777217, Script:100\ntype_01=Dead, Pid:16777218\n",
+        encoding="utf-8",
+    )
+    argv = [str(wmap), "--proto-dir", str(tmp_path / "proto"), "--cache-dir", str(tmp_path / "cache")]
+    with pytest.raises(SystemExit) as exc_info:
+        worldmap.main(argv)
+    assert exc_info.value.code == 1
+    assert capsys.readouterr().out == "Encounter: E01 (line 3) type_01: Pid 16777218 is not in critters.lst (line 2)\n"
+    assert (tmp_path / "cache" / "protos.json").is_file()
+
+
 def test_missing_file(tmp_path: Path) -> None:
     """main() exits with code 1 for a nonexistent worldmap file."""
     with pytest.raises(SystemExit) as exc_info: